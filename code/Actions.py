@@ -0,0 +1,50 @@
+from typing import NamedTuple
+
+
+class Action(NamedTuple):
+    """An order submitted to GameState.step. Plain (unit_id, name, target) tuples work too."""
+
+    unit_id: str | None       #None for 'spawn'
+    name: str
+    target: object = None     #vertex name/ID, target unit ID, or unit type for 'spawn'
+
+
+class TurnResult(NamedTuple):
+    """Compact summary of one resolved turn."""
+
+    turn: int
+    scores: dict              #{player_id: score} after the turn
+    spawned: list             #unit IDs
+    deaths: list              #unit IDs
+    rejected: list            #[(player_id, action, reason), ...]
+
+
+# Resolution phases, in order
+PHASES = ('spawn', 'move', 'combat', 'economy')
+
+# Action name -> (phase, target kind: 'vertex' | 'unit' | 'type' | None, needs wait == 0)
+ACTIONS = {
+    'spawn': ('spawn', 'type', False),
+    'move': ('move', 'vertex', False),
+    'attack': ('combat', 'unit', True),
+    'longshot': ('combat', 'unit', True),
+    'protect': ('combat', 'unit', True),
+    'heal': ('combat', 'unit', True),
+    'boost': ('combat', 'unit', True),
+    'heal_burst': ('combat', None, True),
+    'boost_burst': ('combat', None, True),
+    'spark_burst': ('combat', None, True),
+    'extract': ('economy', None, False),
+    'drop': ('economy', None, False),
+    'give_to': ('economy', 'unit', False),
+}
+
+# Whose units a unit-targeted action may target
+TARGETS = {
+    'attack': 'enemy',
+    'longshot': 'enemy',
+    'protect': 'own',
+    'heal': 'own',
+    'boost': 'own',
+    'give_to': 'own',
+}
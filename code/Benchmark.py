@@ -0,0 +1,173 @@
+"""
+Scaling benchmarks on generated maps, written as JSON and comparable to a stored baseline.
+
+    python -m code.Benchmark --sizes small medium large --out bench.json
+    python -m code.Benchmark --sizes small medium --baseline bench.json --tolerance 0.25
+
+Each benchmark is timed `repeat` times on a fresh setup and the best time is kept.
+With --baseline, the exit status is 1 if any benchmark got slower than baseline * (1 + tolerance).
+"""
+from pathlib import Path
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from code.GameMap import AbstractMap, Map
+from code.GameState import GameState
+from code.MapGenerator import generate_map
+from code.Bots import random_bot
+
+SIZES = {
+    'small': (8, 8),
+    'medium': (32, 32),
+    'large': (96, 96),
+    'huge': (256, 256),
+}
+SPAWN_TYPES = ('minor', 'transporter', 'sparker', 'corebot', 'phasor')
+
+
+def parse_size(spec: str) -> tuple[int, int]:
+    """'medium' or '40x60' -> (rows, cols)"""
+    if spec in SIZES:
+        return SIZES[spec]
+    rows, _, cols = spec.partition('x')
+    return int(rows), int(cols)
+
+
+# Each benchmark does its setup, then returns the zero-argument callable that is timed
+
+def bench_load(path: Path, rng: random.Random):
+    return lambda: AbstractMap.from_file(path)
+
+
+def bench_expand(path: Path, rng: random.Random):
+    return lambda: Map.from_file(path)
+
+
+def bench_neighbors(path: Path, rng: random.Random, queries: int = 10000):
+    game_map = Map.from_file(path)
+    vertices = [rng.randrange(len(game_map.vertex_names)) for _ in range(queries)]
+    return lambda: [game_map.neighbor_ids(vertex) for vertex in vertices]
+
+
+def bench_distance(path: Path, rng: random.Random, queries: int = 50):
+    game_map = Map.from_file(path)
+    n = len(game_map.vertex_names)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+    return lambda: [game_map.distance(u, v) for u, v in pairs]
+
+
+def bench_spawn(path: Path, rng: random.Random, units: int = 500):
+    game_state = GameState(path)
+    types = [SPAWN_TYPES[i % len(SPAWN_TYPES)] for i in range(units)]
+    return lambda: [game_state.new_unit('p1' if i % 2 else 'p2', unit_type) for i, unit_type in enumerate(types)]
+
+
+def bench_spark_score(path: Path, rng: random.Random, turns: int = 100):
+    game_state = GameState(path)
+    for vertex in game_state.spark_points:
+        for player_id in ('p1', 'p2'):
+            game_state.new_unit(player_id, 'sparker').vertex = vertex
+
+    def run():
+        for _ in range(turns):
+            game_state.sparks.update()
+    return run
+
+
+def bench_turn(path: Path, rng: random.Random, turns: int = 20):
+    game_state = GameState(path)
+    rngs = {player_id: random.Random(f"{rng.random()}:{player_id}") for player_id in ('p1', 'p2')}
+
+    def run():
+        for _ in range(turns):
+            game_state.step(*(random_bot(game_state, player_id, rngs[player_id], spawn_probability=0.5)
+                              for player_id in ('p1', 'p2')))
+    return run
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'expand': bench_expand,
+    'neighbors': bench_neighbors,
+    'distance': bench_distance,
+    'spawn': bench_spawn,
+    'spark_score': bench_spark_score,
+    'turn': bench_turn,
+}
+
+
+def run_benchmarks(sizes: list[str], benchmarks: list[str] = None, repeat: int = 3, seed: int = 0,
+                   map_dir: Path = None) -> dict:
+    """{'meta': {...}, 'results': {size: {benchmark: best seconds}}, 'maps': {size: {...}}}"""
+    benchmarks = benchmarks or list(BENCHMARKS)
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'seed': seed, 'repeat': repeat, 'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S")},
+        'maps': {},
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        map_dir = Path(map_dir or tmp_dir)
+        for size in sizes:
+            rows, cols = parse_size(size)
+            path = generate_map(map_dir / f"bench_{rows}x{cols}_{seed}.txt", rows, cols, seed)
+            game_map = Map.from_file(path)
+            report['maps'][size] = {'rows': rows, 'cols': cols, 'vertices': len(game_map.abstract_map.resources),
+                                    'roads': len(game_map.abstract_map.edges), 'cells': len(game_map.vertex_names)}
+            timings = report['results'][size] = {}
+            for name in benchmarks:
+                best = float('inf')
+                for i in range(repeat):
+                    run = BENCHMARKS[name](path, random.Random(f"{seed}:{name}:{i}"))
+                    start = time.perf_counter()
+                    run()
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = round(best, 6)
+                print(f"{size:>8} {name:<12} {best * 1000:10.2f} ms", file=sys.stderr)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.25) -> list[tuple]:
+    """(size, benchmark, baseline seconds, seconds, ratio) of every benchmark slower than the tolerance allows."""
+    regressions = []
+    for size, timings in report['results'].items():
+        for name, seconds in timings.items():
+            reference = baseline.get('results', {}).get(size, {}).get(name)
+            if reference and seconds > reference * (1 + tolerance):
+                regressions.append((size, name, reference, seconds, round(seconds / reference, 3)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time map loading, queries and simulation across map sizes.")
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium', 'large'],
+                        help=f"{', '.join(SIZES)} or ROWSxCOLS")
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--map-dir', type=Path, default=None, help="keep the generated maps there")
+    parser.add_argument('--out', type=Path, default=Path('bench.json'))
+    parser.add_argument('--baseline', type=Path, default=None, help="previous --out file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown ratio over the baseline")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.benchmarks, args.repeat, args.seed, args.map_dir)
+    if args.baseline is not None:
+        report['regressions'] = [dict(zip(('size', 'benchmark', 'baseline', 'seconds', 'ratio'), regression))
+                                 for regression in compare(report, json.loads(args.baseline.read_text()), args.tolerance)]
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.out}")
+
+    for regression in report.get('regressions', []):
+        print(f"REGRESSION {regression['size']}/{regression['benchmark']}: "
+              f"{regression['baseline']:.6f}s -> {regression['seconds']:.6f}s (x{regression['ratio']})")
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Bots in persistent worker processes, one per player, fed through shared memory.
+
+    host = BotHost(game_state, {'p1': 'random', 'p2': 'mybots.alpha:play'}, seed=0, budget=0.5)
+    while ...:
+        actions_p1, actions_p2 = host.decide()
+        game_state.step(actions_p1, actions_p2)
+    host.close()
+
+The host keeps a SharedState: the unit table, resources, spark values, scores and turn laid
+out as fixed columns in one shared memory segment. Resources are written in place by a map
+listener as the engine changes them; units and sparks are published before each decision.
+Each worker attaches the segment (SharedMemory always maps it writable) and reads it only
+through a read-only memoryview, loads the map file once, and refreshes a mirror GameState from
+the segment every turn, so bots keep the usual game_state API (legal_actions, flow fields, ...). Timed effects other than boost multipliers are not mirrored.
+
+Only the turn number goes to the workers and only action lists come back over the pipes.
+A worker that misses its budget is killed (and restarted on the next turn), one that raises
+or dies loses its turn; either way its player plays no action that turn.
+"""
+from multiprocessing import shared_memory
+from pathlib import Path
+import multiprocessing
+import random
+import struct
+import time
+
+from code.GameState import GameState
+from code.Units import UNIT_SPECS
+
+PLAYERS = ('p1', 'p2')
+UNIT_TYPES = tuple(UNIT_SPECS)
+HEADER = struct.Struct("<qqqq")     #turn, number of units, score p1, score p2
+
+# Unit table columns (row i is the i-th unit in spawn order): name, typecode
+UNIT_COLUMNS = (
+    ('player', 'b'),        #index in PLAYERS
+    ('subtype', 'b'),       #index in UNIT_TYPES
+    ('serial', 'i'),        #N of the unit ID p1_minor_N
+    ('vertex', 'i'),
+    ('health', 'd'),
+    ('max_health', 'd'),
+    ('wait', 'i'),
+    ('load', 'i'),
+    ('speed_mult', 'd'),
+    ('damage_mult', 'd'),
+    ('spark_mult', 'd'),
+)
+MIRRORED = ('health', 'max_health', 'wait', 'load', 'speed_mult', 'damage_mult', 'spark_mult')
+
+
+class StateLayout:
+    """Offsets of every column in the segment; both sides compute it from the same sizes."""
+
+    def __init__(self, vertices: int, sparks: int, capacity: int):
+        self.vertices, self.sparks, self.capacity = vertices, sparks, capacity
+        self.regions = {}       #{name: (offset, typecode, length)}
+        offset = HEADER.size
+        for name, typecode, length in (*((name, typecode, capacity) for name, typecode in UNIT_COLUMNS),
+                                       ('resources', 'q', vertices), ('sparks', 'd', sparks)):
+            self.regions[name] = (offset, typecode, length)
+            offset += -(-length * struct.calcsize(typecode) // 8) * 8       #8-byte aligned
+        self.size = offset
+
+    def views(self, buffer: memoryview) -> dict:
+        return {name: buffer[offset:offset + length * struct.calcsize(typecode)].cast(typecode)
+                for name, (offset, typecode, length) in self.regions.items()}
+
+
+class SharedState:
+    """Host side: owns the segment and writes the game state into it."""
+
+    def __init__(self, game_state: GameState, capacity: int = 256):
+        self.game_state = game_state
+        self.segment = None
+        self.allocate(capacity)
+        game_state.map.listeners.append(self.resource_changed)
+
+    def allocate(self, capacity: int):
+        game_state = self.game_state
+        old = self.segment
+        self.layout = StateLayout(len(game_state.map.vertex_names), len(game_state.sparks.vertices), capacity)
+        self.segment = shared_memory.SharedMemory(create=True, size=self.layout.size)
+        self.views = self.layout.views(self.segment.buf)
+        for vertex, amount in enumerate(game_state.map.resource_counts):
+            self.views['resources'][vertex] = amount
+        if old is not None:
+            self.release(old)
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def resource_changed(self, game_map, data, vertex: int, old, new):
+        if data is game_map.resource_counts:
+            self.views['resources'][vertex] = new
+
+    def publish(self):
+        """Write the units, sparks, scores and turn (resources are already up to date)."""
+        game_state = self.game_state
+        units = list(game_state.units_by_id.values())
+        if len(units) > self.layout.capacity:
+            self.allocate(2 * len(units))
+        views = self.views
+        store = game_state.store
+        for row, unit in enumerate(units):
+            views['player'][row] = PLAYERS.index(unit.player_id)
+            views['subtype'][row] = UNIT_TYPES.index(unit.subtype)
+            views['serial'][row] = int(unit.id.rsplit('_', 1)[1])
+            views['vertex'][row] = unit.vertex
+            for name in MIRRORED:
+                views[name][row] = store.read(name, unit.slot)
+        for i, value in enumerate(game_state.sparks.values):
+            views['sparks'][i] = value
+        HEADER.pack_into(self.segment.buf, 0, game_state.turn, len(units),
+                         game_state.scores['p1'], game_state.scores['p2'])
+
+    @staticmethod
+    def release(segment):
+        segment.close()
+        segment.unlink()
+
+    def close(self):
+        if self.segment is not None:
+            self.views = None
+            self.release(self.segment)
+            self.segment = None
+            self.game_state.map.listeners.remove(self.resource_changed)
+
+
+class StateMirror:
+    """
+    Worker side: a GameState of the same map, refreshed from the segment by sync(), or from
+    any other source of the state by refresh(). The columns are read through a read-only view
+    of the segment's buffer; the mapping itself stays writable.
+    """
+
+    def __init__(self, map_file: Path):
+        self.game_state = GameState(map_file)
+        self.segment = None
+        self.segment_name = None
+
+    def attach(self, name: str, capacity: int):
+        if name == self.segment_name:
+            return
+        if self.segment is not None:
+            self.views = None
+            self.segment.close()
+        self.segment = shared_memory.SharedMemory(name=name)
+        self.segment_name = name
+        game_state = self.game_state
+        layout = StateLayout(len(game_state.map.vertex_names), len(game_state.sparks.vertices), capacity)
+        self.views = layout.views(self.segment.buf.toreadonly())
+
+    def sync(self) -> GameState:
+        views = self.views
+        turn, count, score_p1, score_p2 = HEADER.unpack_from(self.segment.buf, 0)
+        units = {f"{PLAYERS[views['player'][row]]}_{UNIT_TYPES[views['subtype'][row]]}_{views['serial'][row]}":
+                 (views['vertex'][row], [views[name][row] for name in MIRRORED]) for row in range(count)}
+        return self.refresh(turn, {'p1': score_p1, 'p2': score_p2}, views['resources'], views['sparks'], units)
+
+    def refresh(self, turn: int, scores: dict, resources, sparks, units: dict) -> GameState:
+        """Bring the mirror to the given state; units is {unit_id: (vertex, [value of each MIRRORED column])}."""
+        game_state = self.game_state
+        game_map = game_state.map
+        game_state.effects.turn = turn
+        game_state.scores.update(scores)
+        for vertex, amount in enumerate(game_map.resource_counts):
+            if resources[vertex] != amount:
+                game_map.set_value(game_map.resource_counts, vertex, resources[vertex])
+        engine = game_state.sparks
+        for i, vertex in enumerate(engine.vertices):
+            old = engine.value_at(i)
+            if sparks[i] != old:
+                engine.values[i] = sparks[i]
+                game_state.zobrist.spark_changed(vertex, old, sparks[i])
+
+        gone = [unit for unit_id, unit in game_state.units_by_id.items() if unit_id not in units]
+        for unit in gone:
+            unit.health = 0
+        if gone:
+            game_state.update_death()
+        store = game_state.store
+        for unit_id, (vertex, values) in units.items():
+            unit = game_state.units_by_id.get(unit_id)
+            if unit is None:
+                player_id, subtype, serial = unit_id.split('_')
+                game_state.unit_created[player_id][subtype] = int(serial) - 1
+                unit = game_state.new_unit(player_id, subtype)
+            if unit.vertex != vertex:
+                unit.vertex = vertex
+            for name, value in zip(MIRRORED, values):
+                store.write(name, unit.slot, value)
+            game_state.zobrist.update_unit(unit)       #health is part of the hash
+        return game_state
+
+    def close(self):
+        if self.segment is not None:
+            self.views = None
+            self.segment.close()
+
+
+def serve(connection, bot_name: str, player_id: str, seed, map_file: Path, memory_limit: int = None):
+    """Worker loop: for each ('turn', segment name, capacity), reply ('ok', actions) or ('error', message)."""
+    from code.Bots import load_bot
+
+    if memory_limit is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    bot = load_bot(bot_name)
+    rng = random.Random(f"{seed}:{player_id}")
+    mirror = StateMirror(map_file)
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] == 'stop':
+                break
+            _, name, capacity = message
+            try:
+                mirror.attach(name, capacity)
+                actions = [tuple(action) for action in bot(mirror.sync(), player_id, rng)]
+            except Exception as error:
+                connection.send(('error', f"{type(error).__name__}: {error}"))
+            else:
+                connection.send(('ok', actions))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        mirror.close()
+
+
+class BotWorker:
+    """Host side of one player's worker process."""
+
+    def __init__(self, context, bot_name: str, player_id: str, seed, map_file: Path, memory_limit: int = None):
+        self.context = context
+        self.args = (bot_name, player_id, seed, str(map_file), memory_limit)
+        self.process = None
+        self.connection = None
+        self.start()
+
+    def start(self):
+        self.connection, child = self.context.Pipe()
+        self.process = self.context.Process(target=serve, args=(child, *self.args), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.process = None
+
+    def request(self, name: str, capacity: int):
+        if self.process is None:
+            self.start()
+        self.connection.send(('turn', name, capacity))
+
+    def reply(self, deadline: float) -> tuple[str, object]:
+        """('ok', actions), ('error', message) or ('timeout', None); a late worker is killed."""
+        try:
+            if self.connection.poll(max(0.0, deadline - time.perf_counter())):
+                return self.connection.recv()
+        except (EOFError, OSError):
+            self.kill()
+            return 'error', "Worker died"
+        self.kill()
+        return 'timeout', None
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.connection.send(('stop',))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+        self.process = None
+
+
+class BotHost:
+    """One persistent worker per player; decide() asks both for the turn's actions within budget seconds."""
+
+    def __init__(self, game_state: GameState, bots: dict, seed=0, budget: float = 1.0, capacity: int = 256,
+                 memory_limit: int = None, start_method: str = None):
+        self.game_state = game_state
+        self.budget = budget
+        self.shared = SharedState(game_state, capacity)
+        context = multiprocessing.get_context(start_method)
+        self.workers = {player_id: BotWorker(context, bot_name, player_id, seed, game_state.map.source, memory_limit)
+                        for player_id, bot_name in bots.items()}
+        self.failures = {player_id: [] for player_id in bots}       #[(turn, 'timeout' | error message)]
+
+    def decide(self) -> tuple[list, list]:
+        """(actions_p1, actions_p2) for the current state."""
+        self.shared.publish()
+        for worker in self.workers.values():
+            worker.request(self.shared.name, self.shared.layout.capacity)
+        deadline = time.perf_counter() + self.budget
+        actions = {player_id: [] for player_id in PLAYERS}
+        for player_id, worker in self.workers.items():
+            status, payload = worker.reply(deadline)
+            if status == 'ok':
+                actions[player_id] = payload
+            else:
+                self.failures[player_id].append((self.game_state.turn, payload or status))
+        return actions['p1'], actions['p2']
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.close()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,62 @@
+import importlib
+import random
+
+from code.Actions import Action
+from code.FlowField import RESOURCES, base
+
+
+def idle_bot(game_state, player_id: str, rng: random.Random) -> list:
+    """Never does anything."""
+    return []
+
+
+def random_bot(game_state, player_id: str, rng: random.Random, spawn_probability: float = 0.1) -> list:
+    """Plays one uniformly random legal action per unit, and sometimes spawns a unit."""
+    actions = []
+    for unit_id, legal in game_state.legal_actions(player_id).items():
+        if not legal:
+            continue
+        if unit_id is None:
+            if rng.random() < spawn_probability:
+                actions.append(rng.choice(legal))
+        else:
+            actions.append(rng.choice(legal))
+    return actions
+
+
+def economy_bot(game_state, player_id: str, rng: random.Random) -> list:
+    """Spawns minors; each one walks the resource flow field, extracts, then walks its base's field to drop."""
+    actions = [Action(None, 'spawn', 'minor')] if len(game_state.units[player_id]) < 4 else []
+    resource_counts = game_state.map.resource_counts
+    home = base(player_id)
+    for unit in game_state.units[player_id]:
+        if unit.subtype != 'minor':
+            continue
+        vertex = unit.vertex
+        if unit.load and game_state.flow.distance(home, vertex) == 0:
+            actions.append(Action(unit.id, 'drop'))
+        elif unit.available_space and resource_counts[vertex] and game_state.flow.distance(home, vertex):
+            actions.append(Action(unit.id, 'extract'))
+        else:
+            step = game_state.flow.next_hop(RESOURCES, vertex) if unit.available_space else None
+            if step is None and unit.load:
+                step = game_state.flow.next_hop(home, vertex)
+            if step is not None:
+                actions.append(Action(unit.id, 'move', step))
+    return actions
+
+
+BOTS = {
+    'idle': idle_bot,
+    'random': random_bot,
+    'economy': economy_bot,
+}
+
+
+def load_bot(name: str):
+    """Bot from its BOTS name or a 'package.module:function' path."""
+    if name in BOTS:
+        return BOTS[name]
+    module_name, _, attribute = name.partition(':')
+    assert attribute, f"Unknown bot {name}"
+    return getattr(importlib.import_module(module_name), attribute)
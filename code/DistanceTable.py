@@ -0,0 +1,104 @@
+from pathlib import Path
+import hashlib
+import os
+import math
+from collections import deque
+
+import numpy as np
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "sparkai"
+
+
+class DistanceTable:
+    """
+    All-pairs hop distances of an EXPANDED map, stored in a compact NumPy matrix.
+    Maps are static after loading, so distance(u, v) becomes an O(1) lookup.
+    """
+
+    def __init__(self, vertices: list[str], matrix: np.ndarray):
+        self.vertices = vertices  # Row/column i is the vertex with map ID i
+        self.index = {vertex: i for i, vertex in enumerate(vertices)}
+        self.matrix = matrix
+        self.unreachable = np.iinfo(matrix.dtype).max
+
+    def distance(self, u: str, v: str):
+        """Hop distance between u and v (math.inf if not connected)."""
+        return self.distance_ids(self.index[u], self.index[v])
+
+    def distance_ids(self, u: int, v: int):
+        """Hop distance between two vertex IDs."""
+        d = self.matrix[u, v]
+        return math.inf if d == self.unreachable else int(d)
+
+    @staticmethod
+    def compute(offsets, targets, n: int) -> np.ndarray:
+        """
+        BFS from every vertex of a CSR graph → (V, V) matrix, uint8 when the diameter allows it, int16 otherwise.
+        Each BFS row is written straight into the table; it starts as uint8 and is widened once if a row needs it.
+        """
+        matrix = np.full((n, n), np.iinfo(np.uint8).max, dtype=np.uint8)
+        row = np.empty(n, dtype=np.int32)      #distances from the current source, -1 if not reached yet
+        for source in range(n):
+            row.fill(-1)
+            row[source] = 0
+            queue = deque([source])
+            while queue:
+                vertex = queue.popleft()
+                dist = row[vertex] + 1
+                for neighbor in targets[offsets[vertex]:offsets[vertex + 1]]:
+                    if row[neighbor] < 0:
+                        row[neighbor] = dist
+                        queue.append(neighbor)
+
+            farthest = int(row.max())
+            if farthest >= np.iinfo(matrix.dtype).max:
+                if farthest >= np.iinfo(np.int16).max:
+                    raise ValueError(f"Map diameter {farthest} does not fit in an int16 distance table")
+                matrix = DistanceTable.widen(matrix, source)
+            matrix[source] = np.where(row < 0, np.iinfo(matrix.dtype).max, row)
+        return matrix
+
+    @staticmethod
+    def widen(matrix: np.ndarray, rows: int) -> np.ndarray:
+        """int16 copy of the first rows of a uint8 table (unreachable stays the dtype's max)."""
+        wide = np.full(matrix.shape, np.iinfo(np.int16).max, dtype=np.int16)
+        narrow_unreachable = np.iinfo(matrix.dtype).max
+        for i in range(rows):
+            wide[i] = np.where(matrix[i] == narrow_unreachable, np.iinfo(np.int16).max, matrix[i])
+        return wide
+
+    @staticmethod
+    def cache_key(filename: Path) -> str:
+        """Hash of the map file content (and of the table layout version)."""
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()[:32]
+
+    @classmethod
+    def for_map(cls, game_map, cache_dir: Path | None = DEFAULT_CACHE_DIR):
+        """
+        Load the table of game_map from the cache (memory-mapped) or compute and save it.
+        cache_dir=None disables the on-disk cache.
+        """
+        vertices = game_map.vertex_names
+        source = getattr(game_map, "source", None)
+
+        if cache_dir is None or source is None:
+            return cls(vertices, cls.compute(game_map.offsets, game_map.targets, len(vertices)))
+
+        cache_file = Path(cache_dir) / f"distances_{cls.cache_key(source)}.npy"
+        if cache_file.exists():
+            matrix = np.load(cache_file, mmap_mode="r")
+            if matrix.shape == (len(vertices), len(vertices)):
+                return cls(vertices, matrix)
+
+        matrix = cls.compute(game_map.offsets, game_map.targets, len(vertices))
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as f:
+            np.save(f, matrix)
+        tmp_file.replace(cache_file)  # atomic: concurrent workers never read a partial file
+        return cls(vertices, np.load(cache_file, mmap_mode="r"))
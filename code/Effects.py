@@ -0,0 +1,136 @@
+from enum import IntEnum
+from code.UnitStore import SLOT_MASK
+
+
+class Effect(IntEnum):
+    """Typed effect IDs."""
+
+    SPEED_BOOST = 0
+    DAMAGE_BOOST = 1
+    SPARK_BOOST = 2
+    PROTECTOR = 3       #value: the unit that takes the damage instead
+    PROTECTION = 4
+
+    @classmethod
+    def of(cls, effect):
+        """Effect from an Effect or a legacy name ('speed_boost', 'protector', ...)."""
+        return effect if isinstance(effect, Effect) else cls[effect.upper()]
+
+
+# Boosted attribute -> (effect, cached multiplier column in the UnitStore)
+MULTIPLIERS = {
+    'speed': (Effect.SPEED_BOOST, 'speed_mult'),
+    'damage': (Effect.DAMAGE_BOOST, 'damage_mult'),
+    'spark': (Effect.SPARK_BOOST, 'spark_mult'),
+}
+MULTIPLIER_COLUMNS = {effect: column for effect, column in MULTIPLIERS.values()}
+
+
+class EffectScheduler:
+    """
+    Central bookkeeping of timed effects.
+    Expiries sit in a timer wheel keyed by expiry turn, so advancing a turn only touches
+    the effects that expire on it. Boost multipliers are cached in UnitStore columns and
+    rewritten only when a boost is applied or expires.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.turn = 0
+        self.active = {}        #{slot: {effect: (value, expiry_turn)}}
+        self.wheel = {}         #{expiry_turn: [(handle, effect), ...]}
+        self.journal = None     #undo log, see UnitStore
+
+    def copy(self, store):
+        """Independent copy bound to store (a copy of self.store whose units are already rebuilt)."""
+        clone = EffectScheduler(store)
+        clone.turn = self.turn
+        # Effect values that are units (PROTECTOR) are remapped to their view in the new store
+        clone.active = {slot: {effect: (store.units[value.slot] if hasattr(value, 'slot') else value, expiry)
+                               for effect, (value, expiry) in effects.items()}
+                        for slot, effects in self.active.items()}
+        clone.wheel = {expiry: entries.copy() for expiry, entries in self.wheel.items()}
+        return clone
+
+    def apply(self, unit, effect, value, duration: int):
+        """Apply (or overwrite) an effect on unit for duration turns."""
+        effect = Effect.of(effect)
+        if duration <= 0:
+            self.remove(unit.slot, effect)
+            return
+        expiry = self.turn + duration
+        effects = self.active.setdefault(unit.slot, {})
+        if self.journal is not None:
+            self.journal.append((self.unapply, (unit.slot, effect, effects.get(effect), expiry)))
+        effects[effect] = (value, expiry)
+        self.wheel.setdefault(expiry, []).append((unit.handle, effect))
+        column = MULTIPLIER_COLUMNS.get(effect)
+        if column is not None:
+            self.store.write(column, unit.slot, value)
+
+    def unapply(self, slot: int, effect: Effect, previous, expiry: int):
+        self.wheel[expiry].pop()
+        if not self.wheel[expiry]:
+            del self.wheel[expiry]
+        effects = self.active[slot]
+        if previous is None:
+            del effects[effect]
+            if not effects:
+                del self.active[slot]
+        else:
+            effects[effect] = previous
+
+    def remove(self, slot: int, effect: Effect):
+        effects = self.active.get(slot)
+        entry = None if effects is None else effects.pop(effect, None)
+        if entry is None:
+            return
+        if self.journal is not None:
+            self.journal.append((self.restore_entry, (slot, effect, entry)))
+        if not effects:
+            del self.active[slot]
+        column = MULTIPLIER_COLUMNS.get(effect)
+        if column is not None:
+            self.store.write(column, slot, 1)
+
+    def restore_entry(self, slot: int, effect: Effect, entry):
+        self.active.setdefault(slot, {})[effect] = entry
+
+    def has(self, unit, effect) -> bool:
+        effects = self.active.get(unit.slot)
+        return effects is not None and Effect.of(effect) in effects
+
+    def value(self, unit, effect, default=None):
+        effects = self.active.get(unit.slot)
+        if effects is None:
+            return default
+        entry = effects.get(Effect.of(effect))
+        return default if entry is None else entry[0]
+
+    def effects_of(self, unit) -> dict:
+        """{effect name: (value, remaining turns)} of unit."""
+        return {effect.name.lower(): (value, expiry - self.turn)
+                for effect, (value, expiry) in self.active.get(unit.slot, {}).items()}
+
+    def advance(self):
+        """Move to the next turn and expire the effects scheduled for it."""
+        self.turn += 1
+        expiring = self.wheel.pop(self.turn, [])
+        if self.journal is not None:
+            self.journal.append((self.unadvance, (expiring,)))
+        for handle, effect in expiring:
+            slot = handle & SLOT_MASK
+            entry = self.active.get(slot, {}).get(effect)
+            # Stale wheel entries: effect overwritten with a later expiry, or row reused by another unit
+            if entry is not None and entry[1] == self.turn and self.store.is_valid(handle):
+                self.remove(slot, effect)
+
+    def unadvance(self, expiring: list):
+        if expiring:
+            self.wheel[self.turn] = expiring
+        self.turn -= 1
+
+    def clear(self, slot: int):
+        """Drop every effect of a removed unit."""
+        for effect in list(self.active.get(slot, ())):
+            self.remove(slot, effect)
@@ -0,0 +1,448 @@
+"""
+Append-only binary event log of a match, with keyframes for seeking.
+
+    recorder = EventRecorder(game_state, "match.spklog", header={'bots': [...], 'seed': 0})
+    ...
+    result = game_state.step(actions_p1, actions_p2)
+    recorder.record(result, actions_p1, actions_p2)
+    ...
+    recorder.close()
+
+    log = EventLog("match.spklog")
+    state = log.state(250)      # nearest keyframe at or before turn 250, then the deltas up to it
+
+Layout: MAGIC | version (uint32) | header length (uint32) | JSON header | records [| index | trailer].
+A record is an opcode byte followed by its fields (see SCHEMAS): unsigned LEB128 varints,
+numbers (zigzag varints tagged as integers or hundredths, else doubles) and length-prefixed blobs.
+Units are referred to by small integer IDs (uid) assigned in spawn order, vertices by map ID.
+Every turn is a TURN record followed by the deltas that led to the state of that turn; every
+keyframe_interval turns a KEYFRAME record holds the full (zlib-compressed) replay state.
+close() appends an index of the keyframe offsets; logs without one are scanned instead.
+"""
+from pathlib import Path
+import json
+import struct
+import zlib
+
+from code.Actions import ACTIONS
+from code.Units import UNIT_SPECS
+
+MAGIC = b"SPKLOG\0\0"
+INDEX_MAGIC = b"SPKIDX\0\0"
+FORMAT_VERSION = 1
+PREFIX = struct.Struct("<8sII")     #magic, version, header length
+TRAILER = struct.Struct("<Q8s")     #offset of the INDEX record, INDEX_MAGIC
+DOUBLE = struct.Struct("<d")
+
+PLAYERS = ('p1', 'p2')
+UNIT_TYPES = tuple(UNIT_SPECS)
+ACTION_NAMES = tuple(ACTIONS)
+
+# Opcodes
+TURN, SPAWN, MOVE, HEALTH, LOAD, RESOURCE, SPARK, SCORE, DEATH, EFFECT, EFFECT_END, ACTION, KEYFRAME, INDEX = range(14)
+
+# Record fields: u = unsigned varint, n = number, b = blob
+SCHEMAS = {
+    TURN: 'u',          #turn
+    SPAWN: 'uuuuun',    #uid, player, unit type, serial (the N of its unit ID), vertex, health
+    MOVE: 'uu',         #uid, vertex
+    HEALTH: 'un',       #uid, health
+    LOAD: 'un',         #uid, load
+    RESOURCE: 'un',     #vertex, amount
+    SPARK: 'un',        #spark spot index, value
+    SCORE: 'un',        #player, score
+    DEATH: 'u',         #uid
+    EFFECT: 'uunu',     #uid, effect, value (the uid for PROTECTOR), expiry turn
+    EFFECT_END: 'uu',   #uid, effect
+    ACTION: 'uuu',      #uid, action, target + 1 (vertex ID or uid, 0 for none); not for spawns and moves
+    KEYFRAME: 'ub',     #turn, compressed JSON state
+    INDEX: 'b',         #JSON [[turn, offset], ...] of the keyframes
+}
+OPCODE_NAMES = ('turn', 'spawn', 'move', 'health', 'load', 'resource', 'spark', 'score', 'death', 'effect',
+                'effect_end', 'action', 'keyframe', 'index')
+
+
+def write_varint(buffer: bytearray, value: int):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def write_number(buffer: bytearray, value):
+    """Zigzag varint with a 2-bit tag: integer, hundredths, or a double that follows."""
+    tag = 3
+    if abs(value) < 2 ** 53:
+        if float(value).is_integer():
+            value, tag = int(value), 0
+        elif float(value * 100).is_integer() and round(value * 100) / 100 == value:
+            value, tag = round(value * 100), 1
+    if tag == 3:
+        buffer.append(3)
+        buffer += DOUBLE.pack(value)
+        return
+    write_varint(buffer, (((value << 1) ^ (value >> 63)) << 2) | tag)
+
+
+def read_number(data, offset: int):
+    value, offset = read_varint(data, offset)
+    tag = value & 3
+    if tag == 3:
+        return DOUBLE.unpack_from(data, offset)[0], offset + DOUBLE.size
+    value >>= 2
+    value = (value >> 1) ^ -(value & 1)
+    return (value / 100 if tag else value), offset
+
+
+def encode(buffer: bytearray, opcode: int, *fields):
+    buffer.append(opcode)
+    for kind, field in zip(SCHEMAS[opcode], fields):
+        if kind == 'u':
+            write_varint(buffer, field)
+        elif kind == 'n':
+            write_number(buffer, field)
+        else:
+            write_varint(buffer, len(field))
+            buffer += field
+
+
+def decode(data, offset: int) -> tuple[int, list, int]:
+    """(opcode, fields, offset of the next record) of the record at offset."""
+    opcode = data[offset]
+    offset += 1
+    fields = []
+    for kind in SCHEMAS[opcode]:
+        if kind == 'u':
+            field, offset = read_varint(data, offset)
+        elif kind == 'n':
+            field, offset = read_number(data, offset)
+        else:
+            size, offset = read_varint(data, offset)
+            field, offset = bytes(data[offset:offset + size]), offset + size
+        fields.append(field)
+    return opcode, fields, offset
+
+
+class ReplayState:
+    """Observable state of a logged match at one turn (what keyframes store and deltas update)."""
+
+    def __init__(self, turn=0, scores=None, units=None, resources=None, sparks=None, effects=None):
+        self.turn = turn
+        self.scores = scores if scores is not None else {player_id: 0 for player_id in PLAYERS}
+        self.units = units if units is not None else {}         #{uid: [unit_id, player_id, subtype, vertex, health, load]}
+        self.resources = resources if resources is not None else []      #amount per vertex ID
+        self.sparks = sparks if sparks is not None else []       #value per spark spot
+        self.effects = effects if effects is not None else {}    #{uid: {effect: [value, expiry]}}
+        self.actions = []       #[(uid, action name, target)] of the last turn
+
+    def to_bytes(self) -> bytes:
+        state = {'turn': self.turn, 'scores': self.scores, 'units': self.units, 'resources': self.resources,
+                 'sparks': self.sparks, 'effects': self.effects}
+        return zlib.compress(json.dumps(state, separators=(",", ":")).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        state = json.loads(zlib.decompress(data))
+        return cls(state['turn'], state['scores'], {int(uid): unit for uid, unit in state['units'].items()},
+                   state['resources'], state['sparks'],
+                   {int(uid): {int(effect): entry for effect, entry in effects.items()}
+                    for uid, effects in state['effects'].items()})
+
+    def apply(self, opcode: int, fields: list):
+        """Apply one delta record."""
+        if opcode == TURN:
+            self.turn = fields[0]
+            self.actions = []
+            for uid in list(self.effects):
+                effects = self.effects[uid]
+                for effect in [effect for effect, (_, expiry) in effects.items() if expiry <= self.turn]:
+                    del effects[effect]
+                if not effects:
+                    del self.effects[uid]
+        elif opcode == SPAWN:
+            uid, player, unit_type, serial, vertex, health = fields
+            player_id, subtype = PLAYERS[player], UNIT_TYPES[unit_type]
+            self.units[uid] = [f"{player_id}_{subtype}_{serial}", player_id, subtype, vertex, health, 0]
+        elif opcode == MOVE:
+            self.units[fields[0]][3] = fields[1]
+        elif opcode == HEALTH:
+            self.units[fields[0]][4] = fields[1]
+        elif opcode == LOAD:
+            self.units[fields[0]][5] = fields[1]
+        elif opcode == RESOURCE:
+            self.resources[fields[0]] = fields[1]
+        elif opcode == SPARK:
+            self.sparks[fields[0]] = fields[1]
+        elif opcode == SCORE:
+            self.scores[PLAYERS[fields[0]]] = fields[1]
+        elif opcode == DEATH:
+            self.units.pop(fields[0], None)
+            self.effects.pop(fields[0], None)
+        elif opcode == EFFECT:
+            uid, effect, value, expiry = fields
+            self.effects.setdefault(uid, {})[effect] = [value, expiry]
+        elif opcode == EFFECT_END:
+            effects = self.effects.get(fields[0], {})
+            effects.pop(fields[1], None)
+            if not effects:
+                self.effects.pop(fields[0], None)
+        elif opcode == ACTION:
+            uid, action, target = fields
+            self.actions.append((uid, ACTION_NAMES[action], target - 1 if target else None))
+
+    def frame(self, spark_vertices: list[int]) -> dict:
+        """Frame in the format of code/Replay.py (what the Renderer draws)."""
+        return {'turn': self.turn, 'scores': dict(self.scores),
+                'units': [[player_id, subtype, vertex, health] for _, player_id, subtype, vertex, health, _ in self.units.values()],
+                'sparks': [list(pair) for pair in zip(spark_vertices, self.sparks)]}
+
+
+class EventRecorder:
+    """Writes the event log of a game_state; call record() after every step()."""
+
+    def __init__(self, game_state, path: Path, header: dict = None, keyframe_interval: int = 100):
+        self.game_state = game_state
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+        self.keyframes = []         #[(turn, offset)]
+        self.uids = {}              #{unit_id: uid}
+        self.units = {}             #{unit_id: [vertex, health, load]} as last logged
+        self.effects = {}           #{unit_id: {effect: (value, expiry)}} as last logged
+        self.sparks = list(game_state.sparks.values)
+        self.scores = dict(game_state.scores)
+        self.dirty = set()          #vertices whose resources changed since the last record()
+        game_state.map.listeners.append(self.resource_changed)
+
+        header = dict(header or {})
+        header.update({'map': str(game_state.map.source), 'keyframe_interval': keyframe_interval,
+                       'spark_vertices': game_state.sparks.vertices, 'players': PLAYERS,
+                       'unit_types': UNIT_TYPES, 'actions': ACTION_NAMES, 'start_turn': game_state.turn})
+        encoded = json.dumps(header).encode()
+        self.file.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)) + encoded)
+
+        self.diff_units(bytearray())        #units already in play get their uid, they are in the first keyframe
+        self.write_keyframe()
+
+    def resource_changed(self, game_map, data, vertex: int, old, new):
+        if data is game_map.resource_counts:
+            self.dirty.add(vertex)
+
+    def state(self) -> ReplayState:
+        """Replay state of the game right now."""
+        game_state = self.game_state
+        units = {self.uids[unit.id]: [unit.id, unit.player_id, unit.subtype, unit.vertex, unit.health,
+                                      unit.store.read('load', unit.slot)]
+                 for unit in game_state.units_by_id.values()}
+        effects = {self.uids[unit_id]: {effect: [value, expiry] for effect, (value, expiry) in entries.items()}
+                   for unit_id, entries in self.effects.items() if entries}
+        return ReplayState(game_state.turn, dict(game_state.scores), units, list(game_state.map.resource_counts),
+                           [float(value) for value in game_state.sparks.values], effects)
+
+    def write_keyframe(self):
+        buffer = bytearray()
+        encode(buffer, KEYFRAME, self.game_state.turn, self.state().to_bytes())
+        self.keyframes.append((self.game_state.turn, self.file.tell()))
+        self.file.write(buffer)
+
+    def diff_units(self, buffer: bytearray):
+        game_state = self.game_state
+        uids = self.uids
+        for unit_id, unit in game_state.units_by_id.items():
+            if unit_id not in uids:
+                uid = uids[unit_id] = len(uids)
+                encode(buffer, SPAWN, uid, PLAYERS.index(unit.player_id), UNIT_TYPES.index(unit.subtype),
+                       int(unit_id.rsplit('_', 1)[1]), unit.vertex, unit.health)
+                self.units[unit_id] = [unit.vertex, unit.health, 0]
+
+        for unit_id, unit in game_state.units_by_id.items():
+            uid = uids[unit_id]
+            logged = self.units[unit_id]
+            state = [unit.vertex, unit.health, unit.store.read('load', unit.slot)]
+            for opcode, value, previous in zip((MOVE, HEALTH, LOAD), state, logged):
+                if value != previous:
+                    encode(buffer, opcode, uid, value)
+            self.units[unit_id] = state
+
+            # Effect values that are units (PROTECTOR) are logged as uids
+            effects = {effect: (uids[value.id] if hasattr(value, 'id') else value, expiry)
+                       for effect, (value, expiry) in game_state.effects.active.get(unit.slot, {}).items()}
+            logged_effects = self.effects.get(unit_id, {})
+            if effects != logged_effects:
+                for effect, (value, expiry) in effects.items():
+                    if logged_effects.get(effect) != (value, expiry):
+                        encode(buffer, EFFECT, uid, effect, value, expiry)
+                for effect, (_, expiry) in logged_effects.items():
+                    if effect not in effects and expiry > game_state.turn:
+                        encode(buffer, EFFECT_END, uid, effect)
+                self.effects[unit_id] = effects
+
+        for unit_id in [unit_id for unit_id in self.units if unit_id not in game_state.units_by_id]:
+            encode(buffer, DEATH, uids[unit_id])
+            del self.units[unit_id]
+            self.effects.pop(unit_id, None)
+
+    def record(self, result=None, actions_p1: list = (), actions_p2: list = ()):
+        """Log the turn just played: accepted actions (if given) and every state delta."""
+        game_state = self.game_state
+        game_map = game_state.map
+        buffer = bytearray()
+        encode(buffer, TURN, game_state.turn)
+
+        rejected = {id(action) for _, action, _ in result.rejected} if result is not None else set()
+        for action in (*actions_p1, *actions_p2):
+            unit_id, name, target = (tuple(action) + (None,))[:3]
+            # Spawns and moves are already logged as SPAWN and MOVE deltas
+            if name in ('spawn', 'move') or id(action) in rejected or unit_id not in self.uids:
+                continue
+            kind = ACTIONS[name][1]
+            if kind == 'vertex':
+                target = game_map.vertex_ids.get(target, target) + 1
+            elif kind == 'unit':
+                target = self.uids[target] + 1 if target in self.uids else 0
+            else:
+                target = 0
+            encode(buffer, ACTION, self.uids[unit_id], ACTION_NAMES.index(name), target)
+
+        self.diff_units(buffer)
+        for vertex in sorted(self.dirty):
+            encode(buffer, RESOURCE, vertex, game_map.resource_counts[vertex])
+        self.dirty.clear()
+        for i, value in enumerate(game_state.sparks.values):
+            if value != self.sparks[i]:
+                encode(buffer, SPARK, i, value)
+                self.sparks[i] = value
+        for player, player_id in enumerate(PLAYERS):
+            if game_state.scores[player_id] != self.scores[player_id]:
+                encode(buffer, SCORE, player, game_state.scores[player_id])
+                self.scores[player_id] = game_state.scores[player_id]
+
+        self.file.write(buffer)
+        if game_state.turn % self.keyframe_interval == 0:
+            self.write_keyframe()
+
+    def close(self):
+        if self.file.closed:
+            return
+        buffer = bytearray()
+        offset = self.file.tell()
+        encode(buffer, INDEX, json.dumps(self.keyframes).encode())
+        self.file.write(buffer + TRAILER.pack(offset, INDEX_MAGIC))
+        self.file.close()
+        self.game_state.map.listeners.remove(self.resource_changed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventLog:
+    """Reader of an event log: decoded records, and the replay state at any turn."""
+
+    def __init__(self, path: Path):
+        self.data = Path(path).read_bytes()
+        magic, version, header_length = PREFIX.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an event log")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Event log version {version} unsupported (expected {FORMAT_VERSION})")
+        self.header = json.loads(self.data[PREFIX.size:PREFIX.size + header_length])
+        self.start = PREFIX.size + header_length
+        self.end = len(self.data)
+
+        offset, magic = 0, b""
+        if self.end - self.start >= TRAILER.size:
+            offset, magic = TRAILER.unpack_from(self.data, self.end - TRAILER.size)
+        if magic == INDEX_MAGIC:
+            self.end = offset
+            self.keyframes = [tuple(keyframe) for keyframe in json.loads(decode(self.data, offset)[1][0])]
+        else:
+            # No index (the recorder did not close): scan the records
+            self.keyframes = [(fields[0], record_offset) for record_offset, opcode, fields in self.records()
+                              if opcode == KEYFRAME]
+
+    def records(self, offset: int = None):
+        """(offset, opcode, fields) of every record from offset (default: the first one)."""
+        offset = self.start if offset is None else offset
+        while offset < self.end:
+            try:
+                opcode, fields, next_offset = decode(self.data, offset)
+            except (IndexError, KeyError, struct.error):
+                return      # Truncated last record of a log that was not closed
+            yield offset, opcode, fields
+            offset = next_offset
+
+    @property
+    def last_turn(self) -> int:
+        turn = self.header['start_turn']
+        offset = self.keyframes[-1][1] if self.keyframes else None
+        for _, opcode, fields in self.records(offset):
+            if opcode in (TURN, KEYFRAME):
+                turn = fields[0]
+        return turn
+
+    def state(self, turn: int) -> ReplayState:
+        """State at turn: the nearest keyframe at or before it, then the deltas up to it."""
+        candidates = [keyframe for keyframe in self.keyframes if keyframe[0] <= turn]
+        if not candidates:
+            raise ValueError(f"Turn {turn} is before the start of the log")
+        _, offset = candidates[-1]
+        _, fields, offset = decode(self.data, offset)
+        state = ReplayState.from_bytes(fields[1])
+        for _, opcode, fields in self.records(offset):
+            if opcode == TURN and fields[0] > turn:
+                break
+            state.apply(opcode, fields)
+        return state
+
+    def states(self):
+        """ReplayState of every turn in order, in a single pass."""
+        state = None
+        for _, opcode, fields in self.records():
+            if opcode == KEYFRAME:
+                if state is None:
+                    state = ReplayState.from_bytes(fields[1])
+                continue
+            if opcode == TURN and state is not None:
+                yield state
+                state = ReplayState(state.turn, dict(state.scores), {uid: list(unit) for uid, unit in state.units.items()},
+                                    list(state.resources), list(state.sparks),
+                                    {uid: dict(effects) for uid, effects in state.effects.items()})
+            if state is not None:
+                state.apply(opcode, fields)
+        if state is not None:
+            yield state
+
+    def events(self, turn: int) -> list[tuple]:
+        """Decoded delta records of one turn, as (name, *fields)."""
+        events = []
+        current = None
+        for _, opcode, fields in self.records(self.seek_offset(turn)):
+            if opcode == TURN:
+                if current == turn:
+                    break
+                current = fields[0]
+            elif current == turn and opcode != KEYFRAME:
+                events.append((OPCODE_NAMES[opcode], *fields))
+        return events
+
+    def seek_offset(self, turn: int) -> int:
+        candidates = [offset for keyframe_turn, offset in self.keyframes if keyframe_turn < turn]
+        return candidates[-1] if candidates else self.start
+
+    def frames(self):
+        """Frames of every turn, in the format of code/Replay.py."""
+        for state in self.states():
+            yield state.frame(self.header['spark_vertices'])
@@ -0,0 +1,141 @@
+from array import array
+import math
+
+# Field keys
+RESOURCES = 'resources'     #vertices with resources left (bases excluded)
+SPARKS = 'sparks'           #every sparking spot
+
+
+def base(player_id: str) -> tuple:
+    return ('base', player_id)
+
+
+def units(player_id: str) -> tuple:
+    return ('units', player_id)
+
+
+def spot(vertex: int) -> tuple:
+    """Field towards one vertex (a given sparking spot, ...)."""
+    return ('spot', vertex)
+
+
+class FlowField:
+    """
+    Multi-source BFS from a set of target vertices over the expanded map: for every vertex,
+    its hop distance to the nearest target, the next vertex on a shortest path towards it
+    and which target that is. Queries are single array lookups.
+    """
+
+    def __init__(self, game_map, targets, version=0):
+        n = len(game_map.vertex_names)
+        self.topology = game_map.targets        #adjacency the field was computed on
+        self.version = version                  #version of the target set it was computed for
+        self.dist = array("i", [-1]) * n
+        self.hop = array("i", [-1]) * n
+        self.source = array("i", [-1]) * n
+
+        offsets, neighbors = game_map.offsets, game_map.targets
+        dist, hop, source = self.dist, self.hop, self.source
+        frontier = []
+        for target in targets:
+            if dist[target] < 0:
+                dist[target] = 0
+                source[target] = target
+                frontier.append(target)
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for u in frontier:
+                for v in neighbors[offsets[u]:offsets[u + 1]]:
+                    if dist[v] < 0:
+                        dist[v] = depth
+                        hop[v] = u
+                        source[v] = source[u]
+                        next_frontier.append(v)
+            frontier = next_frontier
+
+    def distance(self, vertex: int):
+        """Hops from vertex to the nearest target (math.inf if none is reachable)."""
+        d = self.dist[vertex]
+        return math.inf if d < 0 else d
+
+    def next_hop(self, vertex: int):
+        """Neighbor of vertex one hop closer to the nearest target (None on a target or if unreachable)."""
+        hop = self.hop[vertex]
+        return None if hop < 0 else hop
+
+    def nearest(self, vertex: int):
+        """Nearest target of vertex (None if unreachable)."""
+        target = self.source[vertex]
+        return None if target < 0 else target
+
+
+class FlowFields:
+    """
+    Flow fields of a GameState, computed on first use and kept until their target set changes:
+    resources when a vertex is depleted or refilled (map listener), units when the set of
+    vertices occupied by a player changes (Occupancy versions), every field when the map
+    topology changes. Bases and spark spots never change.
+    """
+
+    def __init__(self, game_state):
+        self.game_state = game_state
+        self.fields = {}                #{key: FlowField}
+        self.resources_version = 0
+
+    def copy(self, game_state):
+        """Fields for a fork of the game: unit fields are dropped (the fork has its own Occupancy)."""
+        clone = FlowFields(game_state)
+        clone.fields = {key: field for key, field in self.fields.items() if key[0] != 'units'}
+        clone.resources_version = self.resources_version
+        return clone
+
+    def targets(self, key) -> list[int]:
+        game_state = self.game_state
+        game_map = game_state.map
+        if key == RESOURCES:
+            bases = (game_map.base1_id, game_map.base2_id)
+            return [vertex for vertex, amount in enumerate(game_map.resource_counts) if amount > 0 and vertex not in bases]
+        if key == SPARKS:
+            return list(game_state.spark_points)
+        kind, arg = key
+        if kind == 'base':
+            return [game_map.base1_id if arg == 'p1' else game_map.base2_id]
+        if kind == 'spot':
+            return [arg]
+        return sorted(game_state.occupancy.occupied[arg])
+
+    def version(self, key) -> int:
+        if key == RESOURCES:
+            return self.resources_version
+        if key[0] == 'units':
+            return self.game_state.occupancy.versions[key[1]]
+        return 0
+
+    def field(self, key) -> FlowField:
+        """Up-to-date field of key (RESOURCES, SPARKS, base(player_id), units(player_id) or spot(vertex))."""
+        field = self.fields.get(key)
+        version = self.version(key)
+        if field is None or field.version != version or field.topology is not self.game_state.map.targets:
+            field = self.fields[key] = FlowField(self.game_state.map, self.targets(key), version)
+        return field
+
+    def next_hop(self, key, vertex: int):
+        return self.field(key).next_hop(vertex)
+
+    def distance(self, key, vertex: int):
+        return self.field(key).distance(vertex)
+
+    def nearest_resource(self, vertex: int):
+        """Closest vertex with resources left (None if there is none)."""
+        return self.field(RESOURCES).nearest(vertex)
+
+    def bump_resources(self):
+        self.resources_version += 1
+        self.game_state.record(self.bump_resources)     #undoing a depletion changes the target set back
+
+    def resources_changed(self, game_map, data, vertex: int, old, new):
+        """Map listener: the resource target set changes only when a vertex gets emptied or refilled."""
+        if data is game_map.resource_counts and (old > 0) != (new > 0):
+            self.bump_resources()
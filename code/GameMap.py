@@ -1,4 +1,7 @@
 from pathlib import Path
+from array import array
+import copy
+import itertools
 
 class AbstractMap:
     """
@@ -119,77 +122,386 @@ class AbstractMap:
 
     @classmethod
     def from_file(cls, filename : Path):
-        """Load ABSTRACT map (no expansion)."""
+        """
+        Load ABSTRACT map (no expansion), streaming the file line by line in O(E).
+        Every format error is collected and raised at once as a MapFormatError.
+        """
         temp_edges = set()
+        edge_keys = {}          #{(min(u, v), max(u, v)): distance}, for O(1) duplicate detection
         temp_resources = {}
         temp_sparking_spots = {}
         grid_matrix = []
+        first_seen = {}         #{road endpoint: line number}, checked once vertices are declared
+        errors = []
 
         with open(filename, "r", encoding="utf-8") as f:
-            header = f.readline().strip().split()
-            nb_roads, nb_vertices, base1, base2 = header
+            lines = ((line_no, line.split()) for line_no, line in enumerate(f, 1))
+            lines = ((line_no, parts) for line_no, parts in lines if parts)
 
-            for _ in range(int(nb_roads)):
-                u, v, dist = f.readline().strip().split()
-                dist = int(dist)
-
-                norm_u, norm_v = min(u, v), max(u, v)
-                edge_exists = False
-
-                for existing_u, existing_v, existing_dist in temp_edges:
-                    if min(existing_u, existing_v) == norm_u and max(existing_u, existing_v) == norm_v:
-                        print(f"Warning: duplicate edge {norm_u}-{norm_v}")
-                        edge_exists = True
-                        break
-
-                if not edge_exists:
-                    temp_edges.add((norm_u, norm_v, dist))
-
-            for line in f:
-                if line.strip():
-                    parts = line.strip().split()
-                    if len(parts) == 3:
-                        vertex, quantity, sparking = parts
-                        temp_resources[vertex] = int(quantity)
-                        temp_sparking_spots[vertex] = True if sparking == '1' else False
-                        
+            header_line, header = next(lines, (1, []))
+            if len(header) != 4:
+                raise MapFormatError(filename, [(header_line, "header must be 'nb_roads nb_vertices base1 base2'")])
+            nb_roads, nb_vertices, base1, base2 = header
+            if not (nb_roads.isdigit() and nb_vertices.isdigit()):
+                raise MapFormatError(filename, [(header_line, "road and vertex counts must be integers")])
+            nb_roads, nb_vertices = int(nb_roads), int(nb_vertices)
+
+            roads = 0
+            for line_no, parts in itertools.islice(lines, nb_roads):
+                roads += 1
+                if len(parts) != 3 or not parts[2].isdigit():
+                    errors.append((line_no, f"road {roads}/{nb_roads}: expected 'u v distance'"))
+                else:
+                    u, v, dist = parts
+                    dist = int(dist)
+                    norm_u, norm_v = min(u, v), max(u, v)
+                    if dist < 1:
+                        errors.append((line_no, f"road {norm_u}-{norm_v} has distance {dist}"))
+                    elif u == v:
+                        errors.append((line_no, f"road {u}-{v} is a loop"))
+                    elif (norm_u, norm_v) in edge_keys:
+                        if edge_keys[(norm_u, norm_v)] != dist:
+                            errors.append((line_no, f"duplicate edge {norm_u}-{norm_v} with another distance"))
+                        else:
+                            print(f"Warning: duplicate edge {norm_u}-{norm_v} (line {line_no})")
                     else:
-                        grid_matrix.append(parts)
+                        edge_keys[(norm_u, norm_v)] = dist
+                        temp_edges.add((norm_u, norm_v, dist))
+                        first_seen.setdefault(u, line_no)
+                        first_seen.setdefault(v, line_no)
+            if roads < nb_roads:
+                errors.append((header_line, f"header announces {nb_roads} roads, found {roads}"))
+
+            grid_lines = []
+            for line_no, parts in lines:
+                if len(parts) == 3:
+                    vertex, quantity, sparking = parts
+                    if vertex in temp_resources:
+                        errors.append((line_no, f"vertex {vertex} declared twice"))
+                    if not quantity.isdigit() or sparking not in ('0', '1'):
+                        errors.append((line_no, f"vertex {vertex}: expected 'vertex quantity 0|1'"))
+                        continue
+                    temp_resources[vertex] = int(quantity)
+                    temp_sparking_spots[vertex] = True if sparking == '1' else False
+                else:
+                    grid_matrix.append(parts)
+                    grid_lines.append(line_no)
+
+        if len(temp_resources) != nb_vertices:
+            errors.append((header_line, f"header announces {nb_vertices} vertices, found {len(temp_resources)}"))
+        for vertex, line_no in first_seen.items():
+            if vertex not in temp_resources:
+                errors.append((line_no, f"road endpoint {vertex} is not a declared vertex"))
+        for base in (base1, base2):
+            if base not in temp_resources:
+                errors.append((header_line, f"base {base} is not a declared vertex"))
+        for line_no, row in zip(grid_lines, grid_matrix):
+            unknown = [cell for cell in row if cell != '0' and cell not in temp_resources]
+            if unknown:
+                errors.append((line_no, f"grid cells {', '.join(unknown)} are not declared vertices"))
+        if not errors and not cls.connected(edge_keys, base1, base2):
+            errors.append((header_line, f"bases {base1} and {base2} are not connected"))
+        if errors:
+            raise MapFormatError(filename, sorted(errors))
+
         instance = cls(temp_edges, temp_resources, temp_sparking_spots, base1, base2)
         instance.grid_matrix = grid_matrix
         return instance
 
+    @staticmethod
+    def connected(edge_keys, source: str, target: str) -> bool:
+        """Whether target is reachable from source through the roads (iterative DFS, O(V + E))."""
+        adjacency = {}
+        for u, v in edge_keys:
+            adjacency.setdefault(u, []).append(v)
+            adjacency.setdefault(v, []).append(u)
+        seen = {source}
+        stack = [source]
+        while stack:
+            vertex = stack.pop()
+            if vertex == target:
+                return True
+            for neighbor in adjacency.get(vertex, ()):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return False
+
+
+class MapFormatError(ValueError):
+    """Invalid map file; errors is the list of every (line number, message) found."""
+
+    def __init__(self, filename, errors: list[tuple[int, str]]):
+        self.filename = filename
+        self.errors = errors
+        super().__init__("\n".join([f"{filename}: {len(errors)} error(s)",
+                                     *(f"  line {line_no}: {message}" for line_no, message in errors)]))
+
+class VertexAttribute:
+    """
+    String-keyed view over an array indexed by vertex ID.
+    Keeps the dict API (map.resources["v1"] -= 1) while the data lives in a flat array.
+    """
+
+    def __init__(self, game_map, data, cast=int):
+        self.map = game_map
+        self.data = data
+        self.cast = cast
+
+    def __getitem__(self, vertex: str):
+        return self.cast(self.data[self.map.vertex_ids[vertex]])
+
+    def __setitem__(self, vertex: str, value):
+        self.map.set_value(self.data, self.map.vertex_ids[vertex], value)
+
+    def __contains__(self, vertex):
+        return vertex in self.map.vertex_ids
+
+    def __iter__(self):
+        return iter(self.map.vertex_names)
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, vertex: str, default=None):
+        i = self.map.vertex_ids.get(vertex)
+        return default if i is None else self.cast(self.data[i])
+
+    def keys(self):
+        return self.map.vertex_ids.keys()
+
+    def values(self):
+        return [self.cast(value) for value in self.data]
+
+    def items(self):
+        return [(vertex, self.cast(value)) for vertex, value in zip(self.map.vertex_names, self.data)]
+
+    def copy(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"VertexAttribute({self.copy()!r})"
+
+
+def _vertex_ids(game_map) -> dict:
+    return {name: i for i, name in enumerate(game_map.vertex_names)}
+
+
+def _base1(game_map) -> str:
+    return game_map.vertex_names[game_map.base1_id]
+
+
+def _base2(game_map) -> str:
+    return game_map.vertex_names[game_map.base2_id]
+
+
 class Map:
     """
     EXPANDED map for unit movement (distance=1 everywhere).
     Inherits visualization from AbstractMap.
+
+    Vertices are interned to dense integer IDs: vertex_names[id] <-> vertex_ids[name].
+    Topology is a CSR adjacency (neighbors of i = targets[offsets[i]:offsets[i+1]]),
+    resources and sparking flags are arrays indexed by ID.
+    Attributes listed in self.lazy (vertex_ids, and more for compiled maps) are built on first use.
     """
 
     def __init__(self, edges: set[tuple[str, str]], resources: dict[str, int],
                  sparking_spots: dict[str, bool], base1: str, base2: str):
-        self.edges = edges  # (u, v) distance=1
-        self.resources = resources
-        self.sparking_spots = sparking_spots
-        self.base1 = base1
-        self.base2 = base2
+        names = list(dict.fromkeys([*resources, *sparking_spots,
+                                    *(vertex for edge in sorted(edges) for vertex in edge),
+                                    base1, base2]))
+        ids = {name: i for i, name in enumerate(names)}
+        self.init_arrays(names,
+                         *self.build_csr(len(names), [(ids[u], ids[v]) for u, v in edges]),
+                         array("l", (resources.get(name, 0) for name in names)),
+                         array("b", (bool(sparking_spots.get(name, False)) for name in names)),
+                         ids[base1], ids[base2], ids)
+
+    def init_arrays(self, vertex_names: list[str], offsets, targets, resource_counts: array,
+                    sparking_flags, base1_id: int, base2_id: int, vertex_ids: dict = None, lazy: dict = None):
+        """
+        offsets/targets: CSR adjacency (see build_csr), any int sequence (array, memoryview, ...).
+        lazy: {attribute: builder(map)} for attributes to build on first use instead (vertex_names, ...).
+        """
+        self.vertex_names = vertex_names
+        self.vertex_ids = vertex_ids
+        self.offsets, self.targets = offsets, targets
+        self.road_cells = {}  # {cell ID: (u, v, step)} for the intermediate cells of expanded roads
+        self.resource_counts = resource_counts
+        self.sparking_flags = sparking_flags
+        self.resources = VertexAttribute(self, resource_counts)
+        self.sparking_spots = VertexAttribute(self, sparking_flags, bool)
+        self.base1_id = base1_id
+        self.base2_id = base2_id
         self.is_expanded = True
         self.abstract_map = None  # Cache pour visualisation
+        self.source = None  # Map file, used as cache key
+        self.distance_engine = None  # Optional O(1) distance lookups (see DistanceTable)
+        self.balls = {}  # {(vertex_id, radius): frozenset of vertex IDs within radius hops}, filled on first use
+        self.journal = None  # Undo log of resource changes (see GameState.apply)
+        self.listeners = []  # Called as listener(map, data, vertex, old, new) after set_value
+
+        self.lazy = {'vertex_ids': _vertex_ids, 'base1': _base1, 'base2': _base2, **(lazy or {})}
+        if vertex_ids is not None:
+            del self.lazy['vertex_ids']
+        for name in self.lazy:
+            self.__dict__.pop(name, None)
+
+    def __getattr__(self, name):
+        """Build a lazy attribute on first use; it is a plain attribute from then on."""
+        builder = self.__dict__.get('lazy', {}).get(name)
+        if builder is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        value = self.__dict__[name] = builder(self)
+        return value
+
+    def fork(self):
+        """Copy sharing the static topology, tables and caches; only resources are copied."""
+        clone = copy.copy(self)
+        clone.resource_counts = array(self.resource_counts.typecode, self.resource_counts)
+        clone.resources = VertexAttribute(clone, clone.resource_counts)
+        clone.sparking_spots = VertexAttribute(clone, clone.sparking_flags, bool)
+        clone.journal = None
+        clone.listeners = []
+        return clone
+
+    def set_value(self, data, vertex: int, value):
+        """Write a per-vertex value (resources, ...), recording it in the journal if any."""
+        old = data[vertex]
+        if self.journal is not None:
+            self.journal.append((data.__setitem__, (vertex, old)))
+        data[vertex] = value
+        for listener in self.listeners:
+            listener(self, data, vertex, old, value)
+
+    def add_resources(self, vertex: int, amount: int):
+        self.set_value(self.resource_counts, vertex, self.resource_counts[vertex] + amount)
+
+    @classmethod
+    def from_arrays(cls, vertex_names: list[str], edge_ids, resource_counts: array,
+                    sparking_flags: array, base1_id: int, base2_id: int):
+        """Build a map directly from integer data, without going through string dicts."""
+        map_obj = cls.__new__(cls)
+        map_obj.init_arrays(vertex_names, *cls.build_csr(len(vertex_names), edge_ids),
+                            resource_counts, sparking_flags, base1_id, base2_id)
+        return map_obj
 
+    @staticmethod
+    def build_csr(nb_vertices: int, edge_ids) -> tuple[array, array]:
+        """Build the undirected CSR adjacency once, so lookups cost O(degree)."""
+        pairs = {(min(u, v), max(u, v)) for u, v in edge_ids if u != v}
+        degrees = [0] * (nb_vertices + 1)
+        for u, v in pairs:
+            degrees[u + 1] += 1
+            degrees[v + 1] += 1
+        for i in range(nb_vertices):
+            degrees[i + 1] += degrees[i]
+        offsets = array("l", degrees)
+        targets = array("l", bytes(offsets.itemsize * offsets[-1]))
+        cursor = list(offsets[:-1])
+        for u, v in sorted(pairs):
+            targets[cursor[u]] = v
+            cursor[u] += 1
+            targets[cursor[v]] = u
+            cursor[v] += 1
+        return offsets, targets
+
+    @property
+    def edges(self) -> set[tuple[str, str]]:
+        """Unit edges as name pairs (compatibility view built from the CSR adjacency)."""
+        names = self.vertex_names
+        return {(names[u], names[v]) for u, v in self.edge_ids()}
+
+    def edge_ids(self):
+        """Each undirected edge once, as (u, v) with u < v."""
+        for u in range(len(self.vertex_names)):
+            for v in self.targets[self.offsets[u]:self.offsets[u + 1]]:
+                if u < v:
+                    yield u, v
+
+    def vertex_id(self, vertex) -> int:
+        """ID of a vertex given by name or already by ID."""
+        return vertex if isinstance(vertex, int) else self.vertex_ids[vertex]
+
+    def add_edge(self, u: str, v: str):
+        """Add a unit edge and rebuild the adjacency index."""
+        u, v = self.vertex_id(u), self.vertex_id(v)
+        self.offsets, self.targets = self.build_csr(len(self.vertex_names), [*self.edge_ids(), (u, v)])
+        self.distance_engine = None  # Topology changed: precomputed distances are stale
+        self.balls = {}
+
+    def remove_edge(self, u: str, v: str):
+        """Remove a unit edge (in either orientation) and rebuild the adjacency index."""
+        removed = {(self.vertex_id(u), self.vertex_id(v)), (self.vertex_id(v), self.vertex_id(u))}
+        self.offsets, self.targets = self.build_csr(
+            len(self.vertex_names), [edge for edge in self.edge_ids() if edge not in removed])
+        self.distance_engine = None  # Topology changed: precomputed distances are stale
+        self.balls = {}
+
+    def neighbor_ids(self, vertex: int) -> array:
+        """Unit neighbors of a vertex ID, as IDs."""
+        return self.targets[self.offsets[vertex]:self.offsets[vertex + 1]]
 
     def neighbors(self, vertex: str) -> list[str]:
         """Unit neighbors (distance=1)."""
-        outgoing = [v for (u, v) in self.edges if u == vertex]
-        incoming = [u for (u, v) in self.edges if v == vertex]
-        return list(set(outgoing + incoming))
-    
-    def distance(self, u: str, v: str) -> int:
-        """Distance between two vertices using BFS since all edges have weight 1."""
+        i = self.vertex_ids.get(vertex)
+        if i is None:
+            return []
+        return [self.vertex_names[n] for n in self.targets[self.offsets[i]:self.offsets[i + 1]]]
+
+    def ball(self, vertex: int, radius: int) -> frozenset[int]:
+        """IDs of the vertices within radius hops of vertex (itself included), cached."""
+        ball = self.balls.get((vertex, radius))
+        if ball is None:
+            self.precompute_balls(range(radius + 1), [vertex])
+            ball = self.balls[(vertex, radius)]
+        return ball
+
+    def within(self, u: int, v: int, radius: int) -> bool:
+        """distance(u, v) <= radius, answered from the ball index."""
+        return v in self.ball(u, radius)
+
+    def precompute_balls(self, radii, vertices=None):
+        """
+        Cache the ball of every vertex (or of the given ones) for every radius in radii,
+        with a single depth-limited BFS per vertex.
+        """
+        radii = sorted(set(radii))
+        offsets, targets = self.offsets, self.targets
+        for vertex in range(len(self.vertex_names)) if vertices is None else vertices:
+            seen = {vertex}
+            frontier = [vertex]
+            depth = 0
+            ball = frozenset(seen)
+            for radius in radii:
+                while depth < radius and frontier:
+                    next_frontier = []
+                    for u in frontier:
+                        for neighbor in targets[offsets[u]:offsets[u + 1]]:
+                            if neighbor not in seen:
+                                seen.add(neighbor)
+                                next_frontier.append(neighbor)
+                    frontier = next_frontier
+                    depth += 1
+                    if frontier:
+                        ball = None
+                if ball is None:
+                    ball = frozenset(seen)
+                self.balls[(vertex, radius)] = ball  # Equal balls share one frozenset
+
+    def distance(self, u, v) -> int:
+        """Distance between two vertices (names or IDs) using BFS since all edges have weight 1."""
+        u, v = self.vertex_id(u), self.vertex_id(v)
+        if self.distance_engine is not None:
+            return self.distance_engine.distance_ids(u, v)
+
         import math
         from collections import deque
 
-        visited = set()
+        offsets, targets = self.offsets, self.targets
+        visited = {u}
         queue = deque([(u, 0)])  # (vertex, distance)
-        visited.add(u)
 
         while queue:
             vertex, dist = queue.popleft()
@@ -197,7 +509,7 @@ class Map:
             if vertex == v:
                 return dist
 
-            for neighbor in self.neighbors(vertex):
+            for neighbor in targets[offsets[vertex]:offsets[vertex + 1]]:
                 if neighbor not in visited:
                     visited.add(neighbor)
                     queue.append((neighbor, dist + 1))
@@ -205,36 +517,89 @@ class Map:
         return math.inf  # No path found
 
 
-    def is_sparking(self, vertex: str) -> bool:
-        return self.sparking_spots.get(vertex, False)
-    
-    
-    def resources(self, vertex: str) -> int:
-        return self.resources.get(vertex, 0)
+    def precompute_distances(self, cache_dir: Path | None = None, use_cache: bool = True):
+        """
+        Replace BFS by an all-pairs distance table (needs numpy).
+        The table is cached on disk (default ~/.cache/sparkai), keyed by a hash of the map file.
+        """
+        from code.DistanceTable import DistanceTable, DEFAULT_CACHE_DIR
+
+        if not use_cache:
+            cache_dir = None
+        elif cache_dir is None:
+            cache_dir = DEFAULT_CACHE_DIR
+        self.distance_engine = DistanceTable.for_map(self, cache_dir)
+        return self.distance_engine
+
+    def use_road_distances(self):
+        """
+        Answer distances with Dijkstra on the abstract map instead of BFS on the expanded one.
+        Cheaper than precompute_distances() on maps with long roads.
+        """
+        from code.RoadDistance import RoadDistance
+
+        self.distance_engine = RoadDistance(self.abstract_map, self.vertex_ids, self.road_cells)
+        return self.distance_engine
+
+    def is_sparking(self, vertex) -> bool:
+        return bool(self.sparking_flags[self.vertex_id(vertex)])
+
+    def resource_at(self, vertex) -> int:
+        return self.resource_counts[self.vertex_id(vertex)]
 
     @classmethod
-    def from_file(cls, filename : Path):
-        """Load → EXPAND → unit-ready map."""
+    def from_file(cls, filename : Path, precompute_distances: bool = False):
+        """Load → EXPAND → unit-ready map. Compiled maps (see MapCompiler) are memory-mapped instead."""
+        from code.MapCompiler import is_compiled
+
+        if is_compiled(filename):
+            return cls.from_compiled(filename, precompute_distances)
+
         # Charge abstract D'ABORD
         abstract = AbstractMap.from_file(filename)
 
-        # EXPAND
-        final_edges = set()
-        final_resources = abstract.resources.copy()
-        final_sparking_spots = abstract.sparking_spots.copy()
+        # Abstract vertices first (file order), then intermediate cells road by road
+        names = list(dict.fromkeys([*abstract.resources,
+                                    *(vertex for u, v, _ in sorted(abstract.edges) for vertex in (u, v)),
+                                    abstract.base1, abstract.base2]))
+        ids = {name: i for i, name in enumerate(names)}
+        resource_counts = array("l", (abstract.resources.get(name, 0) for name in names))
+        sparking_flags = array("b", (abstract.sparking_spots.get(name, False) for name in names))
 
-        for u, v, dist in abstract.edges:
-            current = u
+        # EXPAND
+        final_edges = []
+        road_cells = {}
+        for u, v, dist in sorted(abstract.edges):
+            current = ids[u]
             for step in range(1, dist):
-                inter_cell = f"{u}_{v}_{step}"
-                final_resources[inter_cell] = 0
-                final_sparking_spots[inter_cell] = False
-                final_edges.add((current, inter_cell))
+                inter_cell = len(names)
+                names.append(f"{u}_{v}_{step}")
+                ids[names[inter_cell]] = inter_cell
+                road_cells[inter_cell] = (u, v, step)
+                final_edges.append((current, inter_cell))
                 current = inter_cell
-            final_edges.add((current, v))
+            final_edges.append((current, ids[v]))
+
+        cells = len(names) - len(resource_counts)
+        resource_counts.extend([0] * cells)
+        sparking_flags.extend(array("b", bytes(cells)))
 
-        map_obj = cls(final_edges, final_resources, final_sparking_spots,
-                      abstract.base1, abstract.base2)
+        map_obj = cls.__new__(cls)
+        map_obj.init_arrays(names, *cls.build_csr(len(names), final_edges), resource_counts, sparking_flags,
+                            ids[abstract.base1], ids[abstract.base2], ids)
+        map_obj.road_cells = road_cells
         map_obj.abstract_map = abstract
+        map_obj.source = Path(filename)
+        if precompute_distances:
+            map_obj.precompute_distances()
         return map_obj
 
+    @classmethod
+    def from_compiled(cls, filename: Path, precompute_distances: bool = False):
+        """Memory-map a map written by MapCompiler.compile_map (near-instant, pages shared across processes)."""
+        from code.MapCompiler import load_compiled
+
+        map_obj = load_compiled(filename, cls)
+        if precompute_distances and map_obj.distance_engine is None:
+            map_obj.precompute_distances()
+        return map_obj
@@ -1,5 +1,11 @@
 from code.GameMap import Map
-import inspect
+from code.Occupancy import Occupancy
+from code.UnitStore import UnitStore
+from code.Effects import EffectScheduler
+from code.SparkPoint import SparkEngine, OWNER_THRESHOLD
+from code.Actions import Action, TurnResult, ACTIONS, PHASES, TARGETS
+from code.Zobrist import Zobrist
+from code.FlowField import FlowFields
 import code.Units as Units
 from pathlib import Path
 from collections import defaultdict
@@ -8,43 +14,294 @@ from collections import defaultdict
 class GameState:
     """Global state of the game."""
 
-    def __init__(self, filename: Path):
+    def __init__(self, filename: Path, columnar: bool = False, spark_threshold: float = OWNER_THRESHOLD):
         self.map = Map.from_file(filename)
+        self.store = UnitStore(vectorized=columnar)      #unit attributes, one row per unit (NumPy columns if columnar)
+        self.effects = EffectScheduler(self.store)       #timed effects and boost multipliers
         self.units = defaultdict(list)
         self.scores = {'p1': 0, 'p2': 0}
-        self.spark_points = defaultdict(list)       #{p1: [unit1, unit2, ...], p2: [unit1, unit2, ...}
+        self.sparks = SparkEngine(self, spark_threshold)       #values, control and scoring of every spark point
+        self.spark_points = self.sparks.points      #{vertex_id: SparkPoint}
+        self.units_by_id = {}       #{unit_id: unit}
         self.unit_created = defaultdict(lambda: defaultdict(int))     #{p1: {minor: 1, transporter: 3, ...} p2: ...}
-        self.unit_registry = self.scan_all_classes()
+        self.unit_registry = Units.UNIT_REGISTRY     #{subtype: unit class}, shared by every game
+        self.occupancy = Occupancy()      #{(vertex_id, player_id): units}
+        self.zobrist = Zobrist(self)     #incremental hash of the state
+        self.map.listeners.append(self.zobrist.vertex_value_changed)
+        self.flow = FlowFields(self)     #distance fields and next hops towards resources, bases, sparks and units
+        self.map.listeners.append(self.flow.resources_changed)
+        self.journal = None      #undo log of the turn being applied, see apply()
+        self.undo_stack = []     #one journal per applied turn
 
-    def scan_all_classes(self):
-        """Scan all classes in this module and return a registry of unit types."""
+    @property
+    def hash(self) -> int:
+        '''64-bit Zobrist hash of the state (see code/Zobrist.py).'''
+
+        return self.zobrist.hash
+
+    def fork(self):
+        '''
+        Independent copy for lookahead search. The map topology, distance tables and caches are shared;
+        units, resources, effects, spark values, scores and unit_created are copied.
+        '''
+
+        clone = GameState.__new__(GameState)
+        clone.map = self.map.fork()
+        clone.unit_registry = self.unit_registry
+        clone.store = self.store.copy()
+        clone.units = defaultdict(list)
+        clone.units_by_id = {}
+        clone.occupancy = Occupancy()
+        for player_id, player_units in self.units.items():
+            for unit in player_units:
+                view = unit.fork(clone)
+                clone.units[player_id].append(view)
+                clone.units_by_id[view.id] = view
+                clone.store.units[view.slot] = view
+                clone.occupancy.add(view)
+        clone.effects = self.effects.copy(clone.store)
+        clone.scores = dict(self.scores)
+        clone.unit_created = defaultdict(lambda: defaultdict(int),
+                                         {player_id: defaultdict(int, created) for player_id, created in self.unit_created.items()})
+        clone.sparks = self.sparks.copy(clone)
+        clone.spark_points = clone.sparks.points
+        clone.zobrist = self.zobrist.copy()
+        clone.map.listeners.append(clone.zobrist.vertex_value_changed)
+        clone.flow = self.flow.copy(clone)
+        clone.map.listeners.append(clone.flow.resources_changed)
+        clone.journal = None
+        clone.undo_stack = []
+        return clone
+
+    def record(self, undo, *args):
+        '''Log how to revert a mutation, while a turn is being applied.'''
+
+        if self.journal is not None:
+            self.journal.append((undo, args))
 
-        registry = {}
-        for name, obj in inspect.getmembers(Units, inspect.isclass):
-            unit_type = name.lower()
-            registry[unit_type] = obj
-        return registry
+    def set_journal(self, journal):
+        self.journal = self.store.journal = self.effects.journal = self.map.journal = self.zobrist.journal = journal
 
+    def apply(self, actions_p1: list, actions_p2: list):
+        '''step() that can be reverted with undo(), without copying the state.'''
+
+        journal = []
+        self.set_journal(journal)
+        try:
+            result = self.step(actions_p1, actions_p2)
+        finally:
+            self.set_journal(None)
+        self.undo_stack.append(journal)
+        return result
+
+    def undo(self):
+        '''Revert the last apply().'''
+
+        for undo, args in reversed(self.undo_stack.pop()):
+            undo(*args)
 
     @property
+    def turn(self):
+        return self.effects.turn
 
     def add_score(self, player_id: str, score: int):
         '''Add the given score to the score of the given player.'''
 
+        self.record(self.scores.__setitem__, player_id, self.scores.get(player_id, 0))
         self.scores[player_id] = self.scores.get(player_id, 0) + score
 
 
     def update_death(self):
-        '''Remove dead units from the game state.'''
+        '''Remove dead units from the game state. Returns their IDs.'''
+
+        dead_slots = self.store.dead_slots()
+        if not dead_slots:
+            return []
+        dead = []
+        for player_id, player_units in self.units.items():
+            self.record(player_units.__setitem__, slice(None), list(player_units))
+        for slot in dead_slots:
+            unit = self.store.units[slot]
+            self.record(self.revive, unit)
+            dead.append(unit.id)
+            del self.units_by_id[unit.id]
+            self.occupancy.remove(unit)
+            self.zobrist.remove_unit(unit)
+            self.effects.clear(slot)
+            self.store.release(unit.handle)
+        for player_units in self.units.values():
+            player_units[:] = [unit for unit in player_units if unit.store.units[unit.slot] is unit]
+        return dead
 
-        for unit in self.units:
-            if not unit.is_alive:
-                self.units.pop(unit)
+
+    def revive(self, unit):
+        '''Undo the removal of a dead unit (its store row is restored separately).'''
+
+        self.units_by_id[unit.id] = unit
+        self.occupancy.add(unit)
+
+
+    def end_turn(self):
+        '''Turn-wide bookkeeping: effects, cooldowns, health clamping and death sweep.'''
+
+        self.effects.advance()
+        self.store.tick_cooldowns()
+        for slot in self.store.clamp_health():
+            if self.store.units[slot] is not None:
+                self.zobrist.update_unit(self.store.units[slot])
+        return self.update_death()
 
     def new_unit(self, player_id : str, unit_type : str):
         '''Create a new unit of the given type for the given player.'''
 
+        created = self.unit_created[player_id]
+        if unit_type in created:
+            self.record(created.__setitem__, unit_type, created[unit_type])
+        else:
+            self.record(created.pop, unit_type)
         self.unit_created[player_id][unit_type] = self.unit_created.get(player_id, {}).get(unit_type, 0) + 1
         unit_id = f'{player_id}_{unit_type}_{self.unit_created[player_id][unit_type]}'
         UnitClass = self.unit_registry[unit_type]
-        self.units[player_id].append(UnitClass(self, player_id, unit_id))
\ No newline at end of file
+        unit = UnitClass(self, player_id, unit_id)
+        self.units[player_id].append(unit)
+        self.units_by_id[unit_id] = unit
+        self.occupancy.add(unit)
+        self.zobrist.add_unit(unit)
+        self.record(self.unspawn, unit)
+        return unit
+
+    def unspawn(self, unit):
+        '''Undo new_unit (its store row is released separately).'''
+
+        self.units[unit.player_id].remove(unit)
+        del self.units_by_id[unit.id]
+        self.occupancy.remove(unit)
+
+
+    def units_within(self, vertex: int, radius: int, player_id: str) -> list:
+        '''Units of player_id within radius hops of vertex.'''
+
+        return self.occupancy.units_within(self.map.ball(vertex, radius), player_id)
+
+
+    def check_action(self, player_id: str, action: Action):
+        '''Validate an action against the current state. Returns (unit, target), raises AssertionError.'''
+
+        assert isinstance(action, (tuple, list)), "Action not a tuple"
+        unit_id, name, target = (*action, None, None, None)[:3]
+        assert isinstance(name, str) and name in ACTIONS, f"Unknown action {name}"
+        assert unit_id is None or isinstance(unit_id, str), "Unit ID not a string"
+        assert target is None or isinstance(target, (str, int)), "Target not a name or an ID"
+        _, target_kind, needs_ready = ACTIONS[name]
+
+        if name == 'spawn':
+            assert target in self.unit_registry, f"Unknown unit type {target}"
+            return None, target
+
+        unit = self.units_by_id.get(unit_id)
+        assert unit is not None and unit.is_alive, f"Unknown unit {unit_id}"
+        assert unit.player_id == player_id, "Unit not owned by player"
+        assert callable(getattr(unit, name, None)), f"{unit.subtype} cannot {name}"
+        assert not needs_ready or unit.wait == 0, "Unit is waiting"
+
+        if target_kind == 'vertex':
+            target = self.map.vertex_ids.get(target, target)
+            assert isinstance(target, int) and 0 <= target < len(self.map.vertex_names), "Unknown vertex"
+            if name == 'move':
+                assert self.map.within(unit.vertex, target, int(unit.speed * unit.get_multiplier('speed'))), "Impossible move"
+        elif target_kind == 'unit':
+            target = self.units_by_id.get(target)
+            assert target is not None, "Unknown target"
+            if TARGETS[name] == 'enemy':
+                assert target.player_id != player_id, "Target not an enemy"
+            else:
+                assert target.player_id == player_id, "Target not owned by player"
+        return unit, target
+
+
+    def step(self, actions_p1: list, actions_p2: list) -> TurnResult:
+        '''
+        Resolve one full turn: validate every action in one pass, then resolve
+        spawn → move → combat → economy phases, score spark points, expire effects and apply deaths.
+        Invalid actions are skipped and reported in the result.
+        '''
+
+        phases = {phase: [] for phase in PHASES}
+        rejected = []
+        acted = set()
+        for player_id, actions in (('p1', actions_p1), ('p2', actions_p2)):
+            for action in actions:
+                try:
+                    unit, target = self.check_action(player_id, action)
+                    assert unit is None or unit.id not in acted, "Unit already acted"
+                except AssertionError as error:
+                    rejected.append((player_id, action, str(error)))
+                    continue
+                if unit is not None:
+                    acted.add(unit.id)
+                phases[ACTIONS[action[1]][0]].append((player_id, action, unit, target))
+
+        spawned = []
+        for player_id, action, _, unit_type in phases['spawn']:
+            spawned.append(self.new_unit(player_id, unit_type).id)
+
+        for phase in PHASES[1:]:
+            for player_id, action, unit, target in phases[phase]:
+                method = getattr(unit, action[1])
+                try:
+                    # Targets are checked again: they may have moved during the move phase
+                    method() if ACTIONS[action[1]][1] is None else method(target)
+                except AssertionError as error:
+                    rejected.append((player_id, action, str(error)))
+
+        self.sparks.update()
+
+        deaths = self.end_turn()
+        return TurnResult(self.turn, dict(self.scores), spawned, deaths, rejected)
+
+    def legal_actions(self, player_id: str) -> dict:
+        '''
+        Every legal action of a player, without trying them: {unit_id: (Action, ...)},
+        plus spawns under the None key. Vertex targets are given as vertex IDs.
+        '''
+
+        enemy_id = 'p2' if player_id == 'p1' else 'p1'
+        ball = self.map.ball
+        occupancy = self.occupancy
+        legal = {None: tuple(Action(None, 'spawn', unit_type) for unit_type in self.unit_registry)}
+
+        for unit in self.units[player_id]:
+            if not unit.is_alive:
+                continue
+            vertex = unit.vertex
+            actions = [Action(unit.id, 'move', v)
+                       for v in ball(vertex, int(unit.speed * unit.get_multiplier('speed'))) if v != vertex]
+
+            if unit.type == "worker":
+                if unit.load < unit.capacity and self.map.resource_counts[vertex] > 0:
+                    actions.append(Action(unit.id, 'extract'))
+                if vertex == (self.map.base1_id if player_id == 'p1' else self.map.base2_id):
+                    actions.append(Action(unit.id, 'drop'))
+                if unit.load > 0:
+                    actions += [Action(unit.id, 'give_to', other.id) for other in occupancy.units_at(vertex, player_id)
+                                if other is not unit and other.type == "worker" and other.available_space > 0]
+
+            elif unit.wait == 0:
+                actions += [Action(unit.id, 'attack', enemy.id)
+                            for enemy in occupancy.units_within(ball(vertex, unit.range), enemy_id)]
+                if hasattr(unit, 'longshot'):
+                    actions += [Action(unit.id, 'longshot', enemy.id)
+                                for enemy in occupancy.units_within(ball(vertex, unit.range * 2), enemy_id)]
+                if hasattr(unit, 'heal'):
+                    actions += [Action(unit.id, 'heal', ally.id)
+                                for ally in occupancy.units_within(ball(vertex, unit.healing_range), player_id)
+                                if ally.health < ally.max_health]
+                if hasattr(unit, 'protect'):
+                    actions += [Action(unit.id, 'protect', ally.id) for ally in self.units[player_id]]
+                if hasattr(unit, 'boost'):
+                    actions += [Action(unit.id, 'boost', ally.id) for ally in self.units[player_id] if ally.type == "army"]
+                actions += [Action(unit.id, name) for name in ('heal_burst', 'boost_burst', 'spark_burst')
+                            if hasattr(unit, name)]
+
+            legal[unit.id] = tuple(actions)
+        return legal
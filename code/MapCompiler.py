@@ -0,0 +1,204 @@
+"""
+Compiled binary map format.
+
+    python -m code.MapCompiler examples/small.txt -o small.spkmap --distances
+
+A compiled map holds the EXPANDED map ready to use: CSR adjacency, vertex names, resources,
+sparking flags, bases, the abstract roads, the road and step of every intermediate cell, the
+grid (for visualization / road distances) and optionally the all-pairs distance table, all as
+binary sections. Loading memory-maps the file: the adjacency, flags and tables are used in place,
+only resources (which change during a game) are copied, and every process loading the same file
+shares the same pages. The header is a few fields; vertex names, the name -> ID index, road
+cells, the abstract map and the distance table are decoded from their sections on first use.
+
+Layout (little-endian):
+    MAGIC (8 bytes) | version (uint32) | header length (uint32) | JSON header | sections
+Each section starts on an 8-byte boundary; the header gives its offset, size and format.
+"""
+from pathlib import Path
+from array import array
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from code.GameMap import AbstractMap, Map
+
+MAGIC = b"SPKMAP\0\0"
+FORMAT_VERSION = 3
+PREFIX = struct.Struct("<8sII")     #magic, version, header length
+ALIGN = 8
+GRID_HOLE = -1      #'0' cell of the grid
+GRID_GAP = -2       #past the end of a shorter grid row
+
+
+def is_compiled(filename: Path) -> bool:
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def source_hash(filename: Path) -> str:
+    with open(filename, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_map(src: Path, dst: Path = None, distances: bool = False) -> Path:
+    """Expand the text map src and write it to dst (default: src with a .spkmap suffix)."""
+    src = Path(src)
+    dst = Path(dst) if dst is not None else src.with_suffix(".spkmap")
+    game_map = Map.from_file(src)
+    abstract = game_map.abstract_map
+    ids = game_map.vertex_ids
+    nb_abstract = len(abstract.resources)
+    assert game_map.vertex_names[:nb_abstract] == list(abstract.resources), "Abstract vertices come first"
+
+    # Roads as (u, v, length) vertex IDs; each intermediate cell as (road index, step)
+    roads = sorted(abstract.edges)
+    road_index = {(u, v): r for r, (u, v, _) in enumerate(roads)}
+    cells = [game_map.road_cells[cell] for cell in range(nb_abstract, len(game_map.vertex_names))]
+    rows, cols = len(abstract.grid_matrix), max((len(row) for row in abstract.grid_matrix), default=0)
+    grid = array("q", [GRID_GAP] * (rows * cols))      #vertex ID, GRID_HOLE for '0'
+    for i, row in enumerate(abstract.grid_matrix):
+        for j, vertex in enumerate(row):
+            grid[i * cols + j] = GRID_HOLE if vertex == '0' else ids[vertex]
+
+    sections = {
+        'offsets': ('q', array("q", game_map.offsets).tobytes()),
+        'targets': ('q', array("q", game_map.targets).tobytes()),
+        'resources': ('q', array("q", game_map.resource_counts).tobytes()),
+        'sparking': ('b', array("b", game_map.sparking_flags).tobytes()),
+        'names': ('utf-8', "\n".join(game_map.vertex_names).encode("utf-8")),
+        'roads': ('q', array("q", (x for u, v, dist in roads for x in (ids[u], ids[v], dist))).tobytes()),
+        'cell_roads': ('q', array("q", (road_index[(u, v)] for u, v, _ in cells)).tobytes()),
+        'cell_steps': ('q', array("q", (step for _, _, step in cells)).tobytes()),
+        'grid': ('q', grid.tobytes()),
+    }
+    if distances:
+        from code.DistanceTable import DistanceTable
+
+        matrix = DistanceTable.compute(game_map.offsets, game_map.targets, len(game_map.vertex_names))
+        sections['distances'] = (matrix.dtype.str, matrix.tobytes())
+
+    header = {
+        'nb_vertices': len(game_map.vertex_names),
+        'base1': game_map.base1_id,
+        'base2': game_map.base2_id,
+        'source': src.name,
+        'source_sha256': source_hash(src),
+        'nb_abstract': nb_abstract,
+        'grid_shape': [rows, cols],
+        'sections': {},
+    }
+
+    # The header holds the section offsets, which depend on the header size: lay out until stable
+    start = 0
+    while True:
+        offset = start
+        for name, (fmt, data) in sections.items():
+            header['sections'][name] = [offset, len(data), fmt]
+            offset = -(-(offset + len(data)) // ALIGN) * ALIGN
+        encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        data_start = -(-(PREFIX.size + len(encoded)) // ALIGN) * ALIGN
+        if data_start == start:
+            break
+        start = data_start
+
+    tmp_file = dst.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, (fmt, data) in sections.items():
+            f.write(bytes(header['sections'][name][0] - f.tell()))
+            f.write(data)
+    tmp_file.replace(dst)  # atomic: concurrent workers never map a partial file
+    return dst
+
+
+def read_header(mapped) -> dict:
+    magic, version, header_length = PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a compiled map")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Compiled map version {version} unsupported (expected {FORMAT_VERSION}), recompile it")
+    return json.loads(bytes(mapped[PREFIX.size:PREFIX.size + header_length]))
+
+
+def load_compiled(filename: Path, cls=Map) -> Map:
+    """
+    Map from a compiled file. Adjacency and sparking flags are read-only views over the mapping;
+    resources change during a game, so they are the only section copied. Everything keyed by
+    vertex name is decoded lazily (see Map.lazy).
+    """
+    with open(filename, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(mapped)
+    view = memoryview(mapped)
+    n = header['nb_vertices']
+    nb_abstract = header['nb_abstract']
+
+    def section(name):
+        offset, size, fmt = header['sections'][name]
+        data = view[offset:offset + size]
+        return data if fmt == 'utf-8' else data.cast(fmt)
+
+    def vertex_names(game_map):
+        return str(section('names'), "utf-8").split("\n") if n else []
+
+    def road_cells(game_map):
+        names, roads = game_map.vertex_names, section('roads')
+        return {cell: (names[roads[3 * road]], names[roads[3 * road + 1]], step)
+                for cell, road, step in zip(range(nb_abstract, n), section('cell_roads'), section('cell_steps'))}
+
+    def abstract_map(game_map):
+        names, roads = game_map.vertex_names, section('roads')
+        abstract_names = names[:nb_abstract]
+        resources, sparking = section('resources'), game_map.sparking_flags       #initial resources
+        abstract = AbstractMap({(names[roads[i]], names[roads[i + 1]], roads[i + 2]) for i in range(0, len(roads), 3)},
+                               {name: resources[i] for i, name in enumerate(abstract_names)},
+                               {name: bool(sparking[i]) for i, name in enumerate(abstract_names)},
+                               game_map.base1, game_map.base2)
+        rows, cols = header['grid_shape']
+        grid = section('grid')
+        abstract.grid_matrix = [['0' if vertex == GRID_HOLE else names[vertex]
+                                 for vertex in grid[i * cols:(i + 1) * cols] if vertex != GRID_GAP] for i in range(rows)]
+        return abstract
+
+    def distance_engine(game_map):
+        import numpy as np
+        from code.DistanceTable import DistanceTable
+
+        offset, size, dtype = header['sections']['distances']
+        matrix = np.frombuffer(mapped, dtype=dtype, count=n * n, offset=offset).reshape(n, n)
+        return DistanceTable(game_map.vertex_names, matrix)
+
+    lazy = {'vertex_names': vertex_names, 'road_cells': road_cells, 'abstract_map': abstract_map}
+    if 'distances' in header['sections']:
+        lazy['distance_engine'] = distance_engine
+    map_obj = cls.__new__(cls)
+    map_obj.init_arrays(None, section('offsets'), section('targets'), array("l", section('resources')),
+                        section('sparking'), header['base1'], header['base2'], lazy=lazy)
+    map_obj.source = Path(filename)
+    return map_obj
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile text maps to the binary format loaded with mmap.")
+    parser.add_argument('maps', nargs='+', type=Path)
+    parser.add_argument('-o', '--out', type=Path, help="output file (single map) or directory")
+    parser.add_argument('--distances', action='store_true', help="embed the all-pairs distance table")
+    args = parser.parse_args(argv)
+
+    for src in args.maps:
+        dst = args.out
+        if dst is not None and (dst.is_dir() or len(args.maps) > 1):
+            dst.mkdir(parents=True, exist_ok=True)
+            dst = dst / src.with_suffix(".spkmap").name
+        dst = compile_map(src, dst, args.distances)
+        print(f"{src} -> {dst} ({dst.stat().st_size} bytes)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Seeded procedural maps in the text format of examples/small.txt.
+
+    python -m code.MapGenerator --rows 64 --cols 64 --seed 7 -o maps/64x64.txt
+
+Vertices sit on a rows x cols grid (holes allowed with fill < 1); roads join grid neighbours.
+A random spanning tree keeps every vertex reachable, then a fraction of the remaining
+neighbour pairs is added as extra roads. The bases are the first and last vertices of the grid.
+"""
+from pathlib import Path
+import argparse
+import random
+
+
+def generate_map(path: Path, rows: int, cols: int, seed: int = 0, min_road: int = 1, max_road: int = 5,
+                 resource_density: float = 0.5, max_resources: int = 10, spark_spots: int = 2,
+                 extra_roads: float = 0.3, fill: float = 1.0) -> Path:
+    """Write a random connected map to path and return path. Same arguments, same file."""
+    if cols == 3:
+        raise ValueError("3-column grid rows would be read as vertex lines, use another width")
+    rng = random.Random(seed)
+
+    grid = [[f"v{i * cols + j + 1}" if rng.random() < fill else '0' for j in range(cols)] for i in range(rows)]
+    grid[0][0] = "v1"
+    grid[-1][-1] = f"v{rows * cols}"
+    vertices = [vertex for row in grid for vertex in row if vertex != '0']
+    if len(vertices) < 2:
+        raise ValueError("A map needs at least two vertices")
+
+    # Neighbour pairs: next vertex on the same row or column (holes are skipped over)
+    pairs = []
+    for line in (*grid, *zip(*grid)):
+        cells = [vertex for vertex in line if vertex != '0']
+        pairs.extend(zip(cells, cells[1:]))
+    rng.shuffle(pairs)
+
+    # Randomized Kruskal: spanning forest first, leftovers become optional extra roads
+    parent = {vertex: vertex for vertex in vertices}
+
+    def find(vertex):
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    roads, extras = [], []
+    for u, v in pairs:
+        root_u, root_v = find(u), find(v)
+        if root_u != root_v:
+            parent[root_u] = root_v
+            roads.append((u, v))
+        else:
+            extras.append((u, v))
+    roads.extend(extras[:int(len(extras) * extra_roads)])
+
+    # Holes can split the grid: join every other component to the base's one
+    base_root = find(vertices[0])
+    for vertex in vertices:
+        if find(vertex) != base_root:
+            roads.append((vertex, vertices[0]))
+            parent[find(vertex)] = base_root
+
+    base1, base2 = vertices[0], vertices[-1]
+    candidates = vertices[1:-1]
+    sparking = set(rng.sample(candidates, min(spark_spots, len(candidates))))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{len(roads)} {len(vertices)} {base1} {base2}\n")
+        for u, v in roads:
+            f.write(f"{u} {v} {rng.randint(min_road, max_road)}\n")
+        for vertex in vertices:
+            quantity = rng.randint(1, max_resources) if vertex not in (base1, base2) and rng.random() < resource_density else 0
+            f.write(f"{vertex} {quantity} {int(vertex in sparking)}\n")
+        for row in grid:
+            f.write(" ".join(row) + "\n")
+    return Path(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded random map.")
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--cols', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-road', type=int, default=1)
+    parser.add_argument('--max-road', type=int, default=5)
+    parser.add_argument('--resource-density', type=float, default=0.5)
+    parser.add_argument('--max-resources', type=int, default=10)
+    parser.add_argument('--spark-spots', type=int, default=2)
+    parser.add_argument('--extra-roads', type=float, default=0.3)
+    parser.add_argument('--fill', type=float, default=1.0)
+    parser.add_argument('-o', '--out', type=Path, required=True)
+    args = parser.parse_args(argv)
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    generate_map(args.out, args.rows, args.cols, args.seed, args.min_road, args.max_road, args.resource_density,
+                 args.max_resources, args.spark_spots, args.extra_roads, args.fill)
+    print(f"Map written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+"""
+Local asyncio match server: bots in other processes play over TCP or Unix sockets.
+
+    python -m code.MatchServer serve --maps examples/small.txt --port 8765 --deadline 1
+    python -m code.MatchServer play --port 8765 --match m1 --bot economy --maps examples/small.txt      # twice
+
+Messages are JSON lines. A client sends {"type": "join", "match": name, "map": map name (optional),
+"spectate": false}; the first two players of a match get p1 and p2 and the match starts when both
+are in. If the first player hangs up before the second joins, the match is abandoned. Every client
+gets one full "snapshot" of the state when its match starts (spectators: when they join), naming
+the map by its file stem (players load their own copy of it), then one "turn" message per turn
+carrying only what changed since the previous one:
+
+    {"type": "turn", "turn": 12, "deadline": 1.0, "diff": {
+        "spawned": [[unit_id, vertex, *STATS]], "died": [unit_id], "moved": [[unit_id, vertex]],
+        "health": [[unit_id, health]], "stats": [[unit_id, stat, value]],
+        "resources": [[vertex, amount]], "sparks": [[spot, value]], "scores": {...}}}
+
+(empty entries are left out). Players answer {"type": "actions", "turn": 12, "actions": [[unit_id, name, target]]}
+within deadline seconds, or are disconnected and play no action for the rest of the match. The diff
+of a turn is encoded once and sent to every client of the match. The round trip of every turn is
+kept per connection, and reported with the scores in the final {"type": "end"} message. Malformed
+action entries are ignored; if a turn fails to resolve anyway, the match ends there and its
+"end" message carries the "error".
+Matches share the event loop; each step runs on it between the socket waits. Finished and
+abandoned matches are dropped from the server.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from code.GameState import GameState
+from code.BotHost import MIRRORED, StateMirror
+
+STATS = MIRRORED        #unit columns sent besides the vertex: health, max_health, wait, load, multipliers
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def is_action(entry) -> bool:
+    """[unit_id, name] or [unit_id, name, target], every field a JSON scalar."""
+    return (isinstance(entry, list) and 2 <= len(entry) <= 3
+            and all(value is None or isinstance(value, (str, int, float)) for value in entry))
+
+
+def unit_row(unit) -> list:
+    return [unit.vertex, *(unit.store.read(name, unit.slot) for name in STATS)]
+
+
+class DiffTracker:
+    """What changed in a game_state since the last diff() (resources are collected by a map listener)."""
+
+    def __init__(self, game_state: GameState):
+        self.game_state = game_state
+        self.units = {unit_id: unit_row(unit) for unit_id, unit in game_state.units_by_id.items()}
+        self.sparks = list(game_state.sparks.values)
+        self.scores = dict(game_state.scores)
+        self.dirty = set()      #vertices whose resources changed
+        game_state.map.listeners.append(self.resource_changed)
+
+    def resource_changed(self, game_map, data, vertex: int, old, new):
+        if data is game_map.resource_counts:
+            self.dirty.add(vertex)
+
+    def snapshot(self) -> dict:
+        game_state = self.game_state
+        return {'type': 'snapshot', 'turn': game_state.turn, 'scores': dict(game_state.scores), 'stats': STATS,
+                'units': [[unit_id, *row] for unit_id, row in self.units.items()],
+                'resources': list(game_state.map.resource_counts), 'sparks': list(self.sparks)}
+
+    def diff(self) -> dict:
+        game_state = self.game_state
+        diff = {key: [] for key in ('spawned', 'died', 'moved', 'health', 'stats', 'resources', 'sparks')}
+        rows = {unit_id: unit_row(unit) for unit_id, unit in game_state.units_by_id.items()}
+        for unit_id, row in rows.items():
+            previous = self.units.get(unit_id)
+            if previous is None:
+                diff['spawned'].append([unit_id, *row])
+                continue
+            if row[0] != previous[0]:
+                diff['moved'].append([unit_id, row[0]])
+            if row[1] != previous[1]:
+                diff['health'].append([unit_id, row[1]])
+            diff['stats'] += [[unit_id, name, value] for name, value, old in zip(STATS[1:], row[2:], previous[2:])
+                              if value != old]
+        diff['died'] = [unit_id for unit_id in self.units if unit_id not in rows]
+        self.units = rows
+
+        diff['resources'] = [[vertex, game_state.map.resource_counts[vertex]] for vertex in sorted(self.dirty)]
+        self.dirty.clear()
+        sparks = list(game_state.sparks.values)
+        diff['sparks'] = [[i, value] for i, (value, old) in enumerate(zip(sparks, self.sparks)) if value != old]
+        self.sparks = sparks
+        if game_state.scores != self.scores:
+            diff['scores'] = self.scores = dict(game_state.scores)
+        return {key: value for key, value in diff.items() if value}
+
+    def close(self):
+        self.game_state.map.listeners.remove(self.resource_changed)
+
+
+class ObservedState:
+    """Client side copy of the state, built from the snapshot and updated by each diff."""
+
+    def __init__(self, snapshot: dict):
+        self.turn = snapshot['turn']
+        self.scores = snapshot['scores']
+        self.units = {unit_id: row for unit_id, *row in snapshot['units']}     #{unit_id: [vertex, *STATS]}
+        self.resources = snapshot['resources']
+        self.sparks = snapshot['sparks']
+
+    def apply(self, turn: int, diff: dict):
+        self.turn = turn
+        for unit_id, *row in diff.get('spawned', ()):
+            self.units[unit_id] = row
+        for unit_id in diff.get('died', ()):
+            self.units.pop(unit_id, None)
+        for unit_id, vertex in diff.get('moved', ()):
+            self.units[unit_id][0] = vertex
+        for unit_id, health in diff.get('health', ()):
+            self.units[unit_id][1] = health
+        for unit_id, name, value in diff.get('stats', ()):
+            self.units[unit_id][1 + STATS.index(name)] = value
+        for vertex, amount in diff.get('resources', ()):
+            self.resources[vertex] = amount
+        for spot, value in diff.get('sparks', ()):
+            self.sparks[spot] = value
+        self.scores = diff.get('scores', self.scores)
+
+    def refresh(self, mirror: StateMirror) -> GameState:
+        """Bring a StateMirror of the same map to this state (bots then get its game_state)."""
+        return mirror.refresh(self.turn, self.scores, self.resources, self.sparks,
+                              {unit_id: (row[0], row[1:]) for unit_id, row in self.units.items()})
+
+
+class Connection:
+    """One client socket, with the round trip time of every turn it answered."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = []     #seconds from sending a turn to receiving its actions
+        self.closed = None      #reason it was disconnected
+
+    async def send(self, data: bytes):
+        if self.closed is None:
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+            except ConnectionError:
+                self.close('connection lost')
+
+    async def receive(self, timeout: float = None):
+        line = await asyncio.wait_for(self.reader.readline(), timeout)
+        if not line:
+            raise ConnectionError("connection closed")
+        return json.loads(line)
+
+    def close(self, reason: str):
+        if self.closed is None:
+            self.closed = reason
+            self.writer.close()
+
+    def latency(self) -> dict:
+        latencies = self.latencies
+        return {'turns': len(latencies), 'mean': sum(latencies) / len(latencies) if latencies else None,
+                'max': max(latencies, default=None), 'last': latencies[-1] if latencies else None}
+
+
+class Match:
+    """One game between two connections, plus any number of spectators."""
+
+    def __init__(self, name: str, map_name: str, map_file: Path, max_turns: int, deadline: float):
+        self.name = name
+        self.map_name = map_name
+        self.map_file = map_file
+        self.max_turns = max_turns
+        self.deadline = deadline
+        self.players = {}       #{player_id: Connection}
+        self.spectators = []
+        self.game_state = None
+        self.tracker = None
+        self.result = None
+        self.full = asyncio.Event()     #both players joined
+        self.done = asyncio.Event()
+        self.task = None        #the run() task
+
+    def snapshot(self) -> dict:
+        return {**self.tracker.snapshot(), 'map': self.map_name}
+
+    async def broadcast(self, data: bytes):
+        await asyncio.gather(*(connection.send(data) for connection in (*self.players.values(), *self.spectators)))
+
+    async def collect(self, player_id: str, turn: int, sent: float) -> list:
+        """Actions of one player for turn; a late, silent or misbehaving player is disconnected."""
+        connection = self.players[player_id]
+        if connection.closed is not None:
+            return []
+        try:
+            while True:
+                message = await connection.receive(max(0.0, sent + self.deadline - time.perf_counter()))
+                if isinstance(message, dict) and message.get('type') == 'actions' and message.get('turn') == turn:
+                    break
+        except asyncio.TimeoutError:
+            connection.close('deadline')
+            return []
+        except (ConnectionError, ValueError):
+            connection.close('connection lost')
+            return []
+        connection.latencies.append(time.perf_counter() - sent)
+        actions = message.get('actions')
+        return [tuple(action) for action in actions if is_action(action)] if isinstance(actions, list) else []
+
+    async def run(self):
+        await self.full.wait()
+        self.game_state = GameState(self.map_file)
+        self.tracker = DiffTracker(self.game_state)
+        snapshot = self.snapshot()
+        for player_id, connection in self.players.items():
+            await connection.send(encode({**snapshot, 'player': player_id}))
+        for connection in self.spectators:
+            await connection.send(encode(snapshot))
+
+        diff = {}
+        error = None
+        game_state = self.game_state
+        try:
+            while game_state.turn < self.max_turns and any(c.closed is None for c in self.players.values()):
+                turn = game_state.turn
+                await self.broadcast(encode({'type': 'turn', 'turn': turn, 'deadline': self.deadline, 'diff': diff}))
+                sent = time.perf_counter()
+                actions = await asyncio.gather(*(self.collect(player_id, turn, sent) for player_id in ('p1', 'p2')))
+                game_state.step(*actions)
+                diff = self.tracker.diff()
+        except Exception as exception:       #the match ends, rather than leaving its clients waiting
+            error = f"{type(exception).__name__}: {exception}"
+
+        try:
+            self.result = {'type': 'end', 'match': self.name, 'turn': game_state.turn, 'diff': diff,
+                           'scores': dict(game_state.scores),
+                           'latency': {player_id: connection.latency() for player_id, connection in self.players.items()},
+                           'disconnected': {player_id: connection.closed for player_id, connection in self.players.items()
+                                            if connection.closed is not None}}
+            if error is not None:
+                self.result['error'] = error
+            await self.broadcast(encode(self.result))
+        finally:
+            for connection in (*self.players.values(), *self.spectators):
+                connection.close('match over' if error is None else 'match error')
+            self.tracker.close()
+            self.done.set()
+
+    async def wait_for_opponent(self, connection: Connection) -> bool:
+        """Wait until the match is full; False if the waiting player hung up first."""
+        full = asyncio.ensure_future(self.full.wait())
+        try:
+            while not self.full.is_set():
+                line = asyncio.ensure_future(connection.reader.readline())
+                await asyncio.wait((full, line), return_when=asyncio.FIRST_COMPLETED)
+                if not line.done():
+                    line.cancel()
+                elif (line.exception() is not None or not line.result()) and not self.full.is_set():
+                    return False
+        finally:
+            full.cancel()
+        return True
+
+    def abandon(self):
+        """Cancel a match that never started."""
+        for connection in (*self.players.values(), *self.spectators):
+            connection.close('match abandoned')
+        self.done.set()
+        self.task.cancel()
+
+
+class MatchServer:
+    """Hosts any number of concurrent matches, created by the first client that joins them."""
+
+    def __init__(self, maps: list[Path], max_turns: int = 500, deadline: float = 1.0):
+        self.maps = {Path(map_file).stem: Path(map_file) for map_file in maps}
+        self.default_map = Path(maps[0]).stem
+        self.max_turns = max_turns
+        self.deadline = deadline
+        self.matches = {}       #{name: Match}, running or waiting for players
+        self.serials = itertools.count(1)       #names of unnamed matches
+        self.server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, path: Path = None):
+        """Listen on a Unix socket at path, or on TCP host:port (port 0 picks a free one)."""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=str(path))
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer)
+        try:
+            message = await connection.receive()
+            assert message.get('type') == 'join', "Expected a join message"
+            match = self.matches.get(message.get('match'))
+            if match is None or match.done.is_set():
+                map_name = message.get('map') or self.default_map
+                name = message.get('match') or f"match-{next(self.serials)}"
+                match = self.matches[name] = Match(name, map_name, self.maps[map_name], self.max_turns, self.deadline)
+                match.task = asyncio.get_running_loop().create_task(match.run())
+                match.task.add_done_callback(lambda task, name=name, match=match: self.drop(name, match))
+        except (AssertionError, KeyError, ValueError, ConnectionError) as error:
+            await connection.send(encode({'type': 'error', 'error': f"{type(error).__name__}: {error}"}))
+            connection.close('bad join')
+            return
+
+        if message.get('spectate') or match.full.is_set():
+            match.spectators.append(connection)
+            await connection.send(encode({'type': 'joined', 'match': match.name, 'player': None}))
+            if match.tracker is not None:
+                await connection.send(encode(match.snapshot()))
+        else:
+            player_id = ('p1', 'p2')[len(match.players)]
+            match.players[player_id] = connection
+            await connection.send(encode({'type': 'joined', 'match': match.name, 'player': player_id}))
+            if len(match.players) == 2:
+                match.full.set()
+            elif not await match.wait_for_opponent(connection):
+                match.abandon()
+        await match.done.wait()
+
+    def drop(self, name: str, match: Match):
+        if self.matches.get(name) is match:
+            del self.matches[name]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def play(bot, match: str = None, host: str = '127.0.0.1', port: int = None, path: Path = None,
+               map_name: str = None, seed=0, spectate: bool = False, maps: list[Path] = ()) -> dict:
+    """
+    Join a match and play bot (a code/Bots.py bot) on a mirror of the observed state, built from
+    the local map file (among maps) whose stem the server names. Returns the final "end" message.
+    """
+    map_files = {Path(map_file).stem: Path(map_file) for map_file in maps}
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({'type': 'join', 'match': match, 'map': map_name, 'spectate': spectate}))
+    await writer.drain()
+    player_id = None
+    state = mirror = rng = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Server closed the connection")
+            message = json.loads(line)
+            kind = message['type']
+            if kind == 'error':
+                raise ConnectionError(message['error'])
+            if kind == 'joined':
+                player_id = message['player']
+                rng = random.Random(f"{seed}:{player_id}")
+            elif kind == 'snapshot':
+                state = ObservedState(message)
+                if player_id is not None:
+                    if message['map'] not in map_files:
+                        raise ValueError(f"No local file for map {message['map']!r}: pass it in maps")
+                    mirror = StateMirror(map_files[message['map']])
+            elif kind == 'turn':
+                state.apply(message['turn'], message['diff'])
+                if player_id is not None:
+                    actions = bot(state.refresh(mirror), player_id, rng)
+                    writer.write(encode({'type': 'actions', 'turn': message['turn'],
+                                         'actions': [list(action) for action in actions]}))
+                    await writer.drain()
+            elif kind == 'end':
+                state.apply(message['turn'], message['diff'])
+                return message
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    from code.Bots import load_bot
+
+    parser = argparse.ArgumentParser(description="Serve matches to socket clients, or play in one.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve')
+    serve.add_argument('--maps', nargs='+', required=True, type=Path)
+    serve.add_argument('--max-turns', type=int, default=500)
+    serve.add_argument('--deadline', type=float, default=1.0, help="seconds a player has to answer a turn")
+    client = commands.add_parser('play')
+    client.add_argument('--bot', default='random')
+    client.add_argument('--match', default=None)
+    client.add_argument('--map', default=None, help="map name (file stem) when creating the match")
+    client.add_argument('--maps', nargs='*', default=[], type=Path, help="local map files the server may pick")
+    client.add_argument('--seed', type=int, default=0)
+    client.add_argument('--spectate', action='store_true')
+    for command in (serve, client):
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=8765)
+        command.add_argument('--unix', type=Path, default=None, help="Unix socket path instead of TCP")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        async def serve_forever():
+            server = MatchServer(args.maps, args.max_turns, args.deadline)
+            await server.start(args.host, args.port, args.unix)
+            print(f"Serving on {args.unix or server.address}")
+            await server.server.serve_forever()
+        asyncio.run(serve_forever())
+    else:
+        result = asyncio.run(play(load_bot(args.bot), args.match, args.host, args.port, args.unix,
+                                  args.map, args.seed, args.spectate, args.maps))
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+class Occupancy:
+    """
+    Spatial index of units: who is on vertex v, per player.
+    Maintained incrementally by GameState (spawn, death) and Unit (moves).
+    """
+
+    def __init__(self, players=('p1', 'p2')):
+        self.players = players
+        self.cells = {}      #{(vertex_id, player_id): {unit: None, ...}}  (dict as an ordered set)
+        self.occupied = {player: set() for player in players}      #{player_id: {vertex_id, ...}}
+        self.versions = {player: 0 for player in players}      #bumped whenever occupied[player] changes
+
+    def add(self, unit):
+        self.enter(unit, unit.vertex)
+
+    def remove(self, unit):
+        self.leave(unit, unit.vertex)
+
+    def enter(self, unit, vertex: int):
+        cell = self.cells.get((vertex, unit.player_id))
+        if cell is None:
+            cell = self.cells[(vertex, unit.player_id)] = {}
+            self.occupied[unit.player_id].add(vertex)
+            self.versions[unit.player_id] += 1
+        cell[unit] = None
+
+    def leave(self, unit, vertex: int):
+        key = (vertex, unit.player_id)
+        cell = self.cells.get(key)
+        if cell is not None:
+            cell.pop(unit, None)
+            if not cell:
+                del self.cells[key]
+                self.occupied[unit.player_id].discard(vertex)
+                self.versions[unit.player_id] += 1
+
+    def move(self, unit, old_vertex: int, new_vertex: int):
+        """Moves unit between cells (unit.vertex must already be new_vertex or not yet read)."""
+        if old_vertex == new_vertex:
+            return
+        self.leave(unit, old_vertex)
+        self.enter(unit, new_vertex)
+
+    def units_at(self, vertex: int, player_id: str = None) -> list:
+        """Units on vertex (of one player, or of every player)."""
+        if player_id is not None:
+            return list(self.cells.get((vertex, player_id), ()))
+        return [unit for player in self.players for unit in self.cells.get((vertex, player), ())]
+
+    def units_within(self, ball: frozenset, player_id: str) -> list:
+        """Units of a player standing on any vertex of ball (see Map.ball): a set intersection."""
+        return [unit for vertex in ball & self.occupied[player_id] for unit in self.cells[(vertex, player_id)]]
+
+    def count(self, vertex: int, player_id: str) -> int:
+        return len(self.cells.get((vertex, player_id), ()))
+
+    def is_occupied_by(self, vertex: int, player_id: str) -> bool:
+        return (vertex, player_id) in self.cells
@@ -0,0 +1,190 @@
+"""
+Opt-in instrumentation of the simulation core: call counts and time per engine operation,
+per turn phase and per player decision, exported as JSON and as collapsed stacks
+(flamegraph.pl / speedscope input).
+
+    with Profiler() as profiler:
+        ...play...
+    profiler.write_json("profile.json")
+    profiler.write_collapsed("profile.folded")
+
+    python -m code.Profiler --map examples/small.txt --bots random economy --turns 300 --out profile.json
+
+Enabling swaps the hot methods (HOT_PATHS, and the unit action methods under their phase) for
+timing wrappers on their classes, and disabling puts the originals back: when no profiler is
+enabled the engine runs its plain methods, with no check or indirection left behind.
+Wrappers are class-wide, so every GameState (forks included) is measured while enabled.
+"""
+from collections import defaultdict
+from pathlib import Path
+import argparse
+import json
+import time
+
+from code.GameMap import Map
+from code.GameState import GameState
+from code.SparkPoint import SparkEngine, SparkPoint
+from code.Effects import EffectScheduler
+from code.FlowField import FlowField
+from code.Actions import ACTIONS
+import code.Units as Units
+
+# (class, method, phase frame or None) of the engine operations that are timed
+HOT_PATHS = (
+    (GameState, 'step', None),
+    (GameState, 'check_action', 'validate'),
+    (GameState, 'new_unit', 'spawn'),
+    (SparkEngine, 'update', 'sparks'),
+    (GameState, 'end_turn', 'end_turn'),
+    (GameState, 'update_death', None),
+    (GameState, 'legal_actions', None),
+    (Map, 'distance', None),
+    (Map, 'neighbors', None),
+    (Map, 'neighbor_ids', None),
+    (Map, 'ball', None),
+    (Map, 'within', None),
+    (SparkPoint, 'update_score', None),
+    (Units.Unit, 'has_effect', None),
+    (Units.Unit, 'get_multiplier', None),
+    (EffectScheduler, 'apply', None),
+    (EffectScheduler, 'advance', None),
+    (FlowField, '__init__', None),        #building a field, timed as 'FlowField'
+)
+
+
+def action_paths():
+    """(class, action, phase) of every unit action method, on the class that defines it."""
+    classes = {cls for spawnable in Units.UNIT_REGISTRY.values() for cls in spawnable.__mro__}
+    return [(cls, name, ACTIONS[name][0]) for cls in classes for name in ACTIONS if name in cls.__dict__]
+
+
+class Profiler:
+    """Collects timings while enabled; only one profiler can be enabled at a time."""
+
+    active = None
+
+    def __init__(self):
+        self.stack = []             #[[frame, start ns, time spent in children ns]]
+        self.operations = defaultdict(lambda: [0, 0, 0])      #{name: [calls, total ns, max ns]}
+        self.collapsed = defaultdict(int)       #{(frame, ...): self time ns}
+        self.patched = []           #[(class, attribute, original)]
+        self.wall_time = 0
+        self.started = None         #perf_counter_ns() of the last enable(), None while disabled
+
+    def enter(self, frame: str):
+        self.stack.append([frame, time.perf_counter_ns(), 0])
+
+    def exit(self):
+        frame, start, children = self.stack.pop()
+        elapsed = time.perf_counter_ns() - start
+        stack = self.stack
+        self.collapsed[tuple(entry[0] for entry in stack) + (frame,)] += elapsed - children
+        if stack:
+            stack[-1][2] += elapsed
+        stats = self.operations[frame]
+        stats[0] += 1
+        if not any(entry[0] == frame for entry in stack):       #recursive calls are counted once in the total
+            stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+    def timed(self, function, frames: tuple):
+        enter, exit = self.enter, self.exit
+
+        def wrapper(*args, **kwargs):
+            for frame in frames:
+                enter(frame)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                for _ in frames:
+                    exit()
+        wrapper.__wrapped__ = function
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+
+    def patch(self, cls, attribute: str, phase: str = None):
+        original = cls.__dict__[attribute]
+        name = cls.__name__ if attribute == '__init__' else f"{cls.__name__}.{attribute}"
+        setattr(cls, attribute, self.timed(original, (name,) if phase is None else (phase, name)))
+        self.patched.append((cls, attribute, original))
+
+    def wrap_bot(self, bot, player_id: str):
+        """Bot whose decisions are timed as 'decide:<player_id>' (engine calls it makes nest under it)."""
+        return self.timed(bot, (f"decide:{player_id}",))
+
+    def enable(self):
+        assert Profiler.active is None, "Another profiler is enabled"
+        Profiler.active = self
+        self.started = time.perf_counter_ns()
+        try:
+            for cls, attribute, phase in (*HOT_PATHS, *action_paths()):
+                self.patch(cls, attribute, phase)
+        except BaseException:
+            self.disable()      #put back what was already patched
+            raise
+        return self
+
+    def disable(self):
+        """Put the original methods back; safe to call on a disabled or half-enabled profiler."""
+        if Profiler.active is not self:
+            return
+        for cls, attribute, original in reversed(self.patched):
+            setattr(cls, attribute, original)
+        self.patched.clear()
+        if self.started is not None:
+            self.wall_time += time.perf_counter_ns() - self.started
+            self.started = None
+        Profiler.active = None
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def summary(self) -> dict:
+        """{'wall_time', 'turns', 'phases', 'players', 'operations'}: calls, total/mean/max seconds of each."""
+        phases = {phase for *_, phase in (*HOT_PATHS, *action_paths()) if phase is not None}
+
+        def stats(names):
+            return {name: {'calls': calls, 'total': total / 1e9, 'mean': total / calls / 1e9, 'max': peak / 1e9}
+                    for name, (calls, total, peak) in sorted(self.operations.items()) if names(name)}
+        return {
+            'wall_time': self.wall_time / 1e9,
+            'turns': self.operations['GameState.step'][0] if 'GameState.step' in self.operations else 0,
+            'phases': stats(lambda name: name in phases),
+            'players': {name.split(':', 1)[1]: entry
+                        for name, entry in stats(lambda name: name.startswith('decide:')).items()},
+            'operations': stats(lambda name: name not in phases and not name.startswith('decide:')),
+        }
+
+    def write_json(self, path: Path, extra: dict = None):
+        Path(path).write_text(json.dumps({**(extra or {}), **self.summary()}, indent=2))
+
+    def write_collapsed(self, path: Path):
+        """One 'frame;frame;frame microseconds' line per stack, with the self time of its last frame."""
+        lines = [f"{';'.join(stack)} {elapsed // 1000}" for stack, elapsed in sorted(self.collapsed.items())
+                 if elapsed >= 1000]
+        Path(path).write_text("\n".join(lines) + "\n")
+
+
+def main(argv=None):
+    from code.Runner import play_match
+
+    parser = argparse.ArgumentParser(description="Profile one match and write its timings.")
+    parser.add_argument('--map', required=True, type=Path)
+    parser.add_argument('--bots', nargs=2, default=['random', 'random'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--turns', type=int, default=300)
+    parser.add_argument('--out', type=Path, default=Path('profile.json'),
+                        help="JSON summary; the collapsed stacks go next to it with a .folded suffix")
+    args = parser.parse_args(argv)
+
+    result = play_match(args.map, *args.bots, args.seed, args.turns, profile=args.out)
+    print(f"{result['status']} after {result['turns']} turns, profile written to {args.out} "
+          f"and {args.out.with_suffix('.folded')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Replay renderer (needs matplotlib).
+
+    python -m code.Renderer replay.jsonl --out frames/ --workers 8
+    python -m code.Renderer replay.jsonl --out match.mp4 --fps 8
+
+Node positions and the static map layers (roads, vertices, bases, spark spots, labels) are
+drawn once per renderer; each frame only updates the unit and spark-point overlays.
+Each renderer draws on its own Agg canvas (no pyplot, no global backend switch), so it runs on
+headless servers; close() it, or use it as a context manager, to release the figure.
+The spark colour scale spans ±spark_threshold, read from the replay header when it has one.
+"""
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from code.GameMap import Map
+from code.Replay import read_replay
+from code.SparkPoint import OWNER_THRESHOLD
+
+PLAYER_COLORS = {'p1': 'red', 'p2': 'darkblue'}
+UNIT_MARKERS = {'minor': 'o', 'transporter': 's', 'corebot': '^', 'phasor': 'v', 'megacore': 'D',
+                'sparker': '*', 'healer': 'P', 'commandant': 'X'}
+
+
+def layout(game_map: Map) -> list[tuple[float, float]]:
+    """
+    (x, y) of every vertex ID. Abstract vertices sit on their grid cell, road cells are spread
+    evenly along their road; vertices missing from the grid are placed on a circle.
+    """
+    abstract = game_map.abstract_map
+    grid = abstract.grid_matrix
+    rows, cols = len(grid), max((len(row) for row in grid), default=0)
+    anchors = {}
+    for i, row in enumerate(grid):
+        for j, vertex in enumerate(row):
+            if vertex != '0':
+                anchors[vertex] = (j / max(cols - 1, 1), 1 - i / max(rows - 1, 1))
+    missing = [vertex for vertex in abstract.resources if vertex not in anchors]
+    for k, vertex in enumerate(missing):
+        angle = 2 * math.pi * k / len(missing)
+        anchors[vertex] = (0.5 + 0.45 * math.cos(angle), 0.5 + 0.45 * math.sin(angle))
+
+    lengths = {(u, v): dist for u, v, dist in abstract.edges}
+    positions = []
+    for i, name in enumerate(game_map.vertex_names):
+        if name in anchors:
+            positions.append(anchors[name])
+            continue
+        u, v, step = game_map.road_cells[i]
+        t = step / lengths[(u, v)]
+        (xu, yu), (xv, yv) = anchors[u], anchors[v]
+        positions.append((xu + t * (xv - xu), yu + t * (yv - yu)))
+    return positions
+
+
+class ReplayRenderer:
+    """Draws frames of one map; build it once and call render() for every frame."""
+
+    def __init__(self, game_map: Map, figsize: tuple = (10, 8), dpi: int = 100,
+                 spark_threshold: float = OWNER_THRESHOLD):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import LineCollection
+
+        self.map = game_map
+        self.dpi = dpi
+        self.positions = layout(game_map)
+        positions = self.positions
+
+        # Static layers
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        axes = self.axes
+        axes.set_axis_off()
+        axes.set_xlim(-0.05, 1.05)
+        axes.set_ylim(-0.05, 1.05)
+        axes.add_collection(LineCollection([(positions[u], positions[v]) for u, v in game_map.edge_ids()],
+                                           colors='lightsteelblue', linewidths=1.5, zorder=1))
+        abstract = [game_map.vertex_ids[vertex] for vertex in game_map.abstract_map.resources]
+        cells = sorted(set(range(len(positions))) - set(abstract))
+        if cells:
+            axes.scatter(*zip(*(positions[i] for i in cells)), s=6, color='lightsteelblue', zorder=2)
+        axes.scatter(*zip(*(positions[i] for i in abstract)), s=120, color='lightblue', zorder=2)
+        for base, player_id in ((game_map.base1_id, 'p1'), (game_map.base2_id, 'p2')):
+            axes.scatter(*positions[base], s=260, color=PLAYER_COLORS[player_id], zorder=3)
+        for i in abstract:
+            axes.annotate(game_map.vertex_names[i], positions[i], fontsize=7, ha='center', va='center', zorder=4)
+
+        # Overlays, updated in place
+        self.spark_vertices = [i for i in range(len(positions)) if game_map.sparking_flags[i]]
+        self.sparks = axes.scatter(*zip(*(positions[i] for i in self.spark_vertices)), s=260, marker='h', alpha=0.7,
+                                   c=[0.0] * len(self.spark_vertices), cmap='coolwarm_r',
+                                   vmin=-spark_threshold, vmax=spark_threshold,
+                                   edgecolors='orange', linewidths=2, zorder=2) if self.spark_vertices else None
+        self.units = {(player_id, subtype): axes.scatter([], [], s=60, marker=marker, color=PLAYER_COLORS[player_id],
+                                                          edgecolors='white', linewidths=0.5, zorder=5)
+                      for player_id in PLAYER_COLORS for subtype, marker in UNIT_MARKERS.items()}
+        self.title = axes.set_title("", fontsize=12)
+        self.overlays = [*([self.sparks] if self.sparks is not None else []), *self.units.values(), self.title]
+        for artist in self.overlays:
+            artist.set_animated(True)
+
+        # Rasterize the static layers once; frames are blitted on top of this background
+        self.figure.canvas.draw()
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+
+    def draw(self, frame: dict):
+        """Update the overlays to frame."""
+        spread = 0.008
+        groups = {key: [] for key in self.units}
+        stacked = {}
+        for player_id, subtype, vertex, health in frame['units']:
+            # Units sharing a vertex are fanned out so that they stay visible
+            k = stacked[vertex] = stacked.get(vertex, -1) + 1
+            x, y = self.positions[vertex]
+            dx = spread * k * (1 if player_id == 'p1' else -1)
+            groups[(player_id, subtype)].append((x + dx, y + spread * (k % 2)))
+        for key, collection in self.units.items():
+            collection.set_offsets(groups[key] if groups[key] else [[float('nan'), float('nan')]])
+        if self.sparks is not None:
+            values = dict((vertex, value) for vertex, value in frame['sparks'])
+            self.sparks.set_array([values.get(vertex, 0) for vertex in self.spark_vertices])
+        scores = frame['scores']
+        self.title.set_text(f"Turn {frame['turn']}   p1 {scores['p1']} - {scores['p2']} p2")
+
+    def render(self, frame: dict, path: Path = None):
+        """RGBA image (H x W x 4 array) of frame, also saved as PNG to path if given."""
+        import numpy as np
+        from matplotlib.image import imsave
+
+        self.draw(frame)
+        canvas = self.figure.canvas
+        canvas.restore_region(self.background)
+        for artist in self.overlays:
+            self.figure.draw_artist(artist)
+        image = np.asarray(canvas.buffer_rgba())
+        if path is not None:
+            imsave(path, image)
+        return image
+
+    def close(self):
+        """Release the figure and its background; the renderer can't be used afterwards."""
+        if self.figure is not None:
+            self.figure.clear()
+            self.figure = self.axes = self.background = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Headless parallel rendering: every worker builds its renderer once, then renders its share of frames
+
+_renderer = None
+
+
+def _init_worker(map_file: str, figsize: tuple, dpi: int, spark_threshold: float):
+    global _renderer
+    _renderer = ReplayRenderer(Map.from_file(map_file), figsize, dpi, spark_threshold)
+
+
+def _render_frames(jobs: list[tuple[dict, str]]):
+    for frame, path in jobs:
+        _renderer.render(frame, path)
+    return len(jobs)
+
+
+def render_frames(map_file: Path, frames: list[dict], out_dir: Path, workers: int = None,
+                  figsize: tuple = (10, 8), dpi: int = 100, spark_threshold: float = OWNER_THRESHOLD) -> list[Path]:
+    """Render frames to out_dir/frame_00000.png, ... across a process pool. Returns the PNG paths."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = [out_dir / f"frame_{i:05d}.png" for i in range(len(frames))]
+    jobs = [(frame, str(path)) for frame, path in zip(frames, paths)]
+    workers = max(1, min(workers or os.cpu_count(), len(jobs)))
+    if workers == 1:
+        with ReplayRenderer(Map.from_file(map_file), figsize, dpi, spark_threshold) as renderer:
+            for frame, path in jobs:
+                renderer.render(frame, path)
+        return paths
+    chunks = [jobs[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(map_file), figsize, dpi, spark_threshold)) as pool:
+        list(pool.map(_render_frames, chunks))
+    return paths
+
+
+def render_video(map_file: Path, frames: list[dict], output: Path, fps: int = 8, workers: int = None,
+                 figsize: tuple = (10, 8), dpi: int = 100, spark_threshold: float = OWNER_THRESHOLD) -> Path:
+    """Render frames in parallel, then encode them with ffmpeg."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found: render PNG frames instead, or install ffmpeg")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        render_frames(map_file, frames, tmp_dir, workers, figsize, dpi, spark_threshold)
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-framerate", str(fps),
+                        "-i", str(Path(tmp_dir) / "frame_%05d.png"), "-pix_fmt", "yuv420p",
+                        "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", str(output)], check=True)
+    return Path(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a replay to PNG frames or a video, headless.")
+    parser.add_argument('replay', type=Path)
+    parser.add_argument('--out', type=Path, required=True, help="frames directory, or a .mp4/.gif/... file")
+    parser.add_argument('--map', type=Path, default=None, help="map file (default: the one in the replay)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fps', type=int, default=8)
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    header, frames = read_replay(args.replay)
+    map_file = args.map or Path(header['map'])
+    spark_threshold = header.get('spark_threshold', OWNER_THRESHOLD)
+    if args.out.suffix:
+        render_video(map_file, frames, args.out, args.fps, args.workers, dpi=args.dpi, spark_threshold=spark_threshold)
+    else:
+        render_frames(map_file, frames, args.out, args.workers, dpi=args.dpi, spark_threshold=spark_threshold)
+    print(f"{len(frames)} frames rendered to {args.out}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Match replays: one compact snapshot (frame) per turn, stored as JSON lines.
+
+The first line is the header ({'map', 'bots', 'seed', 'spark_threshold'}), then one frame per line:
+    {'turn': 3, 'scores': {'p1': 0, 'p2': 1},
+     'units': [[player_id, subtype, vertex_id, health], ...], 'sparks': [[vertex_id, value], ...]}
+"""
+from pathlib import Path
+import json
+
+
+def snapshot(game_state) -> dict:
+    """Frame of the current state of game_state."""
+    return {
+        'turn': game_state.turn,
+        'scores': dict(game_state.scores),
+        'units': [[unit.player_id, unit.subtype, unit.vertex, unit.health]
+                  for player_id in ('p1', 'p2') for unit in game_state.units[player_id]],
+        'sparks': [[vertex, spark_point.value] for vertex, spark_point in game_state.spark_points.items()],
+    }
+
+
+class ReplayWriter:
+    """Appends frames to a replay file as the match is played."""
+
+    def __init__(self, path: Path, header: dict):
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(json.dumps(header) + "\n")
+
+    def write(self, game_state):
+        self.file.write(json.dumps(snapshot(game_state), separators=(",", ":")) + "\n")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_replay(path: Path) -> tuple[dict, list[dict]]:
+    """(header, frames) of a replay file."""
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        return header, [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,72 @@
+import heapq
+import math
+
+
+class RoadDistance:
+    """
+    Hop distances computed on the ABSTRACT weighted graph.
+    An intermediate cell of the expanded map is located as (road, offset), from the (u, v, step)
+    the map recorded for it when expanding its road (see Map.road_cells), so memory and query
+    cost scale with the number of abstract vertices, not with road length.
+    """
+
+    def __init__(self, abstract_map, vertex_ids: dict = None, road_cells: dict = None):
+        self.roads = {(u, v): dist for u, v, dist in abstract_map.edges}  # (u, v) normalized u < v
+        vertices = {vertex for u, v, _ in abstract_map.edges for vertex in (u, v)}
+        vertices.update(abstract_map.resources)
+        self.vertices = sorted(vertices)
+        self.index = {vertex: i for i, vertex in enumerate(self.vertices)}
+        self.matrix = self.all_pairs()
+        self.vertex_ids = self.index if vertex_ids is None else vertex_ids  # Expanded map {name: ID}, for queries by name
+        self.ends = {self.vertex_ids[vertex]: i for vertex, i in self.index.items()}  # {abstract vertex ID: matrix index}
+        self.cells = dict(road_cells or {})  # {cell ID: (u, v, step)}, as recorded by Map.road_cells
+
+    def all_pairs(self) -> list[list[float]]:
+        """Dijkstra from every abstract vertex."""
+        adjacency = [[] for _ in self.vertices]
+        for (u, v), dist in self.roads.items():
+            adjacency[self.index[u]].append((self.index[v], dist))
+            adjacency[self.index[v]].append((self.index[u], dist))
+
+        matrix = []
+        for source in range(len(self.vertices)):
+            row = [math.inf] * len(self.vertices)
+            row[source] = 0
+            heap = [(0, source)]
+            while heap:
+                dist, vertex = heapq.heappop(heap)
+                if dist > row[vertex]:
+                    continue
+                for neighbor, weight in adjacency[vertex]:
+                    if dist + weight < row[neighbor]:
+                        row[neighbor] = dist + weight
+                        heapq.heappush(heap, (dist + weight, neighbor))
+            matrix.append(row)
+        return matrix
+
+    def locate(self, cell: int):
+        """Returns (road, offset, [(abstract vertex index, hops to it), ...]) for a cell ID."""
+        if cell in self.ends:
+            return None, 0, [(self.ends[cell], 0)]
+
+        if cell not in self.cells:
+            raise KeyError(cell)
+        u, v, step = self.cells[cell]
+        dist = self.roads[(u, v)]
+        return (u, v), step, [(self.index[u], step), (self.index[v], dist - step)]
+
+    def distance(self, a: str, b: str):
+        """Hop distance between two cells of the expanded map, by name (math.inf if not connected)."""
+        return self.distance_ids(self.vertex_ids[a], self.vertex_ids[b])
+
+    def distance_ids(self, u: int, v: int):
+        """Hop distance between two expanded map vertex IDs."""
+        road_u, offset_u, ends_u = self.locate(u)
+        road_v, offset_v, ends_v = self.locate(v)
+
+        best = min(hops_u + self.matrix[i][j] + hops_v
+                   for i, hops_u in ends_u
+                   for j, hops_v in ends_v)
+        if road_u is not None and road_u == road_v:
+            best = min(best, abs(offset_u - offset_v))
+        return best
@@ -0,0 +1,168 @@
+"""
+Headless match runner for bot tournaments.
+
+    python -m code.Runner --maps examples/small.txt --pairings random,idle random,random \
+        --seeds 0-99 --out results.jsonl --workers 8 --max-turns 300 --timeout 30
+"""
+from pathlib import Path
+import argparse
+import itertools
+import json
+import os
+import random
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from code.GameState import GameState
+from code.Bots import load_bot
+from code.Replay import ReplayWriter
+from code.EventLog import EventRecorder
+from code.Profiler import Profiler
+from code.BotHost import BotHost
+
+
+class MatchTimeout(Exception):
+    """Raised inside a match that exceeded its wall-clock budget."""
+
+
+def _raise_timeout(signum, frame):
+    raise MatchTimeout()
+
+
+def play_match(map_file: Path, bot1: str, bot2: str, seed: int, max_turns: int = 500, timeout: float = None,
+               replay: Path = None, event_log: Path = None, profile: Path = None, bot_budget: float = None) -> dict:
+    """
+    Play one match and return its summary.
+    Each bot gets its own Random seeded from (seed, player), so a match is reproducible.
+    With replay, every turn is also saved to that file (see code/Replay.py); with event_log,
+    the match is recorded as a binary event log (see code/EventLog.py). With profile, engine
+    and decision timings are written there as JSON, and as collapsed stacks next to it (see code/Profiler.py).
+    With bot_budget, each bot runs in its own worker process and gets that many seconds per turn (see code/BotHost.py).
+    """
+    start = time.perf_counter()
+    result = {'map': str(map_file), 'bots': [bot1, bot2], 'seed': seed, 'status': 'turn_cap', 'turns': 0}
+
+    game_state = None
+    recorder = None
+    events = None
+    host = None
+    profiler = Profiler() if profile is not None else None
+    use_alarm = timeout is not None and hasattr(signal, 'setitimer')
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if profiler is not None:
+            profiler.enable()
+        game_state = GameState(map_file)
+        players = [(load_bot(bot1), random.Random(f"{seed}:p1")),
+                   (load_bot(bot2), random.Random(f"{seed}:p2"))]
+        if profiler is not None:
+            players = [(profiler.wrap_bot(bot, player_id), rng) for (bot, rng), player_id in zip(players, ('p1', 'p2'))]
+        deadline = start + timeout if timeout is not None else None
+        if replay is not None:
+            recorder = ReplayWriter(replay, {'map': str(map_file), 'bots': [bot1, bot2], 'seed': seed,
+                                            'spark_threshold': game_state.sparks.threshold})
+            recorder.write(game_state)
+        if event_log is not None:
+            events = EventRecorder(game_state, event_log, {'bots': [bot1, bot2], 'seed': seed})
+        if bot_budget is not None:
+            host = BotHost(game_state, {'p1': bot1, 'p2': bot2}, seed, bot_budget)
+        while game_state.turn < max_turns:
+            if host is not None:
+                actions = host.decide()
+            else:
+                actions = [bot(game_state, player_id, rng) for (bot, rng), player_id in zip(players, ('p1', 'p2'))]
+            step_result = game_state.step(*actions)
+            if recorder is not None:
+                recorder.write(game_state)
+            if events is not None:
+                events.record(step_result, *actions)
+            if deadline is not None and time.perf_counter() > deadline:
+                raise MatchTimeout()
+        result['scores'] = dict(game_state.scores)
+    except MatchTimeout:
+        result['status'] = 'timeout'
+        result['scores'] = dict(game_state.scores) if game_state is not None else None
+    except Exception as error:
+        result['status'] = 'error'
+        result['error'] = f"{type(error).__name__}: {error}"
+        result['scores'] = None
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        if recorder is not None:
+            recorder.close()
+        if events is not None:
+            events.close()
+        if profiler is not None:
+            profiler.disable()
+        if host is not None:
+            result['bot_failures'] = {player_id: len(failures) for player_id, failures in host.failures.items()}
+            host.close()
+
+    if game_state is not None:
+        result['turns'] = game_state.turn
+    result['wall_time'] = round(time.perf_counter() - start, 6)
+    if profiler is not None:
+        profiler.write_json(profile, {key: result[key] for key in ('map', 'bots', 'seed', 'status', 'turns')})
+        profiler.write_collapsed(Path(profile).with_suffix('.folded'))
+    return result
+
+
+def schedule(map_files: list, pairings: list, seeds: list) -> list[tuple]:
+    """Every (map, bot1, bot2, seed) combination, in a stable order."""
+    return [(str(map_file), bot1, bot2, seed)
+            for map_file, (bot1, bot2), seed in itertools.product(map_files, pairings, seeds)]
+
+
+def run_tournament(map_files: list, pairings: list, seeds: list, output: Path,
+                   workers: int = None, max_turns: int = 500, timeout: float = None, bot_budget: float = None) -> int:
+    """
+    Run every match across a process pool, appending one JSON line per match to output
+    as soon as it finishes. Returns the number of matches played.
+    """
+    matches = schedule(map_files, pairings, seeds)
+    with open(output, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(play_match, map_file, bot1, bot2, seed, max_turns, timeout, bot_budget=bot_budget)
+                   for map_file, bot1, bot2, seed in matches]
+        for future in as_completed(futures):
+            out.write(json.dumps(future.result()) + "\n")
+            out.flush()
+    return len(matches)
+
+
+def parse_seeds(spec: str) -> list[int]:
+    """'0-9,42' -> [0, 1, ..., 9, 42]"""
+    seeds = []
+    for part in spec.split(','):
+        first, _, last = part.partition('-')
+        seeds.extend(range(int(first), int(last or first) + 1))
+    return seeds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run bot matches in parallel and stream results as JSONL.")
+    parser.add_argument('--maps', nargs='+', required=True, type=Path)
+    parser.add_argument('--pairings', nargs='+', required=True,
+                        help="bot1,bot2 pairs, e.g. random,idle or mybots.alpha:play,random")
+    parser.add_argument('--seeds', default='0', type=parse_seeds)
+    parser.add_argument('--out', default=Path('results.jsonl'), type=Path)
+    parser.add_argument('--workers', default=None, type=int)
+    parser.add_argument('--max-turns', default=500, type=int)
+    parser.add_argument('--timeout', default=None, type=float, help="wall-clock seconds per match")
+    parser.add_argument('--bot-budget', default=None, type=float,
+                        help="seconds per turn for each bot, run in its own worker process")
+    args = parser.parse_args(argv)
+
+    pairings = [tuple(pairing.split(',', 1)) for pairing in args.pairings]
+    played = run_tournament(args.maps, pairings, args.seeds, args.out, args.workers, args.max_turns, args.timeout,
+                            args.bot_budget)
+    print(f"{played} matches written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,44 @@
+OWNER_THRESHOLD = 100       #|value| a player needs to own a spark point; values are clamped to ±threshold
+
 
 class SparkPoint:
-    """Represents a Spark Point."""
-    def __init__(self, game_state, spark_point_id, position):
+    """Represents a Spark Point. Its value lives in the game's SparkEngine when it has one."""
+    def __init__(self, game_state, spark_point_id, position, engine=None):
         self.game_state = game_state
         self.map = game_state.map
         self.units = game_state.units
         self.id = spark_point_id
         self.position = position
-        self.value = 0
+        self.vertex = self.map.vertex_id(position)
+        self.engine = engine
+        self.index = None if engine is None else engine.spot_of[self.vertex]
+        self.threshold = OWNER_THRESHOLD if engine is None else engine.threshold
+        self.local_value = 0        #value of a spark point outside any engine
+
+
+    @property
+    def value(self):
+        return self.local_value if self.engine is None else self.engine.value_at(self.index)
+
+    @value.setter
+    def value(self, value):
+        if self.engine is None:
+            self.local_value = value
+        else:
+            self.engine.values[self.index] = value
 
 
     @property
-    def owner(self, value_required = 100):
+    def owner(self):
         """Returns the player that owns this spark point."""
 
-        return 'p1' if self.value == value_required else 'p2' if self.value == -value_required else None
-        
+        return 'p1' if self.value >= self.threshold else 'p2' if self.value <= -self.threshold else None
+
 
     def is_occupied_by(self, player_id):
         """ Check if there is a unit controlled by a specific player at this spark point."""
-        
-        for unit in self.units:
-            if unit.position == self.position and unit.player_id == player_id:
-                return True
-        return False
+
+        return self.game_state.occupancy.is_occupied_by(self.vertex, player_id)
 
 
     @property
@@ -32,12 +47,16 @@ class SparkPoint:
 
 
     def update_value(self):
-        for unit in self.units:
-            if self.position == unit.position :
-                if unit.player_id == 'p1':
-                    self.value += unit.spark_speed * unit.get_multiplier('spark')
-                else:
-                    self.value -= unit.spark_speed * unit.get_multiplier('spark')
+        old_value = self.value
+        self.game_state.record(setattr, self, 'value', old_value)
+        value = old_value
+        for unit in self.game_state.occupancy.units_at(self.vertex):
+            if unit.player_id == 'p1':
+                value += unit.spark_speed * unit.get_multiplier('spark')
+            else:
+                value -= unit.spark_speed * unit.get_multiplier('spark')
+        self.value = max(-self.threshold, min(self.threshold, value))
+        self.game_state.zobrist.spark_changed(self.vertex, old_value, self.value)
 
 
     def update_score(self, score = 1):
@@ -46,3 +65,108 @@ class SparkPoint:
             self.game_state.add_score(self.owner, score)
 
 
+class SparkEngine:
+    """
+    Turn-level control and scoring of every spark point at once.
+    Spark values sit in one array; each turn, the net contribution of the units standing on
+    each spot (sum of spark_speed * spark multiplier, p1 minus p2) is gathered in a single pass
+    over the UnitStore rows, then clamping, ownership, conflicts and scores are resolved for
+    every spot together. With a vectorized store this is a handful of NumPy operations
+    (bincount over positions), otherwise one Python loop over the rows.
+    """
+
+    def __init__(self, game_state, threshold: float = OWNER_THRESHOLD, score: int = 1):
+        self.game_state = game_state
+        self.threshold = threshold
+        self.score = score      #points per owned, occupied and uncontested spot and turn
+        game_map = game_state.map
+        self.vertices = [vertex for vertex in range(len(game_map.vertex_names)) if game_map.sparking_flags[vertex]]
+        self.spot_of = {vertex: i for i, vertex in enumerate(self.vertices)}      #{vertex_id: spot index}
+        self.vectorized = game_state.store.vectorized
+        if self.vectorized:
+            import numpy as np
+            self.np = np
+            self.values = np.zeros(len(self.vertices))
+            self.spot_index = np.full(len(game_map.vertex_names), -1, dtype=np.int64)     #vertex ID -> spot or -1
+            self.spot_index[self.vertices] = np.arange(len(self.vertices))
+        else:
+            self.values = [0] * len(self.vertices)
+        self.points = {vertex: SparkPoint(game_state, game_map.vertex_names[vertex], game_map.vertex_names[vertex], self)
+                       for vertex in self.vertices}      #{vertex_id: SparkPoint}
+
+    def copy(self, game_state):
+        clone = SparkEngine.__new__(SparkEngine)
+        clone.__dict__.update(self.__dict__)
+        clone.game_state = game_state
+        clone.values = self.values.copy()
+        clone.points = {vertex: SparkPoint(game_state, point.id, point.position, clone)
+                        for vertex, point in self.points.items()}
+        return clone
+
+    def value_at(self, index: int):
+        return self.values.item(index) if self.vectorized else self.values[index]
+
+    def restore(self, values):
+        self.values = values
+
+    def contributions(self):
+        """(net p1 - p2 spark per spot, spots occupied by p1, spots occupied by p2)."""
+        store = self.game_state.store
+        columns = store.columns
+        n = store.size
+        k = len(self.vertices)
+        if self.vectorized:
+            np = self.np
+            spots = self.spot_index[columns['vertex'][:n]]
+            present = columns['alive'][:n] & (spots >= 0)
+            spots = spots[present]
+            side = columns['side'][:n][present]
+            weights = (columns['spark_speed'][:n] * columns['spark_mult'][:n])[present] * side
+            return (np.bincount(spots, weights, minlength=k),
+                    np.bincount(spots[side > 0], minlength=k) > 0,
+                    np.bincount(spots[side < 0], minlength=k) > 0)
+
+        delta, occupied = [0] * k, {1: [False] * k, -1: [False] * k}
+        alive, vertex, side = columns['alive'], columns['vertex'], columns['side']
+        spark_speed, spark_mult = columns['spark_speed'], columns['spark_mult']
+        spot_of = self.spot_of
+        for slot in range(n):
+            if alive[slot]:
+                i = spot_of.get(vertex[slot])
+                if i is not None:
+                    delta[i] += side[slot] * spark_speed[slot] * spark_mult[slot]
+                    occupied[side[slot]][i] = True
+        return delta, occupied[1], occupied[-1]
+
+    def update(self):
+        """Add this turn's contributions to every spot, then score owned, occupied, uncontested spots."""
+        game_state = self.game_state
+        threshold = self.threshold
+        old = self.values
+        delta, occupied_p1, occupied_p2 = self.contributions()
+
+        if self.vectorized:
+            np = self.np
+            values = np.clip(old + delta, -threshold, threshold)
+            uncontested = ~(occupied_p1 & occupied_p2)
+            points = {'p1': int(np.count_nonzero(uncontested & occupied_p1 & (values >= threshold))),
+                      'p2': int(np.count_nonzero(uncontested & occupied_p2 & (values <= -threshold)))}
+            changed = np.flatnonzero(values != old).tolist()
+        else:
+            values = [max(-threshold, min(threshold, value + d)) for value, d in zip(old, delta)]
+            points = {'p1': 0, 'p2': 0}
+            for value, p1, p2 in zip(values, occupied_p1, occupied_p2):
+                if p1 != p2:
+                    if p1 and value >= threshold:
+                        points['p1'] += 1
+                    elif p2 and value <= -threshold:
+                        points['p2'] += 1
+            changed = [i for i, (value, previous) in enumerate(zip(values, old)) if value != previous]
+
+        game_state.record(self.restore, old)
+        self.values = values
+        for i in changed:
+            game_state.zobrist.spark_changed(self.vertices[i], old[i], values[i])
+        for player_id, owned in points.items():
+            if owned:
+                game_state.add_score(player_id, owned * self.score)
@@ -0,0 +1,226 @@
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+# Column name -> NumPy dtype of the vectorized backend
+COLUMNS = {
+    'vertex': 'int32',
+    'health': 'float64',
+    'max_health': 'float64',
+    'wait': 'int32',
+    'load': 'int32',
+    'capacity': 'int32',
+    'speed': 'int32',
+    'damage': 'int32',
+    'range': 'int32',
+    'spark_speed': 'int32',
+    'extraction_speed': 'int32',
+    'cost': 'int32',
+    'alive': 'bool',
+    'side': 'int8',             #+1 for p1, -1 for p2
+    'kind': 'int8',             #index of the unit type in UNIT_SPECS
+    'speed_mult': 'float64',        #cached boost multipliers, maintained by EffectScheduler
+    'damage_mult': 'float64',
+    'spark_mult': 'float64',
+}
+# Value of a freshly allocated row (0 otherwise)
+DEFAULTS = {'alive': True, 'speed_mult': 1, 'damage_mult': 1, 'spark_mult': 1}
+
+
+class Column:
+    """Descriptor exposing one store column as a unit attribute."""
+
+    def __init__(self, hashed: bool = False):
+        self.hashed = hashed        #part of the game state hash (see Zobrist)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, unit, owner=None):
+        if unit is None:
+            return self
+        return unit.store.read(self.name, unit.slot)
+
+    def __set__(self, unit, value):
+        unit.store.write(self.name, unit.slot, value)
+        if self.hashed:
+            unit.game_state.zobrist.update_unit(unit)
+
+
+class UnitStore:
+    """
+    Struct-of-arrays storage of every unit of a game: one column per attribute, one row per unit.
+    Rows are recycled through a free list; a handle (generation << 32 | slot) stays valid
+    only while its row holds the same unit, so removal is O(1).
+
+    vectorized=True keeps columns in NumPy arrays (turn-wide updates are array operations),
+    otherwise in Python lists (cheaper single-unit access, no numpy needed).
+
+    While journal is a list, every mutation appends its (undo_function, args) to it (see GameState.apply).
+    """
+
+    def __init__(self, vectorized: bool = False, capacity: int = 64):
+        self.vectorized = vectorized
+        self.capacity = 0
+        self.size = 0               #high-water mark of used rows
+        self.free = []              #released slots, reused LIFO
+        self.generation = []
+        self.units = []             #slot -> unit view (None when free)
+        self.journal = None
+        if vectorized:
+            import numpy as np
+            self.np = np
+            self.columns = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+            self.read = self.read_array
+        else:
+            self.columns = {name: [] for name in COLUMNS}
+            self.read = self.read_list
+        self.grow(capacity)
+
+    def copy(self):
+        """Independent copy of the data; the units list must be refilled with new views."""
+        clone = UnitStore.__new__(UnitStore)
+        clone.__dict__.update(self.__dict__)
+        clone.columns = {name: column.copy() for name, column in self.columns.items()}
+        clone.free = self.free.copy()
+        clone.generation = self.generation.copy()
+        clone.units = [None] * self.capacity
+        clone.journal = None
+        clone.read = clone.read_array if self.vectorized else clone.read_list
+        return clone
+
+    def write(self, name: str, slot: int, value):
+        column = self.columns[name]
+        if self.journal is not None:
+            self.journal.append((self.restore, (name, slot, column[slot])))
+        column[slot] = value
+
+    def restore(self, name: str, slot: int, value):
+        self.columns[name][slot] = value
+
+    def read_list(self, name: str, slot: int):
+        return self.columns[name][slot]
+
+    def read_array(self, name: str, slot: int):
+        return self.columns[name].item(slot)
+
+    def grow(self, capacity: int):
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for name, column in self.columns.items():
+            if self.vectorized:
+                self.columns[name] = self.np.concatenate([column, self.np.zeros(extra, dtype=column.dtype)])
+            else:
+                column.extend([False if name == 'alive' else 0] * extra)
+        self.generation.extend([0] * extra)
+        self.units.extend([None] * extra)
+        self.capacity = capacity
+
+    def allocate(self, unit, row=DEFAULTS) -> int:
+        """Reserve a row for unit, filled from row ({column: value}, 0 for missing columns), and return its handle."""
+        from_free = bool(self.free)
+        if from_free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.grow(max(2 * self.capacity, 1))
+            slot = self.size
+            self.size += 1
+        if self.journal is not None:
+            # A recycled row still holds the values of a unit whose removal may be undone too
+            self.journal.append((self.unallocate, (slot, from_free, self.row(slot) if from_free else None)))
+        for name, column in self.columns.items():
+            column[slot] = row.get(name, 0)
+        self.units[slot] = unit
+        return (self.generation[slot] << SLOT_BITS) | slot
+
+    def row(self, slot: int) -> dict:
+        return {name: column[slot] for name, column in self.columns.items()}
+
+    def unallocate(self, slot: int, from_free: bool, previous_row: dict = None):
+        """Undo allocate."""
+        self.columns['alive'][slot] = False
+        self.units[slot] = None
+        if from_free:
+            for name, value in previous_row.items():
+                self.columns[name][slot] = value
+            self.free.append(slot)
+        else:
+            self.size -= 1
+
+    def release(self, handle: int):
+        slot = handle & SLOT_MASK
+        if not self.is_valid(handle):
+            return
+        if self.journal is not None:
+            self.journal.append((self.unrelease, (slot, self.units[slot])))
+        self.columns['alive'][slot] = False
+        self.units[slot] = None
+        self.generation[slot] += 1
+        self.free.append(slot)
+
+    def unrelease(self, slot: int, unit):
+        """Undo release."""
+        self.free.remove(slot)
+        self.generation[slot] -= 1
+        self.units[slot] = unit
+        self.columns['alive'][slot] = True
+
+    def is_valid(self, handle: int) -> bool:
+        slot = handle & SLOT_MASK
+        return slot < self.size and self.generation[slot] == handle >> SLOT_BITS and self.units[slot] is not None
+
+    def get(self, handle: int):
+        """Unit behind a handle, or None if it has been removed since."""
+        return self.units[handle & SLOT_MASK] if self.is_valid(handle) else None
+
+    # Turn-wide operations
+
+    def tick_cooldowns(self):
+        """wait = max(wait - 1, 0) for every unit."""
+        wait = self.columns['wait']
+        if self.vectorized:
+            if self.journal is not None:
+                self.journal.append((self.untick, (self.np.flatnonzero(wait > 0),)))
+            self.np.subtract(wait, 1, out=wait, where=wait > 0)
+        else:
+            ticked = [slot for slot in range(self.size) if wait[slot] > 0]
+            for slot in ticked:
+                wait[slot] -= 1
+            if self.journal is not None:
+                self.journal.append((self.untick, (ticked,)))
+
+    def untick(self, slots):
+        wait = self.columns['wait']
+        for slot in slots:
+            wait[slot] += 1
+
+    def clamp_health(self):
+        """health = min(health, max_health) for every unit. Returns the clamped slots."""
+        health, max_health = self.columns['health'], self.columns['max_health']
+        if self.vectorized:
+            slots = self.np.flatnonzero(health > max_health)
+            if self.journal is not None:
+                self.journal.append((self.restore_many, ('health', slots, health[slots])))
+            self.np.minimum(health, max_health, out=health)
+            return slots.tolist()
+        else:
+            slots = [slot for slot in range(self.size) if health[slot] > max_health[slot]]
+            if self.journal is not None:
+                self.journal.append((self.restore_many, ('health', slots, [health[slot] for slot in slots])))
+            for slot in slots:
+                health[slot] = max_health[slot]
+            return slots
+
+    def restore_many(self, name: str, slots, values):
+        column = self.columns[name]
+        for slot, value in zip(slots, values):
+            column[slot] = value
+
+    def dead_slots(self) -> list[int]:
+        """Slots of live rows whose health dropped to 0 or below."""
+        health, alive = self.columns['health'], self.columns['alive']
+        if self.vectorized:
+            n = self.size
+            return self.np.flatnonzero(alive[:n] & (health[:n] <= 0)).tolist()
+        return [slot for slot in range(self.size) if alive[slot] and health[slot] <= 0]
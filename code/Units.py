@@ -1,9 +1,64 @@
 from __future__ import annotations
+from types import MappingProxyType
+from typing import NamedTuple
 import code.GameState as GameState
+from code.UnitStore import Column, SLOT_MASK, DEFAULTS
+from code.Effects import Effect, MULTIPLIERS
+
+
+class UnitSpec(NamedTuple):
+    """Base stats of a unit type (a unit spawns with health = max_health)."""
+
+    cost: int
+    max_health: int
+    speed: int
+    damage: int = 0
+    range: int = 0
+    spark_speed: int = 0
+    capacity: int = 0
+    extraction_speed: int = 0
+    healing_range: int = 0
+    healing_amount: int = 0
+
+
+# Stats of every spawnable unit type, by subtype
+UNIT_SPECS = MappingProxyType({
+    'minor':       UnitSpec(cost=10,  max_health=5,  speed=1, capacity=10, extraction_speed=2),
+    'transporter': UnitSpec(cost=10,  max_health=5,  speed=2, capacity=3, extraction_speed=1),
+    'corebot':     UnitSpec(cost=20,  max_health=5,  speed=1, damage=2, range=1, spark_speed=1),
+    'phasor':      UnitSpec(cost=30,  max_health=3,  speed=1, damage=2, range=3, spark_speed=1),
+    'megacore':    UnitSpec(cost=40,  max_health=10, speed=1, damage=1, range=0, spark_speed=1),
+    'sparker':     UnitSpec(cost=30,  max_health=5,  speed=2, damage=1, range=1, spark_speed=2),
+    'healer':      UnitSpec(cost=100, max_health=5,  speed=1, damage=1, range=1, spark_speed=2,
+                            healing_range=1, healing_amount=1),
+    'commandant':  UnitSpec(cost=100, max_health=7,  speed=1, damage=2, range=2, spark_speed=1),
+})
+
+
+def spawn_row(spec: UnitSpec, kind: int = 0) -> MappingProxyType:
+    """UnitStore row of a freshly spawned unit of the given spec (kind: index of its type in UNIT_SPECS)."""
+    row = dict(DEFAULTS)
+    row.update((name, value) for name, value in spec._asdict().items() if not name.startswith('healing'))
+    row['health'] = spec.max_health
+    row['kind'] = kind
+    return MappingProxyType(row)
 
 
 class Unit:
-    """Abstract class for a unit."""
+    """Abstract class for a unit: a lightweight view over one row of the game's UnitStore."""
+
+    __slots__ = ('game_state', 'map', 'player_id', 'my_units', 'id', 'store', 'slot', 'handle')
+    type = None
+    subtype = None
+    spec = None             #UnitSpec of spawnable types, set from UNIT_SPECS
+    row = DEFAULTS          #prebuilt store row copied at spawn
+
+    health = Column(hashed=True)
+    max_health = Column()
+    wait = Column()
+    speed = Column()
+    spark_speed = Column()
+    cost = Column()
 
     def __init__(self, game_state : GameState, player_id: str, unit_id : str):
         self.game_state = game_state
@@ -11,17 +66,35 @@ class Unit:
         self.player_id = player_id
         self.my_units = game_state.units[player_id]
         self.id = unit_id
-        self.type = None
-        self.position = self.map.base1 if player_id == 'p1' else self.map.base2
-        self.speed = None
-        self.max_health = None
-        self.health = None
-        self.spark_speed = 0
-        self.cost = 0
-        self.wait = 0
-        self.active_effects = {}      #{effect_name: (effect_value, duration)}
+        self.store = game_state.store
+        self.handle = self.store.allocate(self, self.row)       #generation << 32 | slot
+        self.slot = self.handle & SLOT_MASK
+        self.store.columns['vertex'][self.slot] = self.map.base1_id if player_id == 'p1' else self.map.base2_id
+        self.store.columns['side'][self.slot] = 1 if player_id == 'p1' else -1
+
+
+    @property
+    def vertex(self):
+        """Position as map vertex ID."""
+        return self.store.read('vertex', self.slot)
+
+    @vertex.setter
+    def vertex(self, vertex : int):
+        old_vertex = self.vertex
+        self.game_state.record(Unit.vertex.fset, self, old_vertex)
+        self.game_state.occupancy.move(self, old_vertex, vertex)
+        self.store.columns['vertex'][self.slot] = vertex
+        self.game_state.zobrist.update_unit(self)
+
+    @property
+    def position(self):
+        return self.map.vertex_names[self.vertex]
+
+    @position.setter
+    def position(self, vertex):
+        self.vertex = self.map.vertex_id(vertex)
+
 
-        
     @property
     def is_alive(self):
         return self.health > 0
@@ -29,35 +102,54 @@ class Unit:
 
     @property
     def damage_receiver(self):
-        return self.active_effects['protector'][0] if self.has_effect('protector') else self
+        return self.game_state.effects.value(self, Effect.PROTECTOR) or self
+
+    @property
+    def active_effects(self):
+        """{effect_name: (effect_value, remaining_turns)}"""
+        return self.game_state.effects.effects_of(self)
 
     def get_multiplier(self, attribute : str):
-        effect_name = f'{attribute}_boost'
-        return self.active_effects[effect_name][0] if self.has_effect(effect_name) else 1
+        return self.store.read(MULTIPLIERS[attribute][1], self.slot)
 
 
     def apply_boost(self, attribute : str, value : float, duration : int):
-        self.active_effects[f'{attribute}_boost'] = (value, duration)
+        self.game_state.effects.apply(self, MULTIPLIERS[attribute][0], value, duration)
+
+
+    def apply_effect(self, effect_name : str | Effect, value, duration : int = 1):
+        self.game_state.effects.apply(self, effect_name, value, duration)
 
+    def has_effect(self, effect_name : str | Effect):
+        return self.game_state.effects.has(self, effect_name)
 
-    def apply_effect(self, effect_name : str, value, duration : int = 1):
-        self.active_effects[effect_name] = (value, duration)
 
-    def has_effect(self, effect_name : str):
-        if effect_name not in self.active_effects:
-            return False
-        value, dur = self.active_effects[effect_name]
-        if dur <= 0:
-            del self.active_effects[effect_name]
-            return False
-        return True
+    def fork(self, game_state):
+        """Same unit as a view over the same row of game_state's (copied) store."""
+        clone = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in vars(cls).get('__slots__', ()):
+                object.__setattr__(clone, name, getattr(self, name))
+        clone.game_state = game_state
+        clone.map = game_state.map
+        clone.my_units = game_state.units[self.player_id]
+        clone.store = game_state.store
+        return clone
 
 
-    def end_turn(self):
-        for effect_name in list(self.active_effects):
-            value, dur = self.active_effects[effect_name]
-            self.active_effects[effect_name] = (value, dur - 1)
-            self.has_effect(effect_name)
+    def to_dict(self):
+        """Plain snapshot of the unit (units have no __dict__)."""
+        state = {'id': self.id, 'player_id': self.player_id, 'type': self.type, 'subtype': self.subtype,
+                 'position': self.position}
+        for cls in type(self).__mro__:
+            for name, attr in vars(cls).items():
+                if isinstance(attr, Column):
+                    state.setdefault(name, getattr(self, name))
+        if self.spec is not None:
+            for name, value in self.spec._asdict().items():
+                state.setdefault(name, value)
+        state['active_effects'] = dict(self.active_effects)
+        return state
 
 
     def take_damage(self, amount):
@@ -68,24 +160,20 @@ class Unit:
     def move(self, v):
         """Moves the unit to v if it is adjacent to it."""
 
-        assert self.map.distance(self.position, v) <= self.speed * self.get_multiplier('speed'), "Impossible move"
-        self.position = v
+        v = self.map.vertex_id(v)
+        assert self.map.within(self.vertex, v, int(self.speed * self.get_multiplier('speed'))), "Impossible move"
+        self.vertex = v
 
 
 class Worker(Unit):
     """Class for a worker unit."""
 
-    def __init__(self, game_state : GameState, player_id : str, unit_id : str):
-        super().__init__(game_state, player_id, unit_id)
-        self.max_health = 5
-        self.health = self.max_health
-        self.speed = 1
-        self.extraction_speed = 1
-        self.load = 0
-        self.capacity = 3
-        self.type = "worker"
-        self.cost = 10
+    __slots__ = ()
+    type = "worker"
 
+    extraction_speed = Column()
+    load = Column()
+    capacity = Column()
 
     @property
     def available_space(self):
@@ -97,20 +185,20 @@ class Worker(Unit):
     def extract(self):
         """Extracts resources from the map."""
 
-        assert self.load < self.capacity and self.map.resources(self.position) != 0, "Impossible extraction"
-        available_resources = self.map.resources(self.position)
+        available_resources = self.map.resource_counts[self.vertex]
+        assert self.load < self.capacity and available_resources != 0, "Impossible extraction"
         extracted_resources = min(available_resources, self.available_space, self.extraction_speed)
 
         self.load += extracted_resources
-        self.map.resources[self.position] -= extracted_resources
+        self.map.add_resources(self.vertex, -extracted_resources)
 
 
     def drop(self):
         """Drops resources on the base."""
 
-        assert (self.position == self.map.base1 and self.player_id == 'p1') or (
-                    self.position == self.map.base2 and self.player_id == 'p2'), "Drop location not allowed"
-        self.map.resources[self.position] += self.load
+        assert (self.vertex == self.map.base1_id and self.player_id == 'p1') or (
+                    self.vertex == self.map.base2_id and self.player_id == 'p2'), "Drop location not allowed"
+        self.map.add_resources(self.vertex, self.load)
         self.load = 0
 
 
@@ -118,50 +206,43 @@ class Worker(Unit):
         """Gives resources to another worker."""
 
         assert target.type == "worker", "Target not a worker"
-        assert target.position == self.position, "Target out of range"
+        assert target.vertex == self.vertex, "Target out of range"
         assert self.load > 0, "No resources to give"
         assert target.available_space > 0, "Target full"
 
         transferred_resources = min(self.load, target.available_space)
         self.load -= transferred_resources
         target.load += transferred_resources
-        
+
+
 class Minor(Worker):
     """Class for an extractor unit."""
-    def __init__(self, game_state : GameState, player_id : str, unit_id : str):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "minor"
-        self.speed = 1
-        self.extraction_speed = 2
-        self.capacity = 10
-        self.cost = 10
-        
-        
+
+    __slots__ = ()
+    subtype = "minor"
+
+
 class Transporter(Worker):
     """Class for an extractor unit."""
-    def __init__(self, game_state : GameState, player_id : str, unit_id : str):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "transporter"
-        self.speed = 2
-        self.extraction_speed = 1
-        self.capacity = 3
-        self.cost = 10
-    
+
+    __slots__ = ()
+    subtype = "transporter"
+
 
 class Army(Unit):
     """Class for an army unit."""
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.type = "army"
-        self.damage = 1
-        self.range = 1
-        self.spark_speed = 1
+
+    __slots__ = ()
+    type = "army"
+
+    damage = Column()
+    range = Column()
 
     def attack(self, target: Unit):
         """Attacks the target unit."""
         
         assert self.wait == 0, "Unit is waiting"
-        assert self.map.distance(self.position, target.position) <= self.range, "Target out of range"
+        assert self.map.within(self.vertex, target.vertex, self.range), "Target out of range"
         target.take_damage(self.damage * self.get_multiplier('damage'))
         self.wait = 1
 
@@ -169,54 +250,30 @@ class Army(Unit):
 class Corebot(Army):
     """Class for a basic fighter unit."""
 
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "corebot"
-        self.max_health = 5
-        self.health = self.max_health
-        self.speed = 1
-        self.damage = 2
-        self.range = 1
-        self.spark_speed = 1
-        self.cost = 20
+    __slots__ = ()
+    subtype = "corebot"
 
 
 class Phasor(Army):
     """Class for a longdistance unit."""
 
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "phasor"
-        self.max_health = 3
-        self.health = self.max_health
-        self.speed = 1
-        self.damage = 2
-        self.range = 3
-        self.spark_speed = 1
-        self.cost = 30
-        
+    __slots__ = ()
+    subtype = "phasor"
+
     def longshot(self, target: Unit):
         """Attacks the target unit with a longshot."""
         
         assert self.wait == 0, "Unit is waiting"
-        assert self.map.distance(self.position, target.position) <= self.range * 2, "Target out of range"
+        assert self.map.within(self.vertex, target.vertex, self.range * 2), "Target out of range"
         target.health -= self.damage * 2
         self.wait = 2
         
         
 class Megacore(Army):
     """Class for a highlevel health unit."""
-    
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "megacore"
-        self.max_health = 10
-        self.health = self.max_health
-        self.speed = 1
-        self.damage = 1
-        self.range = 0
-        self.spark_speed = 1
-        self.cost = 40
+
+    __slots__ = ()
+    subtype = "megacore"
 
     def protect(self, target: Unit):
         """Protects the target unit from damage."""
@@ -229,49 +286,31 @@ class Megacore(Army):
 class Sparker(Army):
     """Class for a spark unit."""
 
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "sparker"
-        self.max_health = 5
-        self.health = self.max_health
-        self.speed = 2
-        self.damage = 1
-        self.range = 1
-        self.spark_speed = 2
-        self.cost = 30
+    __slots__ = ()
+    subtype = "sparker"
 
     def spark_burst(self):
         """Increase spark_speed of every unit around."""
 
         assert self.wait == 0, "Unit is waiting"
-        for unit in self.game_state.units():
-            if (unit.player_id == self.player_id
-                    and unit.type == "army"
-                    and unit.position == self.position):
+        for unit in self.game_state.occupancy.units_at(self.vertex, self.player_id):
+            if unit.type == "army":
                 unit.apply_boost("spark", 2, 1)
         self.wait = 3
         
 class Healer(Army):
     """Class for a healer unit."""
-    
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "sparker"
-        self.max_health = 5
-        self.health = self.max_health
-        self.speed = 1
-        self.damage = 1
-        self.range = 1
-        self.healing_range = 1
-        self.healing_amount = 1
-        self.spark_speed = 2
-        self.cost = 100
-        
+
+    __slots__ = ()
+    subtype = "healer"
+    healing_range = UNIT_SPECS['healer'].healing_range
+    healing_amount = UNIT_SPECS['healer'].healing_amount
+
     def heal(self, target: Unit):
 
         """Heals the target unit."""
         assert self.wait == 0, "Unit is waiting"
-        assert self.map.distance(self.position, target.position) <= self.healing_range, "Target out of range"
+        assert self.map.within(self.vertex, target.vertex, self.healing_range), "Target out of range"
         assert target.health < target.max_health, "Target already full life"
         target.health = min(target.health + self.healing_amount, target.max_health)
         self.wait = 1
@@ -280,24 +319,15 @@ class Healer(Army):
         """Heals every unit in the healing range."""
 
         assert self.wait == 0, "Unit is waiting"
-        for unit in self.my_units:
-            if (self.map.distance(self.position, unit.position) <= self.healing_range
-                    and unit.health < unit.max_health):
+        for unit in self.game_state.units_within(self.vertex, self.healing_range, self.player_id):
+            if unit.health < unit.max_health:
                 unit.health = min(unit.health + self.healing_amount, unit.max_health)
         self.wait = 4
 
 
 class Commandant(Army):
-    def __init__(self, game_state, player_id, unit_id):
-        super().__init__(game_state, player_id, unit_id)
-        self.subtype = "commandant"
-        self.max_health = 7
-        self.health = self.max_health
-        self.speed = 1
-        self.damage = 2
-        self.range = 2
-        self.spark_speed = 1
-        self.cost = 100
+    __slots__ = ()
+    subtype = "commandant"
 
     def boost(self, target: Army):
         """Boosts the target unit's attributes."""
@@ -312,9 +342,23 @@ class Commandant(Army):
         """Boosts every unit around."""
 
         assert self.wait == 0, "Unit is waiting"
-        for unit in self.my_units:
-            if unit.type == "army" and unit.position == self.position:
+        for unit in self.game_state.occupancy.units_at(self.vertex, self.player_id):
+            if unit.type == "army":
                 unit.apply_boost("speed", 1.5, 2)
                 unit.apply_boost("damage", 1.5, 2)
         self.wait = 4
 
+
+def spawnable_classes(cls=Unit):
+    for subclass in cls.__subclasses__():
+        if subclass.subtype is not None:
+            yield subclass
+        yield from spawnable_classes(subclass)
+
+
+# Registry of spawnable unit types, built once and shared by every GameState
+UNIT_REGISTRY = MappingProxyType({cls.subtype: cls for cls in spawnable_classes()})
+assert UNIT_REGISTRY.keys() == UNIT_SPECS.keys(), "Every unit subtype needs a spec"
+for cls in UNIT_REGISTRY.values():
+    cls.spec = UNIT_SPECS[cls.subtype]
+    cls.row = spawn_row(cls.spec, list(UNIT_SPECS).index(cls.subtype))
@@ -0,0 +1,375 @@
+"""
+N independent games on one map, stepped in lockstep, for reinforcement learning.
+
+    env = VecEnv("examples/small.txt", num_games=64, max_turns=300)
+    observations = env.reset()                  # (N, 2, CHANNELS, V) float32, one view per player
+    observations, rewards, dones, infos = env.step(actions)       # actions: (N, 2, V + 1) integers
+
+Observations are feature planes over the V vertices of the expanded map, written in place into one
+preallocated batch array (env.step returns that same array). observations[g, p] is game g seen by
+player p: its own planes first, the enemy's next, spark values signed so that positive favors p.
+
+    own / enemy unit counts per unit type (2 * len(UNIT_TYPES) planes), own / enemy health sums,
+    own / enemy loads, resources, spark values / threshold, own base, enemy base, spark spots
+
+Actions: actions[g, p, v] is the command of every unit of p standing on vertex v (STAY, MOVE + k
+to the k-th neighbor of v, EXTRACT, DROP, ATTACK the enemy in range that was spawned first),
+actions[g, p, V] is a spawn (0 for none, 1 + i for UNIT_TYPES[i]). Commands a unit cannot carry
+out are ignored, like actions the engine rejects. Rewards are the score each player gained during
+the step. A game that reaches max_turns is done: its final scores are in its info, and it is
+reset in place.
+
+The games are not GameState objects: the units of all N games live in (N, rows) arrays laid out
+like the columnar UnitStore (same column names and dtypes, one row per unit, stats looked up by
+unit type), and resources, spark values, scores and turns in (N, ...) arrays. A step resolves
+spawn, move, combat and economy, spark scoring, cooldowns and deaths for every game at once with
+NumPy operations, in the order and with the rules of GameState.step, so the hot path has neither
+a per-game nor a per-unit Python loop. Only what the commands above can cause is modelled: no
+timed effects or boosts can arise, so multipliers stay 1 and nobody is protected.
+game_state(g) rebuilds a GameState from the arrays and actions(g, p, commands) translates commands
+to the equivalent Action list; both are per-unit Python, for inspection and reference checks.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from code.GameState import GameState
+from code.Actions import Action
+from code.DistanceTable import DistanceTable
+from code.UnitStore import COLUMNS
+from code.Units import UNIT_SPECS, UNIT_REGISTRY
+
+UNIT_TYPES = tuple(UNIT_SPECS)
+T = len(UNIT_TYPES)
+PLAYERS = ('p1', 'p2')
+
+# Planes of a player's view
+OWN_UNITS = 0
+ENEMY_UNITS = T
+OWN_HEALTH, ENEMY_HEALTH, OWN_LOAD, ENEMY_LOAD, RESOURCES, SPARKS, OWN_BASE, ENEMY_BASE, SPARK_SPOTS = range(2 * T, 2 * T + 9)
+CHANNELS = 2 * T + 9
+
+STAY = 0
+MOVE = 1        #MOVE + k: to the k-th neighbor
+
+# Per-unit columns of the batch (UnitStore names and dtypes), plus the spawn order used to pick targets
+UNIT_COLUMNS = {name: COLUMNS[name] for name in ('alive', 'side', 'kind', 'vertex', 'health', 'wait', 'load')}
+UNIT_COLUMNS.update(serial='int32', born='int64')       #N of p1_minor_N; 2 * turn + player of the spawn
+
+
+class VecEnv:
+    """num_games games of map_file, each with two players, observed and commanded through arrays."""
+
+    def __init__(self, map_file: Path, num_games: int, max_turns: int = 500, rows: int = 16):
+        self.template = GameState(map_file, columnar=True)      #static map data, and the start of every game
+        self.num_games = N = num_games
+        self.max_turns = max_turns
+        game_map = self.template.map
+        self.num_vertices = V = len(game_map.vertex_names)
+
+        # Neighbor k of every vertex (-1 past its degree), and hop distances for attack ranges
+        offsets = np.asarray(game_map.offsets, dtype=np.int64)
+        degrees = np.diff(offsets)
+        self.max_degree = D = int(degrees.max()) if V else 0
+        self.neighbors = np.full((V, D), -1, dtype=np.int64)
+        rows_of = np.repeat(np.arange(V), degrees)
+        self.neighbors[rows_of, np.arange(len(rows_of)) - offsets[rows_of]] = np.asarray(game_map.targets, dtype=np.int64)
+        self.distances = DistanceTable.compute(game_map.offsets, game_map.targets, V)
+        self.EXTRACT, self.DROP, self.ATTACK = D + 1, D + 2, D + 3
+        self.num_commands = D + 4
+        self.num_spawns = T + 1
+
+        # Stats by unit type
+        self.stats = {name: np.array([getattr(UNIT_SPECS[unit_type], name) for unit_type in UNIT_TYPES])
+                      for name in ('max_health', 'damage', 'range', 'spark_speed', 'capacity', 'extraction_speed')}
+        self.is_worker = np.array([UNIT_REGISTRY[unit_type].type == "worker" for unit_type in UNIT_TYPES])
+        self.bases = np.array([game_map.base1_id, game_map.base2_id], dtype=np.int64)
+
+        sparks = self.template.sparks
+        self.spark_vertices = np.asarray(sparks.vertices, dtype=np.int64)
+        self.spot_index = np.full(V, -1, dtype=np.int64)       #vertex ID -> spot or -1
+        self.spot_index[self.spark_vertices] = np.arange(len(self.spark_vertices))
+        self.threshold = sparks.threshold
+        self.spark_score = sparks.score
+        self.initial_resources = np.array(game_map.resource_counts, dtype=np.int64)
+
+        # Game state
+        self.units = {name: np.zeros((N, rows), dtype=dtype) for name, dtype in UNIT_COLUMNS.items()}
+        self.created = np.zeros((N, 2, T), dtype=np.int64)       #units spawned so far, by player and type
+        self.resources = np.tile(self.initial_resources, (N, 1))
+        self.spark_values = np.zeros((N, len(self.spark_vertices)))
+        self.scores = np.zeros((N, 2), dtype=np.int64)
+        self.turns = np.zeros(N, dtype=np.int64)
+
+        self.observations = np.zeros((N, 2, CHANNELS, V), dtype=np.float32)
+        for player, (own, enemy) in enumerate(((game_map.base1_id, game_map.base2_id),
+                                               (game_map.base2_id, game_map.base1_id))):
+            self.observations[:, player, OWN_BASE, own] = 1
+            self.observations[:, player, ENEMY_BASE, enemy] = 1
+        self.observations[:, :, SPARK_SPOTS, self.spark_vertices] = 1
+        self.rewards = np.zeros((N, 2), dtype=np.float32)
+        self.dones = np.zeros(N, dtype=bool)
+
+    def reset(self) -> np.ndarray:
+        self.clear(np.ones(self.num_games, dtype=bool))
+        self.encode()
+        return self.observations
+
+    def clear(self, games: np.ndarray):
+        """Put the games of the mask back to their start."""
+        self.units['alive'][games] = False
+        self.created[games] = 0
+        self.resources[games] = self.initial_resources
+        self.spark_values[games] = 0
+        self.scores[games] = 0
+        self.turns[games] = 0
+
+    def grow(self, rows: int):
+        for name, column in self.units.items():
+            wider = np.zeros((self.num_games, rows), dtype=column.dtype)
+            wider[:, :column.shape[1]] = column
+            self.units[name] = wider
+
+    def encode(self):
+        """Write the dynamic planes of every game into both players' views."""
+        units = self.units
+        N, V = self.num_games, self.num_vertices
+        g, row = np.nonzero(units['alive'])
+        player = (units['side'][g, row] < 0).astype(np.int64)      #0 for p1, 1 for p2
+        vertex = units['vertex'][g, row]
+        cells = (2 * g + player) * V + vertex
+        counts = np.bincount((2 * g + player) * T * V + units['kind'][g, row].astype(np.int64) * V + vertex,
+                             minlength=N * 2 * T * V).reshape(N, 2, T, V)
+        health = np.bincount(cells, units['health'][g, row], minlength=N * 2 * V).reshape(N, 2, V)
+        load = np.bincount(cells, units['load'][g, row], minlength=N * 2 * V).reshape(N, 2, V)
+        spark_plane = np.zeros((N, V))
+        spark_plane[:, self.spark_vertices] = self.spark_values / self.threshold
+
+        views = self.observations
+        for player in (0, 1):
+            enemy = 1 - player
+            view = views[:, player]
+            view[:, OWN_UNITS:OWN_UNITS + T] = counts[:, player]
+            view[:, ENEMY_UNITS:ENEMY_UNITS + T] = counts[:, enemy]
+            view[:, OWN_HEALTH], view[:, ENEMY_HEALTH] = health[:, player], health[:, enemy]
+            view[:, OWN_LOAD], view[:, ENEMY_LOAD] = load[:, player], load[:, enemy]
+            view[:, RESOURCES] = self.resources
+            view[:, SPARKS] = spark_plane if player == 0 else -spark_plane
+
+    def orders(self, actions: np.ndarray) -> np.ndarray:
+        """(N, rows) command of every unit (STAY for free rows), from the commands of its vertex."""
+        units = self.units
+        player = (units['side'] < 0).astype(np.int64)
+        games = np.arange(self.num_games)[:, None]
+        return np.where(units['alive'], actions[games, player, units['vertex']], STAY)
+
+    def attack_targets(self, attackers: np.ndarray) -> np.ndarray:
+        """
+        (N, rows) row of the target of every unit of the attackers mask, -1 if none: the enemy
+        within range that was spawned first.
+        """
+        units = self.units
+        targets = np.full(attackers.shape, -1, dtype=np.int64)
+        g, row = np.nonzero(attackers)
+        if len(g):
+            vertex, side = units['vertex'][g, row], units['side'][g, row]
+            radius = self.stats['range'][units['kind'][g, row]]
+            enemy = units['alive'][g] & (units['side'][g] != side[:, None])
+            in_range = enemy & (self.distances[vertex[:, None], units['vertex'][g]] <= radius[:, None])
+            first = np.where(in_range, units['born'][g], np.iinfo(np.int64).max).argmin(axis=1)
+            targets[g, row] = np.where(in_range.any(axis=1), first, -1)
+        return targets
+
+    def spawn(self, spawns: np.ndarray):
+        """Spawn the (N, 2) unit types (1 + index in UNIT_TYPES, 0 for none), p1 before p2."""
+        units = self.units
+        free = units['alive'].shape[1] - units['alive'].sum(axis=1)
+        if (free < (spawns > 0).sum(axis=1)).any():
+            self.grow(2 * units['alive'].shape[1])
+        for player in (0, 1):
+            kind = spawns[:, player] - 1
+            g = np.flatnonzero((kind >= 0) & (kind < T))
+            if not len(g):
+                continue
+            kind = kind[g]
+            row = units['alive'][g].argmin(axis=1)      #first free row
+            self.created[g, player, kind] += 1
+            units['alive'][g, row] = True
+            units['side'][g, row] = 1 if player == 0 else -1
+            units['kind'][g, row] = kind
+            units['vertex'][g, row] = self.bases[player]
+            units['health'][g, row] = self.stats['max_health'][kind]
+            units['wait'][g, row] = 0
+            units['load'][g, row] = 0
+            units['serial'][g, row] = self.created[g, player, kind]
+            units['born'][g, row] = 2 * self.turns[g] + player
+
+    def extract(self, extracting: np.ndarray):
+        """Extraction by the workers of the mask, in row order on each vertex while resources last."""
+        units = self.units
+        g, row = np.nonzero(extracting)
+        if not len(g):
+            return
+        kind = units['kind'][g, row]
+        load = units['load'][g, row]
+        want = np.minimum(self.stats['capacity'][kind] - load, self.stats['extraction_speed'][kind])
+        cells = g * self.num_vertices + units['vertex'][g, row]
+        order = np.argsort(cells, kind='stable')
+        cells, want = cells[order], want[order]
+        starts = np.r_[True, cells[1:] != cells[:-1]]
+        before = np.cumsum(want) - want         #wanted by the previous workers...
+        before -= before[starts][np.cumsum(starts) - 1]     #...of the same vertex
+        available = self.resources.reshape(-1)[cells]
+        extracted = np.clip(available - before, 0, want)
+        units['load'][g[order], row[order]] += extracted.astype(units['load'].dtype)
+        np.subtract.at(self.resources.reshape(-1), cells, extracted)
+
+    def step(self, actions: np.ndarray):
+        """
+        Play one turn of every game. Returns (observations, rewards, dones, infos): infos[g] is
+        {'scores': ..., 'turns': ...} for a game that just finished (and was reset), else None.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        assert actions.shape == (self.num_games, 2, self.num_vertices + 1), "actions must be (N, 2, V + 1)"
+        N = self.num_games
+        units = self.units
+        before = self.scores.copy()
+
+        # Orders and attack targets are read from the state the commands were given for
+        orders = self.orders(actions)
+        targets = self.attack_targets(orders == self.ATTACK)
+        self.spawn(actions[:, :, -1])
+        if units['alive'].shape[1] != orders.shape[1]:      #grown by the spawns: new rows have no orders
+            rows = units['alive'].shape[1]
+            orders = np.pad(orders, ((0, 0), (0, rows - orders.shape[1])))
+            targets = np.pad(targets, ((0, 0), (0, rows - targets.shape[1])), constant_values=-1)
+        games = np.arange(N)[:, None]
+        kind = units['kind']
+        player = (units['side'] < 0).astype(np.int64)
+
+        # Move
+        moving = (orders >= MOVE) & (orders <= self.max_degree)
+        destination = self.neighbors[units['vertex'], np.where(moving, orders - MOVE, 0)]
+        moving &= destination >= 0
+        units['vertex'][moving] = destination[moving]
+
+        # Combat: targets may have moved out of range in the meantime
+        g, row = np.nonzero((targets >= 0) & ~self.is_worker[kind] & (units['wait'] == 0))
+        target = targets[g, row]
+        hit = self.distances[units['vertex'][g, row], units['vertex'][g, target]] <= self.stats['range'][kind[g, row]]
+        g, row, target = g[hit], row[hit], target[hit]
+        np.subtract.at(units['health'], (g, target), self.stats['damage'][kind[g, row]])
+        units['wait'][g, row] = 1
+
+        # Economy, one player after the other: drops on the own base, then extraction
+        workers = self.is_worker[kind]
+        for p in (0, 1):
+            mine = workers & (player == p)
+            dropping = mine & (orders == self.DROP) & (units['vertex'] == self.bases[p])
+            self.resources[:, self.bases[p]] += np.where(dropping, units['load'], 0).sum(axis=1)
+            units['load'][dropping] = 0
+            self.extract(mine & (orders == self.EXTRACT))
+
+        # Spark points (units killed this turn still stand on them), cooldowns and deaths
+        alive = units['alive']
+        spots = self.spot_index[units['vertex']]
+        present = alive & (spots >= 0)
+        g, row = np.nonzero(present)
+        k = len(self.spark_vertices)
+        cells = g * k + spots[g, row]
+        side = units['side'][g, row]
+        delta = np.bincount(cells, self.stats['spark_speed'][kind[g, row]] * side, minlength=N * k).reshape(N, k)
+        occupied_p1 = np.bincount(cells[side > 0], minlength=N * k).reshape(N, k) > 0
+        occupied_p2 = np.bincount(cells[side < 0], minlength=N * k).reshape(N, k) > 0
+        self.spark_values = values = np.clip(self.spark_values + delta, -self.threshold, self.threshold)
+        uncontested = ~(occupied_p1 & occupied_p2)
+        self.scores[:, 0] += self.spark_score * np.count_nonzero(uncontested & occupied_p1 & (values >= self.threshold), axis=1)
+        self.scores[:, 1] += self.spark_score * np.count_nonzero(uncontested & occupied_p2 & (values <= -self.threshold), axis=1)
+
+        self.turns += 1
+        np.subtract(units['wait'], 1, out=units['wait'], where=units['wait'] > 0)
+        alive &= units['health'] > 0
+
+        self.rewards[:] = self.scores - before
+        self.dones[:] = self.turns >= self.max_turns
+        infos = [None] * N
+        for g in np.flatnonzero(self.dones).tolist():
+            infos[g] = {'scores': dict(zip(PLAYERS, self.scores[g].tolist())), 'turns': int(self.turns[g])}
+        if self.dones.any():
+            self.clear(self.dones)
+        self.encode()
+        return self.observations, self.rewards, self.dones, infos
+
+    def sample_actions(self, rng: np.random.Generator, spawn_probability: float = 0.1) -> np.ndarray:
+        """Uniformly random commands (and occasional spawns), e.g. for smoke tests and benchmarks."""
+        actions = rng.integers(0, self.num_commands, size=(self.num_games, 2, self.num_vertices + 1))
+        spawns = rng.integers(1, self.num_spawns, size=(self.num_games, 2))
+        actions[:, :, -1] = np.where(rng.random((self.num_games, 2)) < spawn_probability, spawns, 0)
+        return actions
+
+    # Per-unit views, off the hot path
+
+    def unit_ids(self, g: int) -> dict:
+        """{row: unit_id} of the live units of game g."""
+        units = self.units
+        return {row: f"{PLAYERS[int(units['side'][g, row] < 0)]}_{UNIT_TYPES[units['kind'][g, row]]}_{units['serial'][g, row]}"
+                for row in np.flatnonzero(units['alive'][g]).tolist()}
+
+    def actions(self, g: int, player: int, commands: np.ndarray) -> list:
+        """
+        The Action list GameState.step resolves like step() resolves the (V + 1,) command row of
+        player in game g (call it before step). Drops are listed before extractions, as step() does them.
+        """
+        units = self.units
+        ids = self.unit_ids(g)
+        orders = self.orders(np.broadcast_to(commands, (self.num_games, 2, len(commands))))[g]
+        targets = self.attack_targets(np.eye(self.num_games, dtype=bool)[g][:, None] & (orders == self.ATTACK))[g]
+        actions = []
+        spawn = int(commands[-1])
+        if 0 < spawn <= T:
+            actions.append(Action(None, 'spawn', UNIT_TYPES[spawn - 1]))
+        drops, extractions = [], []
+        for row, unit_id in ids.items():
+            if (units['side'][g, row] < 0) != bool(player):
+                continue
+            order, worker = int(orders[row]), self.is_worker[units['kind'][g, row]]
+            if MOVE <= order <= self.max_degree:
+                target = int(self.neighbors[units['vertex'][g, row], order - MOVE])
+                if target >= 0:
+                    actions.append(Action(unit_id, 'move', target))
+            elif order == self.ATTACK and not worker and targets[row] >= 0:
+                actions.append(Action(unit_id, 'attack', ids[int(targets[row])]))
+            elif order == self.DROP and worker:
+                drops.append(Action(unit_id, 'drop'))
+            elif order == self.EXTRACT and worker:
+                extractions.append(Action(unit_id, 'extract'))
+        return actions + drops + extractions
+
+    def game_state(self, g: int) -> GameState:
+        """Game g as a GameState (a fork of the template with the units, resources, sparks and scores of g)."""
+        units = self.units
+        game_state = self.template.fork()
+        game_map = game_state.map
+        game_state.effects.turn = int(self.turns[g])
+        game_state.scores.update(zip(PLAYERS, self.scores[g].tolist()))
+        for vertex in np.flatnonzero(self.resources[g] != self.initial_resources).tolist():
+            game_map.set_value(game_map.resource_counts, vertex, int(self.resources[g, vertex]))
+        engine = game_state.sparks
+        for i, vertex in enumerate(engine.vertices):
+            old, new = engine.value_at(i), float(self.spark_values[g, i])
+            engine.values[i] = new
+            game_state.zobrist.spark_changed(vertex, old, new)
+        store = game_state.store
+        for row in sorted(self.unit_ids(g), key=lambda row: units['born'][g, row]):
+            player_id, unit_type = PLAYERS[int(units['side'][g, row] < 0)], UNIT_TYPES[units['kind'][g, row]]
+            game_state.unit_created[player_id][unit_type] = int(units['serial'][g, row]) - 1
+            unit = game_state.new_unit(player_id, unit_type)
+            unit.vertex = int(units['vertex'][g, row])
+            for name in ('health', 'wait', 'load'):
+                store.write(name, unit.slot, units[name][g, row].item())
+            game_state.zobrist.update_unit(unit)       #health is part of the hash
+        for player_id, created in zip(PLAYERS, self.created[g]):
+            for unit_type, count in zip(UNIT_TYPES, created.tolist()):
+                if count:
+                    game_state.unit_created[player_id][unit_type] = count
+        return game_state
@@ -0,0 +1,166 @@
+MASK64 = (1 << 64) - 1
+
+# Key families
+UNIT, HEALTH, RESOURCES, SPARK, SIDE = range(5)
+
+HEALTH_BUCKET = 1       #health points per bucket
+SPARK_BUCKET = 10       #spark value points per bucket
+
+
+def splitmix64(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def zobrist_key(*parts: int) -> int:
+    """Pseudo-random 64-bit key of a feature, computed on the fly (no key tables to store)."""
+    key = 0
+    for part in parts:
+        key = splitmix64(key ^ (part & MASK64))
+    return key
+
+
+class Zobrist:
+    """
+    Incremental 64-bit hash of a GameState: units (type, owner, position, health bucket),
+    resources per vertex, spark value buckets and side to move.
+    Feature keys are combined by addition modulo 2**64 rather than XOR, so that two identical
+    units on the same vertex do not cancel out; every update is still O(1).
+    """
+
+    def __init__(self, game_state):
+        self.type_codes = {cls: i for i, cls in enumerate(sorted(game_state.unit_registry.values(), key=lambda c: c.__name__))}
+        self.unit_keys = {}     #{slot: key currently contributed by the unit in that row}
+        self.journal = None     #undo log, see UnitStore
+        self.side = 'p1'        #side to move, for alternating-move search
+        self.hash = self.full_hash(game_state)
+
+    def full_hash(self, game_state) -> int:
+        """Hash of game_state computed from scratch (the incremental hash must always equal it)."""
+        value = sum(self.resources_key(vertex, amount) for vertex, amount in enumerate(game_state.map.resource_counts))
+        value += sum(self.spark_key(vertex, spark_point.value) for vertex, spark_point in game_state.spark_points.items())
+        value += sum(self.unit_key(unit) for units in game_state.units.values() for unit in units)
+        if self.side != 'p1':
+            value += zobrist_key(SIDE)
+        return value & MASK64
+
+    def copy(self):
+        clone = Zobrist.__new__(Zobrist)
+        clone.type_codes = self.type_codes
+        clone.unit_keys = dict(self.unit_keys)
+        clone.journal = None
+        clone.side = self.side
+        clone.hash = self.hash
+        return clone
+
+    def unit_key(self, unit) -> int:
+        type_code = self.type_codes[type(unit)]
+        owner = 0 if unit.player_id == 'p1' else 1
+        return (zobrist_key(UNIT, type_code, owner, unit.vertex)
+                + zobrist_key(HEALTH, type_code, owner, int(unit.health) // HEALTH_BUCKET)) & MASK64
+
+    @staticmethod
+    def resources_key(vertex: int, amount: int) -> int:
+        return zobrist_key(RESOURCES, vertex, amount) if amount else 0
+
+    @staticmethod
+    def spark_key(vertex: int, value) -> int:
+        return zobrist_key(SPARK, vertex, int(value) // SPARK_BUCKET)
+
+    def set_hash(self, value: int):
+        if self.journal is not None:
+            self.journal.append((setattr, (self, 'hash', self.hash)))
+        self.hash = value
+
+    def set_unit_key(self, slot: int, key):
+        if self.journal is not None:
+            previous = self.unit_keys.get(slot)
+            self.journal.append((self.unit_keys.__setitem__, (slot, previous)) if previous is not None
+                                else (self.unit_keys.pop, (slot,)))
+        if key is None:
+            self.unit_keys.pop(slot)
+        else:
+            self.unit_keys[slot] = key
+
+    def add_unit(self, unit):
+        key = self.unit_key(unit)
+        self.set_unit_key(unit.slot, key)
+        self.set_hash((self.hash + key) & MASK64)
+
+    def remove_unit(self, unit):
+        key = self.unit_keys.get(unit.slot)
+        if key is not None:
+            self.set_unit_key(unit.slot, None)
+            self.set_hash((self.hash - key) & MASK64)
+
+    def update_unit(self, unit):
+        """Rehash a unit after its position or health changed (no-op for units not in play yet)."""
+        old_key = self.unit_keys.get(unit.slot)
+        if old_key is None:
+            return
+        key = self.unit_key(unit)
+        if key != old_key:
+            self.set_unit_key(unit.slot, key)
+            self.set_hash((self.hash - old_key + key) & MASK64)
+
+    def vertex_value_changed(self, game_map, data, vertex: int, old, new):
+        """Map listener: a per-vertex value went from old to new."""
+        if data is game_map.resource_counts:
+            self.set_hash((self.hash - self.resources_key(vertex, old) + self.resources_key(vertex, new)) & MASK64)
+
+    def spark_changed(self, vertex: int, old, new):
+        old_key, key = self.spark_key(vertex, old), self.spark_key(vertex, new)
+        if key != old_key:
+            self.set_hash((self.hash - old_key + key) & MASK64)
+
+    def set_side(self, player_id: str):
+        if player_id == self.side:
+            return
+        if self.journal is not None:
+            self.journal.append((setattr, (self, 'side', self.side)))
+        delta = zobrist_key(SIDE) if player_id != 'p1' else -zobrist_key(SIDE)
+        self.side = player_id
+        self.set_hash((self.hash + delta) & MASK64)
+
+
+EXACT, LOWER, UPPER = range(3)
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by Zobrist hash.
+    Replacement policy: an entry is overwritten by the same position, by a search at least as deep,
+    or by anything once it is older than the current search generation.
+    """
+
+    def __init__(self, size_log2: int = 20):
+        self.mask = (1 << size_log2) - 1
+        self.entries = [None] * (1 << size_log2)     #(hash, depth, value, flag, move, generation)
+        self.generation = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self):
+        """Age every stored entry (they stay usable but become replaceable)."""
+        self.generation += 1
+
+    def probe(self, key: int, depth: int = 0):
+        """(value, flag, move) of a stored search of key at least depth deep, or None."""
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is None or entry[0] != key or entry[1] < depth:
+            return None
+        self.hits += 1
+        return entry[2], entry[3], entry[4]
+
+    def store(self, key: int, depth: int, value, flag: int = EXACT, move=None):
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or depth >= entry[1] or entry[5] != self.generation:
+            self.entries[index] = (key, depth, value, flag, move, self.generation)
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+        self.hits = self.probes = 0
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameMap import AbstractMap
+from code.MapGenerator import generate_map
+from code.Benchmark import run_benchmarks, compare
+
+
+def test_generated_maps_are_reproducible_and_valid(tmp_path):
+    first = generate_map(tmp_path / "a.txt", 12, 9, seed=4, fill=0.7, spark_spots=3)
+    second = generate_map(tmp_path / "b.txt", 12, 9, seed=4, fill=0.7, spark_spots=3)
+    assert first.read_text() == second.read_text()
+
+    abstract_map = AbstractMap.from_file(first)      # validates counts, vertices and base connectivity
+    assert sum(abstract_map.sparking_spots.values()) == 3
+    assert all(1 <= dist <= 5 for _, _, dist in abstract_map.edges)
+    assert len(abstract_map.grid_matrix) == 12
+
+
+def test_benchmark_report_and_baseline_comparison(tmp_path):
+    report = run_benchmarks(['6x6'], ['load', 'distance', 'turn'], repeat=1, map_dir=tmp_path)
+    assert set(report['results']['6x6']) == {'load', 'distance', 'turn'}
+    assert report['maps']['6x6']['vertices'] == 36
+
+    assert compare(report, report) == []
+    faster = {'results': {'6x6': {name: seconds / 10 for name, seconds in report['results']['6x6'].items()}}}
+    assert {regression[1] for regression in compare(report, faster)} == {'load', 'distance', 'turn'}
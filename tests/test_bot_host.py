@@ -0,0 +1,103 @@
+import sys
+import time
+import random
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+sys.path.append(str(ROOT / "tests"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Bots import economy_bot, random_bot
+from code.BotHost import BotHost, SharedState, StateMirror
+from code.Runner import play_match
+
+map_file = MAP_DIR / "small.txt"
+
+
+def sleepy_bot(game_state, player_id, rng):
+    if game_state.turn == 2:
+        time.sleep(10)
+    return []
+
+
+def broken_bot(game_state, player_id, rng):
+    raise RuntimeError("no idea")
+
+
+def test_mirror_follows_the_game():
+    game_state = GameState(map_file)
+    shared = SharedState(game_state, capacity=2)
+    mirror = StateMirror(map_file)
+    rng = random.Random(0)
+    try:
+        for _ in range(60):
+            game_state.step(economy_bot(game_state, 'p1', rng), economy_bot(game_state, 'p2', rng))
+            shared.publish()
+            mirror.attach(shared.name, shared.layout.capacity)
+            view = mirror.sync()
+            assert view.turn == game_state.turn and view.scores == game_state.scores
+            assert list(view.map.resource_counts) == list(game_state.map.resource_counts)
+            assert {unit_id: (unit.vertex, unit.health, unit.load) for unit_id, unit in view.units_by_id.items()} == \
+                   {unit_id: (unit.vertex, unit.health, unit.load) for unit_id, unit in game_state.units_by_id.items()}
+        assert shared.layout.capacity > 2
+        with pytest.raises(TypeError):
+            mirror.views['vertex'][0] = 1       # read-only
+    finally:
+        mirror.close()
+        shared.close()
+
+
+def test_mirror_hash_follows_the_game():
+    game_state = GameState(map_file)
+    shared = SharedState(game_state)
+    mirror = StateMirror(map_file)
+    rng = random.Random(0)
+    try:
+        for _ in range(40):
+            game_state.step(random_bot(game_state, 'p1', rng, 0.5), random_bot(game_state, 'p2', rng, 0.5))
+            shared.publish()
+            mirror.attach(shared.name, shared.layout.capacity)
+            view = mirror.sync()
+            assert view.hash == game_state.hash == view.zobrist.full_hash(view)
+    finally:
+        mirror.close()
+        shared.close()
+
+
+def test_workers_play_like_in_process_bots():
+    reference, game_state = GameState(map_file), GameState(map_file)
+    rngs = {player_id: random.Random(f"0:{player_id}") for player_id in ('p1', 'p2')}
+    with BotHost(game_state, {'p1': 'economy', 'p2': 'economy'}, seed=0, budget=5) as host:
+        for _ in range(40):
+            expected = [[tuple(action) for action in economy_bot(reference, player_id, rngs[player_id])]
+                        for player_id in ('p1', 'p2')]
+            actions = host.decide()
+            assert [list(player_actions) for player_actions in actions] == expected
+            reference.step(*expected)
+            game_state.step(*actions)
+    assert reference.hash == game_state.hash
+
+
+def test_slow_and_broken_bots_lose_their_turn():
+    game_state = GameState(map_file)
+    with BotHost(game_state, {'p1': 'test_bot_host:sleepy_bot', 'p2': 'test_bot_host:broken_bot'},
+                 budget=0.5) as host:
+        for _ in range(4):
+            start = time.perf_counter()
+            assert host.decide() == ([], [])
+            assert time.perf_counter() - start < 3
+            game_state.step([], [])
+        assert host.failures['p1'] == [(2, 'timeout')]
+        assert [turn for turn, _ in host.failures['p2']] == [0, 1, 2, 3]
+        assert "RuntimeError" in host.failures['p2'][0][1]
+        assert host.workers['p1'].process.is_alive()        # restarted after the kill
+
+
+def test_runner_bot_budget():
+    result = play_match(map_file, 'random', 'economy', seed=0, max_turns=30, bot_budget=5)
+    assert result['status'] == 'turn_cap' and result['bot_failures'] == {'p1': 0, 'p2': 0}
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+import numpy as np
+
+from code.GameMap import Map
+from code.DistanceTable import DistanceTable
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_table_matches_bfs(tmp_path):
+    game_map = Map.from_file(map_file)
+    vertices = list(game_map.resources)
+    expected = {(u, v): game_map.distance(u, v) for u in vertices for v in vertices}
+
+    game_map.precompute_distances(cache_dir=tmp_path)
+    assert all(game_map.distance(u, v) == d for (u, v), d in expected.items())
+
+
+def test_table_widened_for_long_paths():
+    n = 300
+    offsets, targets = Map.build_csr(n + 2, [(i, i + 1) for i in range(n - 1)] + [(n, n + 1)])
+    matrix = DistanceTable.compute(offsets, targets, n + 2)
+    assert matrix.dtype == np.int16
+    assert matrix[0, n - 1] == matrix[n - 1, 0] == n - 1 and matrix[n, n + 1] == 1
+    assert matrix[0, n] == matrix[n + 1, 5] == np.iinfo(np.int16).max
+
+    short = DistanceTable.compute(*Map.build_csr(4, [(0, 1), (1, 2)]), 4)
+    assert short.dtype == np.uint8 and short[0, 2] == 2 and short[3, 0] == np.iinfo(np.uint8).max
+
+
+def test_table_reloaded_from_cache(tmp_path):
+    Map.from_file(map_file).precompute_distances(cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("distances_*.npy"))) == 1
+
+    table = Map.from_file(map_file).precompute_distances(cache_dir=tmp_path)
+    assert table.distance(table.vertices[0], table.vertices[0]) == 0
+    assert len(list(tmp_path.glob("*.tmp"))) == 0
+
+
+def test_road_distances_match_bfs():
+    game_map = Map.from_file(map_file)
+    vertices = list(game_map.resources)
+    expected = {(u, v): game_map.distance(u, v) for u in vertices for v in vertices}
+
+    game_map.use_road_distances()
+    assert all(game_map.distance(u, v) == d for (u, v), d in expected.items())
+
+
+def test_balls_match_distances():
+    game_map = Map.from_file(map_file)
+    game_map.precompute_balls(range(7))
+    for u in range(len(game_map.vertex_names)):
+        for v in range(len(game_map.vertex_names)):
+            d = game_map.distance(u, v)
+            assert all((v in game_map.ball(u, r)) == (d <= r) for r in range(7))
+
+
+def test_road_distances_with_underscored_names(tmp_path):
+    # "a_b_c_1" is a cell of the road a - b_c, not of a_b - c
+    path = tmp_path / "m.txt"
+    path.write_text("2 3 a d\na b_c 3\nb_c d 2\na 0 0\nb_c 0 0\nd 0 0\n", encoding="utf-8")
+    game_map = Map.from_file(path)
+    cell = game_map.vertex_id("a_b_c_1")
+    assert game_map.road_cells[cell] == ("a", "b_c", 1)
+    cells = range(len(game_map.vertex_names))
+    expected = {(u, v): game_map.distance(u, v) for u in cells for v in cells}
+
+    engine = game_map.use_road_distances()
+    assert engine.cells[cell] == ("a", "b_c", 1)
+    engine.vertex_ids = {}  # ID queries never go through names
+    assert all(engine.distance_ids(u, v) == d for (u, v), d in expected.items())
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Effects import Effect
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_boost_expires_after_duration():
+    game_state = GameState(map_file)
+    commandant = game_state.new_unit('p1', 'commandant')
+    corebot = game_state.new_unit('p1', 'corebot')
+
+    commandant.boost(corebot)
+    assert corebot.get_multiplier('damage') == 1.5
+    game_state.end_turn()
+    assert corebot.active_effects == {'speed_boost': (1.5, 1), 'damage_boost': (1.5, 1)}
+    game_state.end_turn()
+    assert corebot.get_multiplier('damage') == 1 and not corebot.has_effect('damage_boost')
+
+
+def test_overwritten_effect_keeps_latest_expiry():
+    game_state = GameState(map_file)
+    unit = game_state.new_unit('p1', 'corebot')
+    unit.apply_boost('spark', 2, 1)
+    unit.apply_boost('spark', 3, 3)
+
+    game_state.end_turn()
+    assert unit.get_multiplier('spark') == 3
+    unit.apply_effect(Effect.PROTECTION, 2, 0)
+    assert not unit.has_effect('protection')
+
+
+def test_dead_unit_effects_do_not_leak_to_reused_row():
+    game_state = GameState(map_file)
+    unit = game_state.new_unit('p1', 'corebot')
+    unit.apply_boost('speed', 2, 5)
+    unit.health = 0
+    game_state.end_turn()
+
+    reused = game_state.new_unit('p2', 'corebot')
+    assert reused.slot == unit.slot
+    assert reused.get_multiplier('speed') == 1 and reused.active_effects == {}
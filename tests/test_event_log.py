@@ -0,0 +1,75 @@
+import sys
+import random
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Bots import random_bot, economy_bot
+from code.Replay import snapshot
+from code.EventLog import EventRecorder, EventLog, write_number, read_number
+from code.Runner import play_match
+
+map_file = MAP_DIR / "small.txt"
+
+
+def normalized(frame):
+    return (frame['turn'], frame['scores'], sorted(map(tuple, frame['units'])),
+            [(vertex, float(value)) for vertex, value in frame['sparks']])
+
+
+def record_match(path, turns, bots=(random_bot, economy_bot), keyframe_interval=25):
+    game_state = GameState(map_file)
+    rngs = [random.Random(f"0:{player_id}") for player_id in ('p1', 'p2')]
+    snapshots = {0: snapshot(game_state)}
+    recorder = EventRecorder(game_state, path, keyframe_interval=keyframe_interval)
+    for _ in range(turns):
+        actions = [bot(game_state, player_id, rng) for bot, player_id, rng in zip(bots, ('p1', 'p2'), rngs)]
+        recorder.record(game_state.step(*actions), *actions)
+        snapshots[game_state.turn] = normalized(snapshot(game_state))
+    snapshots[0] = normalized(snapshots[0])
+    return recorder, snapshots
+
+
+def test_numbers_round_trip():
+    for value in (0, 7, -7, 2 ** 40, 1.5, -0.25, 1 / 3, 1e300):
+        buffer = bytearray()
+        write_number(buffer, value)
+        assert read_number(buffer, 0) == (value, len(buffer))
+
+
+def test_seek_matches_the_game(tmp_path):
+    recorder, snapshots = record_match(tmp_path / "match.spklog", 120)
+    recorder.close()
+    log = EventLog(tmp_path / "match.spklog")
+    assert [turn for turn, _ in log.keyframes] == [0, 25, 50, 75, 100]
+    assert log.last_turn == 120
+    for turn in (0, 1, 24, 25, 26, 99, 120):
+        assert normalized(log.state(turn).frame(log.header['spark_vertices'])) == snapshots[turn]
+    assert [normalized(frame) for frame in log.frames()] == [snapshots[turn] for turn in range(121)]
+
+
+def test_unclosed_and_truncated_logs_are_scanned(tmp_path):
+    path = tmp_path / "match.spklog"
+    recorder, snapshots = record_match(path, 60)
+    recorder.file.close()
+    log = EventLog(path)
+    assert [turn for turn, _ in log.keyframes] == [0, 25, 50]
+    assert normalized(log.state(60).frame(log.header['spark_vertices'])) == snapshots[60]
+
+    path.write_bytes(path.read_bytes()[:-1])
+    log = EventLog(path)
+    assert normalized(log.state(59).frame(log.header['spark_vertices'])) == snapshots[59]
+
+
+def test_runner_event_log_is_small(tmp_path):
+    path = tmp_path / "match.spklog"
+    result = play_match(map_file, 'economy', 'economy', seed=0, max_turns=1000, event_log=path)
+    assert result['status'] == 'turn_cap'
+    assert path.stat().st_size < 16 * 1024
+    log = EventLog(path)
+    assert log.header['bots'] == ['economy', 'economy']
+    assert log.state(1000).scores == result['scores']
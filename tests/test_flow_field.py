@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Actions import Action
+from code.FlowField import RESOURCES, base, units
+from code.Bots import economy_bot
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_fields_match_bfs_and_hops_descend():
+    game_state = GameState(map_file)
+    game_map = game_state.map
+    field = game_state.flow.field(base('p2'))
+    for vertex in range(len(game_map.vertex_names)):
+        assert field.distance(vertex) == game_map.distance(vertex, game_map.base2_id)
+        step = field.next_hop(vertex)
+        assert (step is None) == (vertex == game_map.base2_id)
+        if step is not None:
+            assert step in game_map.neighbor_ids(vertex) and field.distance(step) == field.distance(vertex) - 1
+
+    nearest = game_state.flow.nearest_resource(game_map.base1_id)
+    candidates = [v for v, amount in enumerate(game_map.resource_counts) if amount > 0]
+    assert game_map.distance(game_map.base1_id, nearest) == min(game_map.distance(game_map.base1_id, v) for v in candidates)
+
+
+def test_fields_recomputed_only_when_targets_change():
+    game_state = GameState(map_file)
+    game_map = game_state.map
+    v2 = game_map.vertex_id('v2')
+    field = game_state.flow.field(RESOURCES)
+
+    game_map.add_resources(v2, -1)
+    assert game_state.flow.field(RESOURCES) is field      # v2 still has resources
+    game_map.add_resources(v2, -game_map.resource_counts[v2])
+    assert game_state.flow.field(RESOURCES) is not field
+    assert game_state.flow.field(RESOURCES).distance(v2) > 0
+
+    enemy = game_state.flow.field(units('p2'))
+    assert game_state.flow.field(units('p2')) is enemy
+    game_state.apply([], [Action(None, 'spawn', 'corebot')])
+    assert game_state.flow.field(units('p2')).distance(game_map.base2_id) == 0
+    game_state.undo()
+    assert game_state.flow.field(units('p2')).distance(game_map.base2_id) != 0
+
+
+def test_economy_bot_brings_resources_home():
+    game_state = GameState(map_file)
+    for _ in range(60):
+        game_state.step(economy_bot(game_state, 'p1', None), [])
+    assert game_state.map.resource_counts[game_state.map.base1_id] > 0
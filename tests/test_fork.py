@@ -0,0 +1,61 @@
+import sys
+import random
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Bots import random_bot
+
+map_file = MAP_DIR / "small.txt"
+
+
+def signature(game_state):
+    return (game_state.turn, dict(game_state.scores),
+            {player_id: [unit.to_dict() for unit in units] for player_id, units in game_state.units.items()},
+            list(game_state.map.resource_counts),
+            {vertex: spark_point.value for vertex, spark_point in game_state.spark_points.items()},
+            sorted(game_state.occupancy.cells), sorted(game_state.units_by_id),
+            {player_id: dict(created) for player_id, created in game_state.unit_created.items()},
+            game_state.store.size, sorted(game_state.store.free), list(game_state.store.generation))
+
+
+def play(game_state, rng, turns, apply=False):
+    for _ in range(turns):
+        actions = (random_bot(game_state, 'p1', rng, 0.5), random_bot(game_state, 'p2', rng, 0.5))
+        (game_state.apply if apply else game_state.step)(*actions)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_undo_restores_state(columnar):
+    game_state = GameState(map_file, columnar=columnar)
+    rng = random.Random(1)
+    play(game_state, rng, 40)
+    before = signature(game_state)
+
+    play(game_state, rng, 30, apply=True)
+    assert signature(game_state) != before
+    for _ in range(30):
+        game_state.undo()
+    assert signature(game_state) == before
+
+
+def test_fork_is_independent():
+    game_state = GameState(map_file)
+    play(game_state, random.Random(2), 40)
+    before = signature(game_state)
+
+    fork = game_state.fork()
+    assert fork.map.offsets is game_state.map.offsets
+    assert signature(fork) == before
+    play(fork, random.Random(3), 30)
+    assert signature(game_state) == before
+
+    # The fork and a replay of the same actions on the original stay in lockstep
+    play(game_state, random.Random(3), 30)
+    assert signature(game_state) == signature(fork)
@@ -18,4 +18,4 @@ game_state.new_unit('p1', 'minor')
 game_state.new_unit('p1', 'commandant')
 print(game_state.unit_created)
 for unit in game_state.units['p1']:
-    print(vars(unit))
\ No newline at end of file
+    print(unit.to_dict())
\ No newline at end of file
@@ -29,3 +29,37 @@ print("Sparking spots:", len(game_map.sparking_spots))
 print("Unit moves from base1:", game_map.neighbors(game_map.base1))
 print("Resources base1:", game_map.resources[game_map.base1])
 
+
+
+def road_cells(u, v, dist):
+    """Expected chain of vertex names along an abstract road."""
+    return [u, *(f"{u}_{v}_{step}" for step in range(1, dist)), v]
+
+
+def test_csr_and_vertex_ids_round_trip():
+    game_map = Map.from_file(map_file)
+    names = game_map.vertex_names
+    expected = {name: set() for name in names}
+    for u, v, dist in game_map.abstract_map.edges:
+        chain = road_cells(u, v, dist)
+        for a, b in zip(chain, chain[1:]):
+            expected[a].add(b)
+            expected[b].add(a)
+
+    offsets, targets = game_map.offsets, game_map.targets
+    assert len(offsets) == len(names) + 1 and offsets[0] == 0 and offsets[-1] == len(targets)
+    for i, name in enumerate(names):
+        assert game_map.vertex_ids[name] == i and game_map.vertex_id(name) == i and game_map.vertex_id(i) == i
+        assert {names[j] for j in targets[offsets[i]:offsets[i + 1]]} == expected[name]
+        assert offsets[i + 1] - offsets[i] == len(expected[name])
+    assert len(game_map.vertex_ids) == len(names)
+
+    # A dead end (degree 1), then cut off entirely (degree 0)
+    leaf = next(name for name in names if len(expected[name]) == 1)
+    (neighbor,) = expected[leaf]
+    assert game_map.neighbors(leaf) == [neighbor]
+    game_map.remove_edge(leaf, neighbor)
+    i = game_map.vertex_id(leaf)
+    assert game_map.neighbors(leaf) == [] and game_map.offsets[i] == game_map.offsets[i + 1]
+    assert leaf not in game_map.neighbors(neighbor)
+    assert game_map.vertex_names[i] == leaf and game_map.offsets[-1] == len(game_map.targets) == len(targets) - 2
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameMap import Map
+from code.GameState import GameState
+from code.MapCompiler import compile_map
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_compiled_map_matches_text_map(tmp_path):
+    expected = Map.from_file(map_file)
+    compiled = Map.from_file(compile_map(map_file, tmp_path / "small.spkmap"))
+
+    assert compiled.vertex_names == expected.vertex_names
+    assert list(compiled.offsets) == list(expected.offsets)
+    assert list(compiled.targets) == list(expected.targets)
+    assert compiled.resources.copy() == expected.resources.copy()
+    assert compiled.sparking_spots.copy() == expected.sparking_spots.copy()
+    assert (compiled.base1, compiled.base2) == (expected.base1, expected.base2)
+    assert compiled.abstract_map.edges == expected.abstract_map.edges
+    assert compiled.road_cells == expected.road_cells
+    assert compiled.abstract_map.resources == expected.abstract_map.resources
+    assert compiled.abstract_map.sparking_spots == expected.abstract_map.sparking_spots
+    assert compiled.abstract_map.grid_matrix == expected.abstract_map.grid_matrix
+    assert (compiled.abstract_map.base1, compiled.abstract_map.base2) == (expected.abstract_map.base1, expected.abstract_map.base2)
+    assert compiled.distance_engine is None
+
+
+def test_compiled_distances_and_resources(tmp_path):
+    expected = Map.from_file(map_file)
+    compiled = Map.from_file(compile_map(map_file, tmp_path / "small.spkmap", distances=True))
+    vertices = list(expected.resources)
+
+    assert compiled.distance_engine is not None
+    assert all(compiled.distance(u, v) == expected.distance(u, v) for u in vertices for v in vertices)
+
+    vertex = vertices[0]
+    compiled.resources[vertex] += 5     # Resources are a private copy, the mapping stays read-only
+    assert compiled.resources[vertex] == expected.resources[vertex] + 5
+
+
+def test_game_state_from_compiled_map(tmp_path):
+    game_state = GameState(compile_map(map_file, tmp_path / "small.spkmap"))
+    assert game_state.map.base1 == Map.from_file(map_file).base1
+    assert len(game_state.spark_points) > 0
+
+
+def test_compiled_map_decodes_names_on_first_use(tmp_path):
+    compiled = Map.from_file(compile_map(map_file, tmp_path / "small.spkmap"))
+    assert not {'vertex_names', 'vertex_ids', 'road_cells', 'abstract_map'} & set(vars(compiled))
+    fork = compiled.fork()
+
+    vertex = compiled.vertex_names[5]
+    assert compiled.vertex_ids[vertex] == 5 and compiled.neighbors(vertex)
+    assert fork.vertex_id(vertex) == 5 and fork.base1 == compiled.base1
@@ -0,0 +1,75 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameMap import AbstractMap, MapFormatError
+
+map_file = MAP_DIR / "small.txt"
+
+
+def write_map(path, roads, vertices, header=None, grid=()):
+    header = header or f"{len(roads)} {len(vertices)} {vertices[0][0]} {vertices[-1][0]}"
+    lines = [header, *(f"{u} {v} {d}" for u, v, d in roads),
+             *(f"{v} {q} {s}" for v, q, s in vertices), *(" ".join(row) for row in grid)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_small_map_parses():
+    abstract_map = AbstractMap.from_file(map_file)
+    assert len(abstract_map.edges) == 28
+    assert len(abstract_map.resources) == 20
+    assert len(abstract_map.grid_matrix) == 4
+
+
+def test_duplicate_edges_are_kept_once(tmp_path, capsys):
+    vertices = [("a", 0, 0), ("b", 1, 0)]
+    abstract_map = AbstractMap.from_file(write_map(tmp_path / "m.txt", [("a", "b", 2), ("b", "a", 2)], vertices))
+    assert abstract_map.edges == {("a", "b", 2)}
+    assert "line 3" in capsys.readouterr().out
+
+
+def test_every_error_is_reported_with_its_line(tmp_path):
+    roads = [("a", "b", 2), ("b", "a", 3), ("a", "z", 1), ("c", "c", 1)]
+    vertices = [("a", 0, 0), ("b", 1, 0), ("c", 1, 2)]
+    path = write_map(tmp_path / "m.txt", roads, vertices, header="4 4 a c", grid=[["a", "0", "y"]])
+
+    with pytest.raises(MapFormatError) as error:
+        AbstractMap.from_file(path)
+    lines = {line_no for line_no, _ in error.value.errors}
+    assert lines == {1, 3, 4, 5, 8, 9}      # vertex count, distance conflict, unknown z, loop, bad c, unknown y
+
+
+def test_missing_roads_and_disconnected_bases(tmp_path):
+    vertices = [("a", 0, 0), ("b", 0, 0), ("c", 0, 0)]
+    with pytest.raises(MapFormatError, match="announces 5 roads, found 4"):
+        AbstractMap.from_file(write_map(tmp_path / "m.txt", [("a", "b", 1)], vertices, header="5 3 a c"))
+    with pytest.raises(MapFormatError, match="not connected"):
+        AbstractMap.from_file(write_map(tmp_path / "m.txt", [("a", "b", 1)], vertices))
+
+
+def test_numeric_vertex_names(tmp_path):
+    vertices = [("1", 0, 0), ("2", 3, 1), ("3", 0, 0)]
+    path = write_map(tmp_path / "m.txt", [("1", "2", 1), ("2", "3", 1)], vertices, header="2 3 1 3")
+    abstract_map = AbstractMap.from_file(path)
+    assert abstract_map.edges == {("1", "2", 1), ("2", "3", 1)}
+    assert abstract_map.resources == {"1": 0, "2": 3, "3": 0}
+
+
+def test_large_map_parses_in_linear_time(tmp_path):
+    n = 100_000
+    roads = [(f"v{i}", f"v{i + 1}", 1 + i % 3) for i in range(n)] + [(f"v{i + 1}", f"v{i}", 1 + i % 3) for i in range(0, n, 10)]
+    vertices = [(f"v{i}", i % 5, int(i % 50 == 0)) for i in range(n + 1)]
+    path = write_map(tmp_path / "large.txt", roads, vertices)
+
+    start = time.perf_counter()
+    abstract_map = AbstractMap.from_file(path)
+    assert len(abstract_map.edges) == n
+    assert time.perf_counter() - start < 10
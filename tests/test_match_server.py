@@ -0,0 +1,140 @@
+import sys
+import json
+import random
+import asyncio
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Bots import economy_bot, random_bot
+from code.MatchServer import MatchServer, DiffTracker, ObservedState, play, encode, unit_row
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_diffs_rebuild_the_state():
+    game_state = GameState(map_file)
+    tracker = DiffTracker(game_state)
+    observed = ObservedState(json.loads(encode(tracker.snapshot())))
+    rng = random.Random(0)
+    for _ in range(80):
+        game_state.step(random_bot(game_state, 'p1', rng, 0.5), economy_bot(game_state, 'p2', rng))
+        observed.apply(game_state.turn, json.loads(encode(tracker.diff())))
+        assert observed.units == {unit_id: unit_row(unit) for unit_id, unit in game_state.units_by_id.items()}
+        assert observed.resources == list(game_state.map.resource_counts)
+        assert observed.sparks == list(game_state.sparks.values) and observed.scores == game_state.scores
+    tracker.close()
+
+
+def test_concurrent_matches_play_like_local_games():
+    async def run():
+        server = MatchServer([map_file], max_turns=60, deadline=5)
+        await server.start()
+        port = server.address[1]
+        results = await asyncio.gather(*(play(economy_bot, name, port=port, maps=[map_file])
+                                         for name in ('a', 'a', 'b', 'b')))
+        await server.close()
+        return server, results
+
+    server, results = asyncio.run(run())
+    reference = GameState(map_file)
+    rngs = {player_id: random.Random(f"0:{player_id}") for player_id in ('p1', 'p2')}
+    for _ in range(60):
+        reference.step(*(economy_bot(reference, player_id, rngs[player_id]) for player_id in ('p1', 'p2')))
+    assert server.matches == {}     # dropped once finished
+    for result in results:
+        assert result['turn'] == 60 and not result['disconnected'] and result['scores'] == reference.scores
+        assert all(latency['turns'] == 60 for latency in result['latency'].values())
+
+
+def test_late_player_is_disconnected(tmp_path):
+    async def silent(path):
+        reader, writer = await asyncio.open_unix_connection(str(path))
+        writer.write(encode({'type': 'join', 'match': 'm'}))
+        messages = [json.loads(line) async for line in reader]
+        writer.close()
+        return messages
+
+    async def run():
+        path = tmp_path / "server.sock"
+        server = MatchServer([map_file], max_turns=5, deadline=0.2)
+        await server.start(path=path)
+        messages, result = await asyncio.gather(silent(path), play(economy_bot, 'm', path=path, maps=[map_file]))
+        await server.close()
+        return messages, result
+
+    messages, result = asyncio.run(run())
+    assert [message['type'] for message in messages] == ['joined', 'snapshot', 'turn']
+    assert messages[1]['map'] == 'small'        # the map name, not a server path
+    assert result['disconnected'] == {'p1': 'deadline'} and result['turn'] == 5
+    assert result['latency']['p1']['turns'] == 0 and result['latency']['p2']['turns'] == 5
+
+
+def test_match_abandoned_by_its_only_player_is_dropped():
+    async def run():
+        server = MatchServer([map_file], max_turns=5, deadline=1)
+        await server.start()
+        port = server.address[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(encode({'type': 'join', 'match': 'm'}))
+        assert json.loads(await reader.readline())['player'] == 'p1'
+        match = server.matches['m']
+        writer.close()
+        await asyncio.wait_for(match.done.wait(), 5)
+        await asyncio.sleep(0)
+        assert match.task.cancelled() and 'm' not in server.matches
+
+        results = await asyncio.gather(*(play(economy_bot, 'm', port=port, maps=[map_file]) for _ in range(2)))
+        await server.close()
+        return server, results
+
+    server, results = asyncio.run(run())
+    assert all(result['turn'] == 5 for result in results) and server.matches == {}
+
+
+def test_malformed_actions_are_dropped():
+    async def sloppy(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(encode({'type': 'join', 'match': 'm'}))
+        async for line in reader:
+            message = json.loads(line)
+            if message['type'] == 'turn':
+                writer.write(encode({'type': 'actions', 'turn': message['turn'],
+                                     'actions': [[], ['p1_minor_1'], [None, 'spawn', ['minor']], [None, 'spawn', 'minor']]}))
+            elif message['type'] == 'end':
+                writer.close()
+                return message
+
+    async def run():
+        server = MatchServer([map_file], max_turns=5, deadline=1)
+        await server.start()
+        port = server.address[1]
+        results = await asyncio.wait_for(asyncio.gather(sloppy(port), play(economy_bot, 'm', port=port, maps=[map_file])), 10)
+        await server.close()
+        return results
+
+    for result in asyncio.run(run()):
+        assert result['turn'] == 5 and 'error' not in result and not result['disconnected']
+
+
+def test_failing_turn_ends_the_match(monkeypatch):
+    def broken_step(self, actions_p1, actions_p2):
+        raise RuntimeError("engine bug")
+
+    async def run():
+        server = MatchServer([map_file], max_turns=5, deadline=1)
+        await server.start()
+        port = server.address[1]
+        results = await asyncio.wait_for(asyncio.gather(*(play(economy_bot, 'm', port=port, maps=[map_file])
+                                                          for _ in range(2))), 10)
+        await server.close()
+        return server, results
+
+    monkeypatch.setattr(GameState, 'step', broken_step)
+    server, results = asyncio.run(run())
+    assert all(result['error'] == "RuntimeError: engine bug" and result['turn'] == 0 for result in results)
+    assert server.matches == {}
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.SparkPoint import SparkPoint
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_index_follows_spawn_move_and_death():
+    game_state = GameState(map_file)
+    corebot = game_state.new_unit('p1', 'corebot')
+    minor = game_state.new_unit('p1', 'minor')
+    base1 = game_state.map.base1_id
+
+    assert game_state.occupancy.count(base1, 'p1') == 2
+    corebot.move('v2')
+    assert game_state.occupancy.units_at(game_state.map.vertex_id('v2')) == [corebot]
+    assert game_state.occupancy.units_at(base1, 'p1') == [minor]
+
+    corebot.health = 0
+    game_state.update_death()
+    assert game_state.units['p1'] == [minor]
+    assert not game_state.occupancy.is_occupied_by(game_state.map.vertex_id('v2'), 'p1')
+
+
+def test_spark_point_uses_index():
+    game_state = GameState(map_file)
+    spark_point = SparkPoint(game_state, 'sp1', 'v2')
+    game_state.new_unit('p1', 'corebot').move('v2')
+    assert spark_point.is_occupied_by('p1') and not spark_point.is_in_conflict
+
+    game_state.new_unit('p2', 'corebot').position = 'v2'
+    assert spark_point.is_in_conflict
+    spark_point.update_value()
+    assert spark_point.value == 0
@@ -0,0 +1,88 @@
+import sys
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.GameMap import Map
+from code.Bots import random_bot
+from code.Profiler import Profiler
+from code.Runner import play_match
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_disabled_profiler_leaves_plain_methods():
+    distance, step = Map.__dict__['distance'], GameState.__dict__['step']
+    with Profiler() as profiler:
+        assert Map.__dict__['distance'] is not distance
+        with pytest.raises(AssertionError):
+            Profiler().enable()
+    assert Map.__dict__['distance'] is distance and GameState.__dict__['step'] is step
+    assert not profiler.patched and Profiler.active is None
+
+
+def test_counts_phases_and_collapsed_stacks(tmp_path):
+    game_state = GameState(map_file)
+    rng = random.Random(0)
+    with Profiler() as profiler:
+        bots = {player_id: profiler.wrap_bot(random_bot, player_id) for player_id in ('p1', 'p2')}
+        for _ in range(20):
+            game_state.step(*(bots[player_id](game_state, player_id, rng, spawn_probability=0.5)
+                              for player_id in ('p1', 'p2')))
+    game_state.step([], [])     #not measured any more
+
+    summary = profiler.summary()
+    assert summary['turns'] == 20
+    assert summary['phases']['sparks']['calls'] == summary['phases']['end_turn']['calls'] == 20
+    assert summary['phases']['spawn']['calls'] == summary['operations']['GameState.new_unit']['calls']
+    assert summary['players']['p1']['calls'] == summary['players']['p2']['calls'] == 20
+    step = summary['operations']['GameState.step']
+    assert sum(phase['total'] for phase in summary['phases'].values()) <= step['total']
+
+    profiler.write_collapsed(tmp_path / "profile.folded")
+    for line in (tmp_path / "profile.folded").read_text().splitlines():
+        stack, micros = line.rsplit(' ', 1)
+        assert stack.split(';')[0] in ('GameState.step', 'decide:p1', 'decide:p2') and int(micros) >= 1
+    assert any(line.startswith('GameState.step;sparks;SparkEngine.update ')
+               for line in (tmp_path / "profile.folded").read_text().splitlines())
+
+
+def test_runner_profile(tmp_path):
+    result = play_match(map_file, 'random', 'economy', seed=0, max_turns=50, profile=tmp_path / "profile.json")
+    profile = json.loads((tmp_path / "profile.json").read_text())
+    assert profile['turns'] == result['turns'] == 50 and profile['bots'] == ['random', 'economy']
+    assert set(profile['players']) == {'p1', 'p2'}
+    assert (tmp_path / "profile.folded").exists()
+    assert Profiler.active is None
+
+
+def test_failed_enable_restores_the_methods(monkeypatch):
+    step = GameState.__dict__['step']
+    profiler = Profiler()
+    patch = profiler.patch
+
+    def failing_patch(cls, attribute, phase=None):
+        if len(profiler.patched) == 3:
+            raise RuntimeError("patch failed")
+        patch(cls, attribute, phase)
+
+    monkeypatch.setattr(profiler, 'patch', failing_patch)
+    with pytest.raises(RuntimeError):
+        profiler.enable()
+    assert not profiler.patched and Profiler.active is None and GameState.__dict__['step'] is step
+    profiler.disable()
+
+
+def test_runner_releases_a_profiler_that_failed_to_enable(tmp_path):
+    with Profiler():
+        result = play_match(map_file, 'random', 'random', seed=0, max_turns=5, profile=tmp_path / "profile.json")
+        assert result['status'] == 'error' and 'Another profiler' in result['error']
+    assert Profiler.active is None
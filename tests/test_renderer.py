@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameMap import Map
+from code.Replay import read_replay
+from code.Renderer import layout
+from code.Runner import play_match
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_replay_records_every_turn(tmp_path):
+    result = play_match(map_file, 'random', 'random', seed=3, max_turns=12, replay=tmp_path / "replay.jsonl")
+    header, frames = read_replay(tmp_path / "replay.jsonl")
+    assert header['bots'] == ['random', 'random'] and header['seed'] == 3
+    assert header['spark_threshold'] == 100
+    assert [frame['turn'] for frame in frames] == list(range(result['turns'] + 1))
+    assert frames[-1]['scores'] == result['scores']
+
+
+def test_road_cells_are_laid_out_along_their_road():
+    game_map = Map.from_file(map_file)
+    positions = layout(game_map)
+    for u, v, dist in game_map.abstract_map.edges:
+        (xu, yu), (xv, yv) = positions[game_map.vertex_ids[u]], positions[game_map.vertex_ids[v]]
+        for step in range(1, dist):
+            x, y = positions[game_map.vertex_ids[f"{u}_{v}_{step}"]]
+            assert x == pytest.approx(xu + step / dist * (xv - xu)) and y == pytest.approx(yu + step / dist * (yv - yu))
+
+
+def test_frames_rendered_in_parallel(tmp_path):
+    pytest.importorskip("matplotlib")
+    from code.Renderer import ReplayRenderer, render_frames
+
+    play_match(map_file, 'random', 'random', seed=5, max_turns=6, replay=tmp_path / "replay.jsonl")
+    _, frames = read_replay(tmp_path / "replay.jsonl")
+    paths = render_frames(map_file, frames, tmp_path / "frames", workers=2, dpi=40)
+    assert all(path.exists() for path in paths) and len(paths) == len(frames)
+
+    with ReplayRenderer(Map.from_file(map_file), dpi=40) as renderer:
+        empty = renderer.render({'turn': 0, 'scores': {'p1': 0, 'p2': 0}, 'units': [], 'sparks': []}).copy()
+        busy = renderer.render({'turn': 0, 'scores': {'p1': 0, 'p2': 0}, 'units': [['p1', 'corebot', 5, 5]], 'sparks': []})
+        assert (empty != busy).any()
+    assert renderer.figure is None
+
+
+def test_renderer_leaves_matplotlib_state_alone():
+    matplotlib = pytest.importorskip("matplotlib")
+    import matplotlib.pyplot as plt
+    from code.Renderer import ReplayRenderer
+
+    backend, figures = matplotlib.get_backend(), plt.get_fignums()
+    with ReplayRenderer(Map.from_file(map_file), dpi=40, spark_threshold=30) as renderer:
+        assert renderer.sparks.get_clim() == (-30, 30)
+    assert matplotlib.get_backend() == backend and plt.get_fignums() == figures
@@ -0,0 +1,26 @@
+import sys
+import json
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.Runner import play_match, run_tournament, parse_seeds
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_matches_are_reproducible():
+    first = play_match(map_file, 'random', 'random', seed=7, max_turns=30)
+    second = play_match(map_file, 'random', 'random', seed=7, max_turns=30)
+    first.pop('wall_time'), second.pop('wall_time')
+    assert first == second and first['status'] == 'turn_cap' and first['turns'] == 30
+
+
+def test_tournament_streams_jsonl(tmp_path):
+    output = tmp_path / "results.jsonl"
+    played = run_tournament([map_file], [('random', 'idle')], parse_seeds('0-2'), output, workers=2, max_turns=10)
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert played == 3 and sorted(line['seed'] for line in lines) == [0, 1, 2]
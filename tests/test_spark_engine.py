@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+
+map_file = MAP_DIR / "small.txt"
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_engine_matches_per_point_updates(columnar):
+    engine_state = GameState(map_file, columnar=columnar)
+    point_state = GameState(map_file, columnar=columnar)
+    for game_state in (engine_state, point_state):
+        for player_id, unit_type, position in (('p1', 'sparker', 'v9'), ('p1', 'minor', 'v9'),
+                                               ('p2', 'corebot', 'v9'), ('p2', 'sparker', 'v20')):
+            game_state.new_unit(player_id, unit_type).position = position
+        game_state.units['p1'][0].apply_boost('spark', 2, 3)
+
+    for _ in range(4):
+        engine_state.sparks.update()
+        for spark_point in point_state.spark_points.values():
+            spark_point.update_score()
+        assert ({vertex: point.value for vertex, point in engine_state.spark_points.items()}
+                == {vertex: point.value for vertex, point in point_state.spark_points.items()})
+        assert engine_state.hash == point_state.hash
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_values_are_clamped_and_owned_spots_score(columnar):
+    game_state = GameState(map_file, columnar=columnar, spark_threshold=5)
+    v9, v20 = game_state.map.vertex_id('v9'), game_state.map.vertex_id('v20')
+    game_state.new_unit('p1', 'sparker').vertex = v9
+    game_state.new_unit('p2', 'sparker').vertex = v20
+
+    for _ in range(3):
+        game_state.sparks.update()
+    assert game_state.spark_points[v9].value == 5 and game_state.spark_points[v20].value == -5
+    assert game_state.spark_points[v9].owner == 'p1' and game_state.spark_points[v20].owner == 'p2'
+    assert game_state.scores == {'p1': 1, 'p2': 1}       # owned from the third turn only
+
+    game_state.new_unit('p2', 'corebot').vertex = v9      # contested: p1 keeps ownership but stops scoring
+    game_state.sparks.update()
+    assert game_state.spark_points[v9].value == 5 and game_state.scores == {'p1': 1, 'p2': 2}
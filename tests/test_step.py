@@ -0,0 +1,108 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Actions import Action
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_spawn_move_and_reject():
+    game_state = GameState(map_file)
+    result = game_state.step([Action(None, 'spawn', 'corebot')], [Action(None, 'spawn', 'minor')])
+    assert result.turn == 1 and result.spawned == ['p1_corebot_1', 'p2_minor_1']
+
+    result = game_state.step([Action('p1_corebot_1', 'move', 'v2'), Action('p2_minor_1', 'extract')],
+                             [Action('p2_minor_1', 'move', 'v1')])
+    assert game_state.units_by_id['p1_corebot_1'].position == 'v2'
+    assert [reason for _, _, reason in result.rejected] == ["Unit not owned by player", "Impossible move"]
+
+
+def test_combat_deaths_and_spark_scoring():
+    game_state = GameState(map_file)
+    game_state.step([Action(None, 'spawn', 'corebot')], [Action(None, 'spawn', 'corebot')])
+    attacker, victim = game_state.units_by_id['p1_corebot_1'], game_state.units_by_id['p2_corebot_1']
+    attacker.position = 'v9'
+    victim.position = 'v9'
+
+    deaths = []
+    for _ in range(5):
+        result = game_state.step([Action(attacker.id, 'attack', victim.id)], [])
+        deaths += result.deaths
+    assert deaths == [victim.id] and game_state.units['p2'] == []
+    assert game_state.spark_points[game_state.map.vertex_id('v9')].value == 2       #contested until the victim is removed
+
+
+def test_legal_actions_are_accepted():
+    game_state = GameState(map_file)
+    game_state.step([Action(None, 'spawn', unit_type) for unit_type in ('corebot', 'minor', 'healer', 'commandant')],
+                    [Action(None, 'spawn', 'phasor')])
+    game_state.units_by_id['p2_phasor_1'].position = 'v2'
+    game_state.units_by_id['p1_healer_1'].health = 1
+
+    legal = game_state.legal_actions('p1')
+    assert Action('p1_corebot_1', 'attack', 'p2_phasor_1') in legal['p1_corebot_1']
+    assert Action('p1_healer_1', 'heal', 'p1_healer_1') in legal['p1_healer_1']
+    assert Action(None, 'spawn', 'army') not in legal[None]
+    for actions in legal.values():
+        for action in actions:
+            game_state.check_action('p1', action)
+
+    longshots = [a for a in game_state.legal_actions('p2')['p2_phasor_1'] if a.name == 'longshot']
+    assert len(longshots) == 4
+
+
+def test_targets_must_be_on_the_right_side():
+    game_state = GameState(map_file)
+    game_state.step([Action(None, 'spawn', unit_type) for unit_type in ('corebot', 'healer', 'commandant', 'megacore')],
+                    [Action(None, 'spawn', 'phasor'), Action(None, 'spawn', 'corebot')])
+    for unit_id in ('p2_phasor_1', 'p2_corebot_1'):
+        game_state.units_by_id[unit_id].position = game_state.units_by_id['p1_corebot_1'].position
+
+    orders = {('p1', Action('p1_corebot_1', 'attack', 'p1_healer_1')): "Target not an enemy",
+              ('p2', Action('p2_phasor_1', 'longshot', 'p2_corebot_1')): "Target not an enemy",
+              ('p1', Action('p1_healer_1', 'heal', 'p2_corebot_1')): "Target not owned by player",
+              ('p1', Action('p1_megacore_1', 'protect', 'p2_phasor_1')): "Target not owned by player",
+              ('p1', Action('p1_commandant_1', 'boost', 'p2_corebot_1')): "Target not owned by player"}
+    for (player_id, action), reason in orders.items():
+        with pytest.raises(AssertionError, match=reason):
+            game_state.check_action(player_id, action)
+
+    for player_id, action in (('p1', Action('p1_corebot_1', 'attack', 'p2_phasor_1')),
+                              ('p2', Action('p2_phasor_1', 'longshot', 'p1_healer_1')),
+                              ('p1', Action('p1_healer_1', 'heal', 'p1_corebot_1')),
+                              ('p1', Action('p1_megacore_1', 'protect', 'p1_healer_1')),
+                              ('p1', Action('p1_commandant_1', 'boost', 'p1_corebot_1'))):
+        game_state.check_action(player_id, action)
+
+    result = game_state.step([Action('p1_corebot_1', 'attack', 'p1_healer_1')], [])
+    assert [reason for _, _, reason in result.rejected] == ["Target not an enemy"]
+    assert game_state.units_by_id['p1_healer_1'].health == game_state.units_by_id['p1_healer_1'].max_health
+
+
+def test_malformed_actions_are_rejected():
+    game_state = GameState(map_file)
+    game_state.step([Action(None, 'spawn', 'corebot')], [])
+    malformed = [(), ('x',), ('p1_corebot_1', 'move', [1]), ([1], 'move', 'v2'), (None, 'spawn', {'minor'}), 7]
+    result = game_state.step(malformed, [Action(None, 'spawn', 'minor')])
+    assert [action for _, action, _ in result.rejected] == malformed
+    assert result.spawned == ['p2_minor_1']
+    assert game_state.check_action('p1', ('p1_corebot_1', 'move', 'v2'))[1] == game_state.map.vertex_id('v2')
+
+
+def test_balls_are_cached_on_first_use():
+    game_state = GameState(map_file)
+    assert not game_state.map.balls
+    game_state.step([Action(None, 'spawn', 'minor')], [])
+    unit = game_state.units['p1'][0]
+    target = game_state.map.neighbor_ids(unit.vertex)[0]
+    game_state.step([Action(unit.id, 'move', target)], [])
+    assert unit.vertex == target and game_state.map.balls
+    assert game_state.fork().map.balls is game_state.map.balls
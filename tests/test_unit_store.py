@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+
+map_file = MAP_DIR / "small.txt"
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_end_turn_sweeps_rows(columnar):
+    game_state = GameState(map_file, columnar=columnar)
+    units = [game_state.new_unit('p1', 'corebot') for _ in range(10)]
+    for unit in units[::2]:
+        unit.health = 0
+    units[1].wait = 2
+    units[1].health = 50
+
+    game_state.end_turn()
+    assert game_state.units['p1'] == units[1::2]
+    assert units[1].wait == 1 and units[1].health == units[1].max_health
+    assert not game_state.store.is_valid(units[0].handle)
+
+    respawned = game_state.new_unit('p2', 'minor')
+    assert respawned.slot in {unit.slot for unit in units[::2]}
+    assert game_state.store.get(respawned.handle) is respawned
+    assert respawned.load == 0 and respawned.capacity == 10
+
+
+def test_units_have_no_dict():
+    unit = GameState(map_file).new_unit('p1', 'healer')
+    assert not hasattr(unit, '__dict__')
+    assert unit.to_dict()['healing_range'] == 1
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_spawn_copies_spec_row(columnar):
+    from code.Units import UNIT_SPECS
+
+    game_state = GameState(map_file, columnar=columnar)
+    assert set(game_state.unit_registry) == set(UNIT_SPECS)      # no abstract unit/worker/army
+    assert game_state.unit_registry is GameState(map_file).unit_registry
+    for unit_type, spec in UNIT_SPECS.items():
+        unit = game_state.new_unit('p2', unit_type)
+        assert unit.health == unit.max_health == spec.max_health
+        assert (unit.cost, unit.speed, unit.spark_speed) == (spec.cost, spec.speed, spec.spark_speed)
+        assert unit.get_multiplier('speed') == 1 and unit.wait == 0
@@ -0,0 +1,108 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.Actions import Action
+from code.VecEnv import (VecEnv, UNIT_TYPES, T, OWN_UNITS, ENEMY_UNITS, OWN_HEALTH, ENEMY_LOAD, RESOURCES,
+                         SPARKS, OWN_BASE, ENEMY_BASE, MOVE)
+
+map_file = MAP_DIR / "small.txt"
+
+
+def expected_view(game_state, player_id):
+    V = len(game_state.map.vertex_names)
+    view = np.zeros((2 * T + 2, V))
+    for unit in game_state.units_by_id.values():
+        own = unit.player_id == player_id
+        view[(OWN_UNITS if own else ENEMY_UNITS) + UNIT_TYPES.index(unit.subtype), unit.vertex] += 1
+        view[2 * T + (0 if own else 1), unit.vertex] += unit.health
+    return view
+
+
+def test_observations_match_the_games():
+    env = VecEnv(map_file, num_games=4, max_turns=1000)
+    observations = env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        observations, rewards, dones, infos = env.step(env.sample_actions(rng, spawn_probability=0.5))
+        assert not dones.any() and infos == [None] * 4
+    for g in range(env.num_games):
+        game_state = env.game_state(g)
+        assert game_state.units_by_id
+        for player, player_id in enumerate(('p1', 'p2')):
+            view = observations[g, player]
+            assert np.allclose(view[:OWN_HEALTH + 2], expected_view(game_state, player_id))
+            assert np.array_equal(view[RESOURCES], np.array(game_state.map.resource_counts))
+            sign = 1 if player == 0 else -1
+            for vertex, point in game_state.spark_points.items():
+                assert np.isclose(view[SPARKS, vertex], sign * point.value / point.threshold)
+        assert observations[g, 0, OWN_BASE, game_state.map.base1_id] == observations[g, 1, ENEMY_BASE, game_state.map.base1_id] == 1
+    assert env.template.turn == 0 and not env.template.units_by_id
+
+
+def test_commands_become_actions():
+    env = VecEnv(map_file, num_games=2, max_turns=1000)
+    env.reset()
+    V = env.num_vertices
+    actions = np.zeros((2, 2, V + 1), dtype=np.int64)
+    actions[0, 0, V] = 1 + UNIT_TYPES.index('minor')
+    assert env.actions(0, 0, actions[0, 0]) == [Action(None, 'spawn', 'minor')]
+    env.step(actions)
+    unit = env.game_state(0).units['p1'][0]
+    assert unit.subtype == 'minor' and not env.game_state(1).units_by_id
+
+    actions[0, 0, V] = 0
+    start = unit.vertex
+    actions[0, 0, start] = MOVE
+    assert env.actions(0, 0, actions[0, 0]) == [Action(unit.id, 'move', env.neighbors[start, 0])]
+    observations, *_ = env.step(actions)
+    unit = env.game_state(0).units_by_id[unit.id]
+    assert unit.vertex == env.neighbors[start, 0]
+    assert observations[0, 0, OWN_UNITS + UNIT_TYPES.index('minor'), unit.vertex] == 1
+    assert observations[0, 1, ENEMY_UNITS + UNIT_TYPES.index('minor'), unit.vertex] == 1
+    assert observations[0, 1, ENEMY_LOAD].sum() == unit.load
+
+
+def test_finished_games_reset():
+    env = VecEnv(map_file, num_games=3, max_turns=5)
+    env.reset()
+    rng = np.random.default_rng(1)
+    for turn in range(1, 6):
+        observations, rewards, dones, infos = env.step(env.sample_actions(rng, spawn_probability=1))
+    assert dones.all() and all(info['turns'] == 5 for info in infos)
+    assert all(env.game_state(g).turn == 0 and not env.game_state(g).units_by_id for g in range(3))
+    assert observations[:, :, :OWN_HEALTH + 4].sum() == 0
+    observations, rewards, dones, infos = env.step(env.sample_actions(rng))
+    assert not dones.any() and all(env.game_state(g).turn == 1 for g in range(3))
+
+
+def snapshot(game_state):
+    units = {unit.id: (unit.vertex, unit.health, unit.wait, getattr(unit, 'load', 0))
+             for unit in game_state.units_by_id.values()}
+    return (units, list(game_state.map.resource_counts), [float(value) for value in game_state.sparks.values],
+            dict(game_state.scores), game_state.turn)
+
+
+def test_batched_turns_match_the_engine():
+    env = VecEnv(map_file, num_games=2, max_turns=1000)
+    env.reset()
+    games = [env.game_state(g) for g in range(2)]
+    rng = np.random.default_rng(2)
+    for turn in range(1, 401):
+        actions = env.sample_actions(rng, spawn_probability=0.5)
+        translated = [(env.actions(g, 0, actions[g, 0]), env.actions(g, 1, actions[g, 1])) for g in range(2)]
+        observations, rewards, *_ = env.step(actions)
+        for g, game_state in enumerate(games):
+            before = dict(game_state.scores)
+            game_state.step(*translated[g])
+            if turn % 20 == 0:
+                assert snapshot(env.game_state(g)) == snapshot(game_state)
+            assert tuple(rewards[g]) == (game_state.scores['p1'] - before['p1'], game_state.scores['p2'] - before['p2'])
+    assert any(unit.health < unit.max_health for game_state in games for unit in game_state.units_by_id.values())
+    assert any(np.any(game_state.sparks.values) for game_state in games)
@@ -0,0 +1,53 @@
+import sys
+import random
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT / "code"))
+
+MAP_DIR = ROOT / "examples"
+
+from code.GameState import GameState
+from code.Bots import random_bot
+from code.Zobrist import TranspositionTable, EXACT
+
+map_file = MAP_DIR / "small.txt"
+
+
+def test_incremental_hash_matches_full_hash():
+    game_state = GameState(map_file)
+    rng = random.Random(4)
+    for _ in range(60):
+        game_state.step(random_bot(game_state, 'p1', rng, 0.5), random_bot(game_state, 'p2', rng, 0.5))
+        assert game_state.hash == game_state.zobrist.full_hash(game_state)
+
+    before = game_state.hash
+    game_state.apply(random_bot(game_state, 'p1', rng, 0.5), random_bot(game_state, 'p2', rng, 0.5))
+    game_state.undo()
+    assert game_state.hash == before == game_state.fork().hash
+
+
+def test_transpositions_share_a_hash():
+    game_state = GameState(map_file)
+    game_state.step([(None, 'spawn', 'corebot'), (None, 'spawn', 'minor')], [])
+    first, second = game_state.fork(), game_state.fork()
+
+    first.units_by_id['p1_corebot_1'].move('v2')
+    first.units_by_id['p1_minor_1'].move('v1_v3_1')
+    second.units_by_id['p1_minor_1'].move('v1_v3_1')
+    second.units_by_id['p1_corebot_1'].move('v2')
+    assert first.hash == second.hash != game_state.hash
+
+    first.zobrist.set_side('p2')
+    assert first.hash != second.hash
+
+
+def test_transposition_table_replacement():
+    table = TranspositionTable(size_log2=4)
+    table.store(0x10, depth=3, value=1.0)
+    assert table.probe(0x10, depth=2) == (1.0, EXACT, None)
+    table.store(0x20, depth=1, value=2.0)       #same bucket, shallower: kept out
+    assert table.probe(0x20) is None
+    table.new_search()
+    table.store(0x20, depth=1, value=2.0)       #older entry is replaceable
+    assert table.probe(0x20) == (2.0, EXACT, None) and table.probe(0x10) is None